@@ -0,0 +1,256 @@
+# App/core/cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+
+
+class CacheStats:
+    """Hit/miss counters shared by every tier of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCache:
+    """In-process LRU that evicts by total encoded size rather than entry count."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, stats: CacheStats) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, blob = entry
+            if expires_at < time.time():
+                self._drop(key)
+                stats.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return blob
+
+    def set(self, key: str, blob: bytes, stats: CacheStats, ttl: Optional[float] = None):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.time() + (ttl or self.ttl), blob)
+            self.current_bytes += len(blob)
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                stats.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key: str):
+        _, blob = self._data.pop(key)
+        self.current_bytes -= len(blob)
+
+
+class SQLiteCache:
+    """On-disk tier; survives restarts and is shared by workers on one host.
+
+    Expired rows are purged, and the file is trimmed to ``max_bytes`` of
+    values (soonest-expiring first), at most every ``PURGE_INTERVAL`` seconds
+    from ``set``.
+    """
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str, ttl: float, max_bytes: int = 0):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._last_purge = 0.0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expires_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str, stats: CacheStats) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                stats.expirations += 1
+                return None
+            return bytes(row[0])
+
+    def set(self, key: str, blob: bytes, stats: CacheStats, ttl: Optional[float] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, time.time() + (ttl or self.ttl)),
+            )
+        if time.time() - self._last_purge >= self.PURGE_INTERVAL:
+            self.purge(stats)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def purge(self, stats: Optional[CacheStats] = None) -> int:
+        """Drop expired rows, then the soonest-expiring ones over ``max_bytes``."""
+        now = time.time()
+        with self._lock:
+            self._last_purge = now
+            expired = self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,)).rowcount
+            evicted = []
+            if self.max_bytes:
+                total = self._conn.execute("SELECT COALESCE(SUM(length(value)), 0) FROM cache").fetchone()[0]
+                excess = total - self.max_bytes
+                if excess > 0:
+                    for key, size in self._conn.execute(
+                        "SELECT key, length(value) FROM cache ORDER BY expires_at"
+                    ):
+                        evicted.append((key,))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    self._conn.executemany("DELETE FROM cache WHERE key = ?", evicted)
+        if stats is not None:
+            stats.expirations += expired
+            stats.evictions += len(evicted)
+        return expired + len(evicted)
+
+
+class TieredCache:
+    """JSON value cache: memory LRU in front of an optional SQLite tier.
+
+    Disk hits are promoted into memory so hot entries stay in-process. Async
+    callers use ``aget``/``aset``/``aclear``, which only touch SQLite (and its
+    periodic purge) from the threadpool, so a disk lookup never blocks the
+    event loop.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, db_path: Optional[str] = None, disk_max_bytes: int = 0):
+        self.stats = CacheStats()
+        self.memory = MemoryCache(max_bytes=max_bytes, ttl=ttl)
+        self.disk = SQLiteCache(db_path, ttl=ttl, max_bytes=disk_max_bytes) if db_path else None
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        blob = self.memory.get(key, self.stats)
+        if blob is None:
+            return None
+        self.stats.hits += 1
+        self.stats.memory_hits += 1
+        return json.loads(blob)
+
+    def _disk_get(self, key: str) -> Optional[Any]:
+        blob = self.disk.get(key, self.stats) if self.disk is not None else None
+        if blob is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.disk_hits += 1
+        self.memory.set(key, blob, self.stats)
+        return json.loads(blob)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        return value if value is not None else self._disk_get(key)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        if value is not None or self.disk is None:
+            if value is None:
+                self.stats.misses += 1
+            return value
+        return await run_in_threadpool(self._disk_get, key)
+
+    def _encode(self, value: Any) -> bytes:
+        self.stats.sets += 1
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        blob = self._encode(value)
+        self.memory.set(key, blob, self.stats, ttl)
+        if self.disk is not None:
+            self.disk.set(key, blob, self.stats, ttl)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        blob = self._encode(value)
+        self.memory.set(key, blob, self.stats, ttl)
+        if self.disk is not None:
+            await run_in_threadpool(self.disk.set, key, blob, self.stats, ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    async def aclear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            await run_in_threadpool(self.disk.clear)
+
+    def info(self) -> Dict[str, Any]:
+        data = self.stats.as_dict()
+        data.update({
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+            "memory_max_bytes": self.memory.max_bytes,
+            "disk_enabled": self.disk is not None,
+            "disk_max_bytes": self.disk.max_bytes if self.disk is not None else 0,
+        })
+        return data
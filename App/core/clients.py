@@ -0,0 +1,39 @@
+# App/core/clients.py
+"""Process-wide API clients, created on first use and shared by every module."""
+from functools import lru_cache
+from typing import Optional
+from google.cloud import documentai
+from google.oauth2 import service_account
+from App.core.config import settings
+
+
+@lru_cache
+def get_gcp_credentials() -> service_account.Credentials:
+    return service_account.Credentials.from_service_account_file(settings.gcp_key_path)
+
+
+@lru_cache
+def get_documentai_client() -> documentai.DocumentProcessorServiceClient:
+    """Blocking client for library callers and worker threads."""
+    return documentai.DocumentProcessorServiceClient(credentials=get_gcp_credentials())
+
+
+# The async client owns a grpc.aio channel bound to the running event loop, so
+# it is created on first use inside the loop and then shared by every request.
+_documentai_async_client: Optional[documentai.DocumentProcessorServiceAsyncClient] = None
+
+
+def get_documentai_async_client() -> documentai.DocumentProcessorServiceAsyncClient:
+    global _documentai_async_client
+    if _documentai_async_client is None:
+        _documentai_async_client = documentai.DocumentProcessorServiceAsyncClient(
+            credentials=get_gcp_credentials()
+        )
+    return _documentai_async_client
+
+
+async def close_clients():
+    global _documentai_async_client
+    if _documentai_async_client is not None:
+        await _documentai_async_client.transport.close()
+        _documentai_async_client = None
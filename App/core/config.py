@@ -1,4 +1,5 @@
 # App/core/config.py
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -7,10 +8,84 @@ class Settings(BaseSettings):
     gcp_location: str = Field("us", env="GCP_LOCATION")
     gcp_processor_id: str = Field(..., env="GCP_PROCESSOR_ID")
     gcp_key_path: str = Field("client-docai.json", env="GCP_KEY_PATH")
+    docai_max_concurrency: int = Field(16, env="DOCAI_MAX_CONCURRENCY")
+    docai_shard_pages: int = Field(5, env="DOCAI_SHARD_PAGES")  # 0 disables sharding
+
+    ocr_cache_max_bytes: int = Field(64 * 1024 * 1024, env="OCR_CACHE_MAX_BYTES")
+    ocr_cache_ttl: int = Field(7 * 24 * 3600, env="OCR_CACHE_TTL")
+    ocr_cache_db_path: str = Field("", env="OCR_CACHE_DB_PATH")  # empty = memory only
+    ocr_cache_disk_max_bytes: int = Field(1024 * 1024 * 1024, env="OCR_CACHE_DISK_MAX_BYTES")  # 0 = unbounded
+
+    upload_max_file_bytes: int = Field(20 * 1024 * 1024, env="UPLOAD_MAX_FILE_BYTES")
+    upload_max_request_bytes: int = Field(40 * 1024 * 1024, env="UPLOAD_MAX_REQUEST_BYTES")
+    upload_chunk_bytes: int = Field(1024 * 1024, env="UPLOAD_CHUNK_BYTES")
+    upload_spool_dir: str = Field("", env="UPLOAD_SPOOL_DIR")  # empty = system temp dir
+
+    image_preprocess: bool = Field(False, env="IMAGE_PREPROCESS")
+    preprocess_workers: int = Field(0, env="PREPROCESS_WORKERS")  # 0 = one per CPU
+    preprocess_max_pixels: int = Field(2200, env="PREPROCESS_MAX_PIXELS")
+    preprocess_dpi: int = Field(200, env="PREPROCESS_DPI")
+    preprocess_jpeg_quality: int = Field(80, env="PREPROCESS_JPEG_QUALITY")
+    preprocess_dedupe_distance: int = Field(4, env="PREPROCESS_DEDUPE_DISTANCE")
+    preprocess_deskew_max_angle: float = Field(5.0, env="PREPROCESS_DESKEW_MAX_ANGLE")  # 0 = no deskew
+
+    response_compress_min_bytes: int = Field(1024, env="RESPONSE_COMPRESS_MIN_BYTES")
+    response_brotli_quality: int = Field(5, env="RESPONSE_BROTLI_QUALITY")
+    response_gzip_level: int = Field(6, env="RESPONSE_GZIP_LEVEL")
+
+    batch_db_path: str = Field("data/batch/jobs.db", env="BATCH_DB_PATH")
+    batch_storage_dir: str = Field("data/batch/files", env="BATCH_STORAGE_DIR")
+    batch_workers: int = Field(4, env="BATCH_WORKERS")
+    batch_max_documents: int = Field(500, env="BATCH_MAX_DOCUMENTS")
+    batch_lease_seconds: int = Field(600, env="BATCH_LEASE_SECONDS")
+    batch_poll_seconds: float = Field(5.0, env="BATCH_POLL_SECONDS")
+    batch_max_attempts: int = Field(5, env="BATCH_MAX_ATTEMPTS")
+
+    quiz_bank_db_path: str = Field("data/quiz/bank.db", env="QUIZ_BANK_DB_PATH")
+    quiz_bank_low_water: int = Field(10, env="QUIZ_BANK_LOW_WATER")
+    quiz_bank_refill_batch: int = Field(10, env="QUIZ_BANK_REFILL_BATCH")
+    quiz_fanout_batch: int = Field(5, env="QUIZ_FANOUT_BATCH")  # questions per request
+    quiz_fanout_spare: int = Field(1, env="QUIZ_FANOUT_SPARE")  # extra requests to cover duplicates
+    quiz_fanout_max_calls: int = Field(12, env="QUIZ_FANOUT_MAX_CALLS")
+    quiz_dedupe_threshold: float = Field(0.7, env="QUIZ_DEDUPE_THRESHOLD")  # estimated Jaccard
+    quiz_dedupe_max_entries: int = Field(200_000, env="QUIZ_DEDUPE_MAX_ENTRIES")
+
+    concierge_store: str = Field("sqlite", env="CONCIERGE_STORE")  # sqlite | redis | memory
+    concierge_store_path: str = Field("data/concierge/threads.db", env="CONCIERGE_STORE_PATH")
+    concierge_redis_url: str = Field("redis://localhost:6379/0", env="CONCIERGE_REDIS_URL")
+    concierge_thread_ttl: int = Field(7 * 24 * 3600, env="CONCIERGE_THREAD_TTL")
+    concierge_lock_lease: float = Field(90.0, env="CONCIERGE_LOCK_LEASE")  # renewed while a turn runs
+    concierge_write_batch_ms: int = Field(20, env="CONCIERGE_WRITE_BATCH_MS")
+    concierge_memory_max_bytes: int = Field(64 * 1024 * 1024, env="CONCIERGE_MEMORY_MAX_BYTES")  # memory backend
+    concierge_glossary_max_bytes: int = Field(8 * 1024 * 1024, env="CONCIERGE_GLOSSARY_MAX_BYTES")
+    concierge_glossary_ttl: int = Field(30 * 24 * 3600, env="CONCIERGE_GLOSSARY_TTL")
+    concierge_glossary_db_path: str = Field("data/concierge/glossary.db", env="CONCIERGE_GLOSSARY_DB_PATH")
+    concierge_glossary_disk_max_bytes: int = Field(64 * 1024 * 1024, env="CONCIERGE_GLOSSARY_DISK_MAX_BYTES")
+    concierge_glossary_prewarm: bool = Field(True, env="CONCIERGE_GLOSSARY_PREWARM")
+    concierge_glossary_prewarm_concurrency: int = Field(4, env="CONCIERGE_GLOSSARY_PREWARM_CONCURRENCY")
+    concierge_history_turns: int = Field(12, env="CONCIERGE_HISTORY_TURNS")  # messages sent verbatim
+    concierge_history_max_tokens: int = Field(1500, env="CONCIERGE_HISTORY_MAX_TOKENS")
+    concierge_summary_batch: int = Field(6, env="CONCIERGE_SUMMARY_BATCH")  # turns folded per summary
+    concierge_summary_max_tokens: int = Field(250, env="CONCIERGE_SUMMARY_MAX_TOKENS")
 
     GROQ_URL:str = Field(..., env="GROQ_URL")
     GROQ_MODEL:str = Field(..., env="GROQ_MODEL")
     GROQ_API_KEY: str = Field(..., env="GROQ_API_KEY")
+    groq_timeout: float = Field(60.0, env="GROQ_TIMEOUT")
+    groq_connect_timeout: float = Field(5.0, env="GROQ_CONNECT_TIMEOUT")
+    groq_max_retries: int = Field(3, env="GROQ_MAX_RETRIES")
+    groq_backoff_base: float = Field(0.5, env="GROQ_BACKOFF_BASE")
+    groq_backoff_max: float = Field(20.0, env="GROQ_BACKOFF_MAX")
+    groq_max_concurrency: int = Field(256, env="GROQ_MAX_CONCURRENCY")
+    groq_max_connections: int = Field(100, env="GROQ_MAX_CONNECTIONS")
+    groq_json_mode: bool = Field(True, env="GROQ_JSON_MODE")
+    rating_timeout: float = Field(90.0, env="RATING_TIMEOUT")
+    rating_preextract_min_confidence: float = Field(0.75, env="RATING_PREEXTRACT_MIN_CONFIDENCE")
+    rating_remainder_max_chars: int = Field(6000, env="RATING_REMAINDER_MAX_CHARS")
+    rating_cache_max_bytes: int = Field(32 * 1024 * 1024, env="RATING_CACHE_MAX_BYTES")
+    rating_cache_ttl: int = Field(24 * 3600, env="RATING_CACHE_TTL")
+    rating_cache_db_path: str = Field("", env="RATING_CACHE_DB_PATH")  # empty = memory only
+    rating_cache_disk_max_bytes: int = Field(256 * 1024 * 1024, env="RATING_CACHE_DISK_MAX_BYTES")
 
     @property
     def processor_name(self) -> str:
@@ -19,4 +94,18 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Build settings on first use so importing the app needs no environment."""
+    return Settings()
+
+
+class _LazySettings:
+    """Module-level ``settings`` that defers ``Settings()`` until an attribute is read."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
+
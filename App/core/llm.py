@@ -0,0 +1,198 @@
+# App/core/llm.py
+"""Shared, pooled client for the Groq chat completions API.
+
+One ``httpx.AsyncClient`` (HTTP/2, keep-alive) is reused by every service in
+the worker. A global semaphore caps in-flight completions. 429 and 5xx
+responses and transport errors are retried with full-jitter backoff, and
+``Retry-After`` is honoured when the server sends it. Calls made with a
+``label`` have their token usage and latency recorded per label.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from App.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _backoff(attempt: int) -> float:
+    cap = min(settings.groq_backoff_max, settings.groq_backoff_base * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+class GroqClient:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(settings.groq_timeout, connect=settings.groq_connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.groq_max_connections,
+                    max_keepalive_connections=settings.groq_max_connections,
+                    keepalive_expiry=60,
+                ),
+                headers={
+                    "Authorization": f"Bearer {settings.GROQ_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.groq_max_concurrency)
+        return self._semaphore
+
+    def record_usage(self, label: str, usage: Optional[Dict[str, Any]], seconds: float):
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        stats = self._usage.setdefault(
+            label, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+        )
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["seconds"] += seconds
+        logger.info("groq %s: %d tokens in, %d out, %.2fs", label, prompt_tokens, completion_tokens, seconds)
+
+    def usage_stats(self, prefix: str = "") -> Dict[str, Dict[str, float]]:
+        """Totals and per-request averages for each label starting with ``prefix``."""
+        out = {}
+        for label, stats in self._usage.items():
+            if not label.startswith(prefix):
+                continue
+            n = stats["requests"] or 1
+            out[label] = {
+                **stats,
+                "seconds": round(stats["seconds"], 3),
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / n, 1),
+                "avg_completion_tokens": round(stats["completion_tokens"] / n, 1),
+                "avg_seconds": round(stats["seconds"] / n, 3),
+            }
+        return out
+
+    async def chat(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None, label: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """POST a chat completion and return the decoded JSON body."""
+        started = time.perf_counter()
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        attempts = settings.groq_max_retries + 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                async with self.semaphore:
+                    response = await self.client.post(
+                        settings.GROQ_URL, json=payload, timeout=request_timeout
+                    )
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS and not last_attempt:
+                delay = _retry_after(response)
+                await asyncio.sleep(
+                    min(delay, settings.groq_backoff_max) if delay is not None else _backoff(attempt)
+                )
+                continue
+
+            response.raise_for_status()
+            data = response.json()
+            if label:
+                self.record_usage(label, data.get("usage"), time.perf_counter() - started)
+            return data
+
+    async def stream_chat(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None, label: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive.
+
+        Retries only happen before the first byte; once tokens are flowing a
+        failure is raised to the caller.
+        """
+        payload = {**payload, "stream": True}
+        started = time.perf_counter()
+        usage = None
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        attempts = settings.groq_max_retries + 1
+
+        async with self.semaphore:
+            for attempt in range(attempts):
+                last_attempt = attempt == attempts - 1
+                retry_delay = None
+                try:
+                    async with self.client.stream(
+                        "POST", settings.GROQ_URL, json=payload, timeout=request_timeout
+                    ) as response:
+                        if response.status_code in RETRY_STATUS and not last_attempt:
+                            delay = _retry_after(response)
+                            retry_delay = min(delay, settings.groq_backoff_max) if delay is not None else _backoff(attempt)
+                        else:
+                            if response.is_error:
+                                await response.aread()
+                            response.raise_for_status()
+
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                chunk = json.loads(data)
+                                # Groq reports usage on the last chunk under x_groq
+                                usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage") or usage
+                                if not chunk.get("choices"):
+                                    continue
+                                delta = chunk["choices"][0].get("delta", {}).get("content")
+                                if delta:
+                                    yield delta
+                            if label:
+                                self.record_usage(label, usage, time.perf_counter() - started)
+                            return
+                except (httpx.ConnectError, httpx.ConnectTimeout):
+                    if last_attempt:
+                        raise
+                    retry_delay = _backoff(attempt)
+                await asyncio.sleep(retry_delay)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+groq_client = GroqClient()
@@ -0,0 +1,87 @@
+# App/core/responses.py
+"""Content-negotiated encoding for large JSON-shaped responses.
+
+Bodies are serialised with orjson, or msgpack when ``Accept`` ranks
+``application/msgpack`` at least as high as JSON, and compressed with brotli
+or gzip, whichever ``Accept-Encoding`` ranks higher, once they exceed
+``RESPONSE_COMPRESS_MIN_BYTES``.
+"""
+import gzip
+from typing import Any, AsyncIterator, Dict
+import brotli
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from App.core.config import settings
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """Parse an Accept/Accept-Encoding header into ``{token: q}``."""
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def encode_body(content: Any, accept: str = "") -> tuple:
+    """Serialise ``content``; returns ``(body, media_type)``.
+
+    msgpack is used when it is accepted at least as strongly as JSON; a
+    wildcard alone keeps JSON.
+    """
+    accepted = _accepted(accept)
+    msgpack_q = max(accepted.get(media_type, 0) for media_type in MSGPACK_TYPES)
+    if msgpack_q > 0 and msgpack_q >= accepted.get("application/json", 0):
+        return msgpack.packb(content, use_bin_type=True), "application/msgpack"
+    return orjson.dumps(content), "application/json"
+
+
+def compress_body(body: bytes, accept_encoding: str = "") -> tuple:
+    """Compress ``body`` if worthwhile; returns ``(body, content_encoding or None)``."""
+    if len(body) < settings.response_compress_min_bytes:
+        return body, None
+    accepted = _accepted(accept_encoding)
+    br_q, gzip_q = accepted.get("br", 0), accepted.get("gzip", 0)
+    # brotli wins ties: smaller output at a similar cost
+    if br_q > 0 and br_q >= gzip_q:
+        return brotli.compress(body, quality=settings.response_brotli_quality), "br"
+    if gzip_q > 0:
+        return gzip.compress(body, compresslevel=settings.response_gzip_level), "gzip"
+    return body, None
+
+
+def encode_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    body, media_type = encode_body(content, request.headers.get("accept", ""))
+    body, encoding = compress_body(body, request.headers.get("accept-encoding", ""))
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Stop proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,22 @@
-import os, httpx
-from cachetools import LRUCache
-from typing import List, Optional
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from App.services.chatbot.chatbot_schemas import ChatRequest, ChatResponse
+from App.services.chatbot.glossary import (
+    claim_prewarm, extract_term, get_glossary_answer, get_glossary_cache, glossary_key, glossary_stats,
+    normalize_term, store_glossary_answer,
+)
+from App.services.chatbot.history import Thread, maybe_summarize
+from App.services.chatbot.keywords import KeywordMatcher
+from App.services.chatbot.store import get_conversation_store
 from App.core.config import settings
+from App.core.llm import groq_client
+from App.core.responses import sse_event, sse_response
 
 router = APIRouter(prefix="/concierge", tags=["concierge"])
 
-MAX_THREADS = 10000
-memory: LRUCache[str, List[dict]] = LRUCache(maxsize=MAX_THREADS)
-
 # Buyer scenario detection keywords
 SCENARIO_KEYWORDS = {
     "first_time": ["first time", "new buyer", "never bought", "first car"],
@@ -45,46 +52,29 @@ REGIONAL_KEYWORDS = {
     "eu": ["europe", "eu", "germany", "france", "uk", "spain", "italy"]
 }
 
+# Curated glossary: the only explanation requests answered from the cache,
+# and the terms answered ahead of demand
+GLOSSARY_TERMS = tuple(sorted(
+    {"apr", "gap", "vsc", "money factor", "residual", "doc fee"} | set(RED_FLAGS)
+))
+
+keyword_matcher = KeywordMatcher(SCENARIO_KEYWORDS, REGIONAL_KEYWORDS, DEALER_TACTICS, RED_FLAGS)
+
 def detect_buyer_scenario(message: str) -> str:
     """Detect the buyer scenario based on message content"""
-    message_lower = message.lower()
-    
-    for scenario, keywords in SCENARIO_KEYWORDS.items():
-        if any(keyword in message_lower for keyword in keywords):
-            return scenario
-    
-    return "standard"
+    return keyword_matcher.find(message).scenario
 
 def detect_dealer_tactic(message: str) -> Optional[str]:
     """Detect if user is reporting a dealer tactic"""
-    message_lower = message.lower()
-    
-    for tactic, keywords in DEALER_TACTICS.items():
-        if any(keyword in message_lower for keyword in keywords):
-            return tactic
-    
-    return None
+    return keyword_matcher.find(message).tactic
 
 def detect_red_flags(message: str) -> List[str]:
     """Detect red flag terms in the message"""
-    message_lower = message.lower()
-    detected_flags = []
-    
-    for flag in RED_FLAGS:
-        if flag in message_lower:
-            detected_flags.append(flag)
-    
-    return detected_flags
+    return keyword_matcher.find(message).red_flags
 
 def detect_region(message: str) -> Optional[str]:
     """Detect if user mentions a specific region"""
-    message_lower = message.lower()
-    
-    for region, keywords in REGIONAL_KEYWORDS.items():
-        if any(keyword in message_lower for keyword in keywords):
-            return region
-    
-    return None
+    return keyword_matcher.find(message).region
 
 def build_scenario_context(scenario: str, region: Optional[str] = None) -> str:
     """Build context prompt based on detected scenario"""
@@ -112,34 +102,33 @@ def build_scenario_context(scenario: str, region: Optional[str] = None) -> str:
     
     return base_context
 
-@router.post("", response_model=ChatResponse)
-async def concierge(
-    req: ChatRequest,
-    thread_id: str = Query(..., description="unique conversation id")
-):
-    api_key = settings.GROQ_API_KEY
-    if not api_key:
-        raise HTTPException(500, "GROQ_API_KEY not set")
-
-    # Check if user is asking for an explanation
+def is_explanation_request(message: str) -> bool:
+    """Check if user is asking for an explanation"""
     explanation_keywords = ["what is", "meaning of", "explain", "define"]
-    is_explanation_request = any(keyword in req.message.lower() for keyword in explanation_keywords)
+    return any(keyword in message.lower() for keyword in explanation_keywords)
+
+def build_turn(req: ChatRequest, thread: Optional[Thread]) -> Tuple[dict, Optional[Thread]]:
+    """Build the Groq payload for one message on the stored ``thread``.
+
+    Returns the payload and the thread to append the reply to, or ``None``
+    for explanation requests, which are not remembered.
+    """
+    explanation = is_explanation_request(req.message)
     
-    if is_explanation_request:
+    if explanation:
         # Handle explanation requests
         base_prompt = (
             "You are a negotiation expert. The user is asking for an explanation of a negotiation term or concept. "
             "Provide a child-like, clear, concise definition and a practical example of how it's used in negotiations. "
             "Keep your response focused and educational."
         )
+        if req.language:
+            base_prompt += f" Answer in {req.language}."
         messages = [{"role": "system", "content": base_prompt}]
         messages.append({"role": "user", "content": req.message})
     else:
-        # Enhanced roleplay mode with scenario detection
-        scenario = detect_buyer_scenario(req.message)
-        region = detect_region(req.message)
-        dealer_tactic = detect_dealer_tactic(req.message)
-        red_flags = detect_red_flags(req.message)
+        # Enhanced roleplay mode with scenario detection (one pass over the message)
+        scenario, region, dealer_tactic, red_flags = keyword_matcher.find(req.message)
         
         scenario_context = build_scenario_context(scenario, region)
         
@@ -170,9 +159,8 @@ async def concierge(
             base_prompt += f" The user mentioned these potential red flags: {', '.join(red_flags)}. Gently alert them to question these items."
         
         # Server-side memory
-        history = memory.get(thread_id, [])
-        if not history:
-            history = [{"role": "system", "content": base_prompt}]
+        if thread is None:
+            thread = Thread((scenario, region, dealer_tactic))
             # Start with scenario-appropriate opening
             opening_lines = {
                 "first_time": "Hello! I see you're new to this process. I'm here to help you understand your options.",
@@ -183,40 +171,177 @@ async def concierge(
                 "lease": "Leasing can be a great option! Let me explain how it works for your situation.",
                 "standard": "Hello, I'm SmartDealer. I noticed you're interested in our offerings. How can I assist today?"
             }
-            history.append({"role": "assistant", "content": opening_lines.get(scenario, opening_lines["standard"])})
+            thread.append("assistant", opening_lines.get(scenario, opening_lines["standard"]))
         
-        # Update system prompt if scenario has changed
-        if history and history[0]["role"] == "system":
-            history[0]["content"] = base_prompt
+        # The system prompt is rendered for the latest message, never stored
+        thread.context = (scenario, region, dealer_tactic)
         
-        history.append({"role": "user", "content": req.message})
-        messages = history
+        # Only the summary and the recent turns are sent, so the prompt stays flat
+        thread.append("user", req.message)
+        messages = thread.messages(base_prompt)
 
     payload = {
         "model": settings.GROQ_MODEL,
         "messages": messages,
         "max_tokens": 550,  # Slightly increased for more nuanced responses
-        "temperature": 0.7 if not is_explanation_request else 0.3
+        "temperature": 0.7 if not explanation else 0.3
     }
+    return payload, (None if explanation else thread)
+
+
+@asynccontextmanager
+async def locked_thread(req: ChatRequest, thread_id: str) -> AsyncIterator[Optional[Thread]]:
+    """Hold the thread's lock for the whole turn and yield the stored thread.
+
+    Explanation requests never touch the thread, so they skip the lock.
+    """
+    if is_explanation_request(req.message):
+        yield None
+        return
+    store = get_conversation_store()
+    async with store.lock(thread_id):
+        yield await store.get(thread_id)
+
+
+async def lookup_explanation(req: ChatRequest) -> Tuple[Optional[str], Optional[str]]:
+    """``(cache key, cached answer)`` for glossary-style explanation requests."""
+    if not is_explanation_request(req.message):
+        return None, None
+    term = extract_term(req.message, GLOSSARY_TERMS)
+    if term is None:
+        return None, None
+    key = glossary_key(term, req.language)
+    return key, await get_glossary_answer(key)
+
+
+async def remember_reply(thread_id: str, thread: Optional[Thread], reply: str):
+    # Save to memory if it's a roleplay conversation
+    if thread is not None:
+        thread.append("assistant", reply)
+        store = get_conversation_store()
+        await store.put(thread_id, thread)
+        maybe_summarize(store, thread_id, thread)
+
+
+@router.post("", response_model=ChatResponse)
+async def concierge(
+    req: ChatRequest,
+    thread_id: str = Query(..., description="unique conversation id")
+):
+    api_key = settings.GROQ_API_KEY
+    if not api_key:
+        raise HTTPException(500, "GROQ_API_KEY not set")
+
+    answer_key, cached = await lookup_explanation(req)
+    if cached is not None:
+        return ChatResponse(reply=cached)
+
+    async with locked_thread(req, thread_id) as stored:
+        payload, thread = build_turn(req, stored)
 
-    async with httpx.AsyncClient(timeout=30) as client:
         try:
-            r = await client.post(
-                settings.GROQ_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload
-            )
-            r.raise_for_status()
-            reply = r.json()["choices"][0]["message"]["content"].strip()
-
-            # Save to memory if it's a roleplay conversation
-            if not is_explanation_request:
-                history.append({"role": "assistant", "content": reply})
-                memory[thread_id] = history
-                
+            data = await groq_client.chat(payload, timeout=30)
+            reply = data["choices"][0]["message"]["content"].strip()
+            await remember_reply(thread_id, thread, reply)
+            if answer_key:
+                await store_glossary_answer(answer_key, reply)
             return ChatResponse(reply=reply)
         except Exception as e:
-            raise HTTPException(502, f"Groq error: {e}")
\ No newline at end of file
+            raise HTTPException(502, f"Groq error: {e}")
+
+
+@router.post("/stream")
+async def concierge_stream(
+    req: ChatRequest,
+    thread_id: str = Query(..., description="unique conversation id")
+):
+    """Server-sent events variant of ``/concierge``: ``delta`` events as tokens
+    arrive, then ``done`` with the full reply."""
+    api_key = settings.GROQ_API_KEY
+    if not api_key:
+        raise HTTPException(500, "GROQ_API_KEY not set")
+
+    answer_key, cached = await lookup_explanation(req)
+
+    async def events():
+        if cached is not None:
+            yield sse_event("delta", {"delta": cached})
+            yield sse_event("done", {"reply": cached})
+            return
+
+        # The lock is held until the reply is stored, so a second message to
+        # this thread waits for the stream to finish
+        async with locked_thread(req, thread_id) as stored:
+            payload, thread = build_turn(req, stored)
+            parts = []
+            try:
+                async for delta in groq_client.stream_chat(payload, timeout=30):
+                    parts.append(delta)
+                    yield sse_event("delta", {"delta": delta})
+                reply = "".join(parts).strip()
+                await remember_reply(thread_id, thread, reply)
+                if answer_key:
+                    await store_glossary_answer(answer_key, reply)
+            except Exception as e:
+                yield sse_event("error", {"error": f"Groq error: {e}"})
+                return
+
+        yield sse_event("done", {"reply": reply})
+
+    return sse_response(events())
+
+
+async def explain_term(term: str, language: Optional[str] = None) -> str:
+    req = ChatRequest(message=f"What is {term}?", language=language)
+    payload, _ = build_turn(req, None)
+    data = await groq_client.chat(payload, timeout=30, label="concierge.glossary")
+    reply = data["choices"][0]["message"]["content"].strip()
+    await store_glossary_answer(glossary_key(term, language), reply)
+    return reply
+
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def prewarm_glossary(force: bool = False):
+    """Answer every glossary term (default language) not cached yet.
+
+    Without ``force`` only one worker per host does this at startup.
+    """
+    if not force:
+        get_glossary_cache()  # creates the database directory
+        if not await run_in_threadpool(claim_prewarm, settings.concierge_glossary_db_path):
+            return
+    semaphore = asyncio.Semaphore(settings.concierge_glossary_prewarm_concurrency)
+
+    async def warm(term: str):
+        if not force and await get_glossary_answer(glossary_key(term)) is not None:
+            return
+        async with semaphore:
+            await explain_term(term)
+
+    await asyncio.gather(*(warm(term) for term in GLOSSARY_TERMS), return_exceptions=True)
+
+
+@router.get("/glossary/stats")
+async def concierge_glossary_stats():
+    """Explanation cache hit/miss counters and size."""
+    return glossary_stats()
+
+
+@router.post("/glossary/refresh")
+async def concierge_glossary_refresh(
+    term: Optional[str] = Query(None, description="term to re-answer; omit to refresh the whole glossary"),
+    language: Optional[str] = Query(None),
+):
+    if term:
+        # Only curated terms are cached; anything else would fill it with junk keys
+        term = normalize_term(term)
+        if term not in GLOSSARY_TERMS:
+            raise HTTPException(404, f"'{term}' is not a glossary term")
+        return {"term": term, "reply": await explain_term(term, language)}
+    global _refresh_task
+    await get_glossary_cache().aclear()
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(prewarm_glossary(force=True))
+    return {"refreshing": len(GLOSSARY_TERMS)}
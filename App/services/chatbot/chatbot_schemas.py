@@ -4,5 +4,6 @@ from typing import List, Optional
 
 class ChatRequest(BaseModel):
     message: str
+    language: Optional[str] = None  # explanation answers are cached per language
 class ChatResponse(BaseModel):
     reply: str
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Cache of concierge explanation answers, keyed on the term and language.
+
+"What is APR?", "explain apr" and "Define the APR." all resolve to the
+term ``apr``. They are answered from one cached reply instead of a fresh
+Groq call each time. Only a message that is nothing but such a request
+for a known glossary term is cached; "What is GAP? My dealer charges
+$2,500" is a real question and goes to the model.
+"""
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Any, Collection, Dict, Optional
+from App.core.cache import TieredCache
+from App.core.config import settings
+
+# Matched against the whole message
+EXPLANATION_PATTERN = re.compile(
+    r"\s*(?:what\s+is|what's|what\s+does|meaning\s+of|explain|define)\s+"
+    r"(?:(?:a|an|the)\s+)?([^?.!\n]+?)\s*[?.!]*\s*",
+    re.IGNORECASE,
+)
+# One worker per host prewarms; the claim lapses so a later restart re-checks
+PREWARM_CLAIM_SECONDS = 3600
+TERM_PREFIXES = ("meaning of ", "the ", "a ", "an ")
+TERM_SUFFIXES = (" mean", " means", " please", " for me", " to me", " again", " exactly")
+
+DEFAULT_LANGUAGE = "english"
+
+
+@lru_cache
+def get_glossary_cache() -> TieredCache:
+    return TieredCache(
+        max_bytes=settings.concierge_glossary_max_bytes,
+        ttl=settings.concierge_glossary_ttl,
+        db_path=settings.concierge_glossary_db_path or None,
+        disk_max_bytes=settings.concierge_glossary_disk_max_bytes,
+    )
+
+
+def normalize_term(term: str) -> str:
+    term = re.sub(r"[^\w$%&\-\s]+", " ", term.lower())
+    return " ".join(term.split())
+
+
+def extract_term(message: str, known_terms: Collection[str]) -> Optional[str]:
+    """The glossary term the whole message asks about, if it is a known one."""
+    match = EXPLANATION_PATTERN.fullmatch(message)
+    if not match:
+        return None
+    term = normalize_term(match.group(1))
+    for prefix in TERM_PREFIXES:
+        if term.startswith(prefix):
+            term = term[len(prefix):]
+    for suffix in TERM_SUFFIXES:
+        if term.endswith(suffix):
+            term = term[:-len(suffix)]
+    return term if term in known_terms else None
+
+
+def glossary_key(term: str, language: Optional[str] = None) -> str:
+    return f"glossary:{(language or DEFAULT_LANGUAGE).strip().lower()}:{normalize_term(term)}"
+
+
+async def get_glossary_answer(key: str) -> Optional[str]:
+    return await get_glossary_cache().aget(key)
+
+
+async def store_glossary_answer(key: str, answer: str):
+    if answer:
+        await get_glossary_cache().aset(key, answer)
+
+
+def claim_prewarm(db_path: str, lease: float = PREWARM_CLAIM_SECONDS) -> bool:
+    """True for the first worker on this host to ask within ``lease`` seconds.
+
+    The claim is a row in the glossary database, which every worker on the
+    host shares. A memory-only cache is per worker, so every worker claims.
+    """
+    if not db_path:
+        return True
+    conn = sqlite3.connect(db_path, timeout=5, isolation_level=None)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS glossary_prewarm ("
+            " id INTEGER PRIMARY KEY CHECK (id = 0), expires_at REAL NOT NULL)"
+        )
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM glossary_prewarm WHERE expires_at < ?", (now,))
+        claimed = conn.execute(
+            "INSERT OR IGNORE INTO glossary_prewarm (id, expires_at) VALUES (0, ?)", (now + lease,)
+        ).rowcount == 1
+        conn.execute("COMMIT")
+        return claimed
+    finally:
+        conn.close()
+
+
+def glossary_stats() -> Dict[str, Any]:
+    return get_glossary_cache().info()
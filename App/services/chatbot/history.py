@@ -0,0 +1,182 @@
+"""Token-budgeted concierge conversation history.
+
+Only the system prompt, a rolling summary and the most recent turns (capped
+by count and by estimated tokens) are sent to Groq, so the prompt stays the
+same size however long a roleplay runs. Turns that fall out of the window
+are folded into the summary by a background task after the reply is sent.
+
+Threads are kept compact. The system prompt is rendered per turn from the
+detected scenario/region/tactic ids rather than stored. Messages are
+``__slots__`` objects, and turns waiting to be summarised are zlib-compressed.
+"""
+import asyncio
+import logging
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from App.core.config import settings
+from App.core.llm import groq_client
+
+logger = logging.getLogger(__name__)
+
+# ~4 characters per token, plus per-message framing
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Turns outside the window shorter than this are not worth compressing
+COMPRESS_MIN_CHARS = 200
+
+ROLES = ("user", "assistant")
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a car-buying negotiation roleplay between a user and "
+    "SmartDealer (the dealer). Merge the existing summary with the new turns into one short summary. "
+    "Keep concrete facts: vehicle, prices, offers and counteroffers, fees, financing terms, what the user "
+    "agreed to or rejected, and open questions. Write plain prose, no lists, no preamble."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+class Message:
+    __slots__ = ("role", "tokens", "_body")
+
+    def __init__(self, role: str, content: str):
+        self.role = ROLES[ROLES.index(role)]  # shared string, not a per-message copy
+        self.tokens = estimate_tokens(content)
+        self._body: Union[str, bytes] = content
+
+    @property
+    def content(self) -> str:
+        body = self._body
+        return body if isinstance(body, str) else zlib.decompress(body).decode("utf-8")
+
+    def pack(self):
+        """Compress the text in place if that saves space."""
+        body = self._body
+        if isinstance(body, str) and len(body) >= COMPRESS_MIN_CHARS:
+            packed = zlib.compress(body.encode("utf-8"))
+            if len(packed) < len(body):
+                self._body = packed
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self._body)
+
+
+# (scenario, region, dealer tactic) detected on the latest message
+Context = Tuple[str, Optional[str], Optional[str]]
+
+
+class Thread:
+    """One concierge conversation: detected context, summary and turns."""
+
+    __slots__ = ("context", "summary", "turns")
+
+    def __init__(self, context: Context):
+        self.context = context
+        self.summary = ""
+        self.turns: List[Message] = []
+
+    def append(self, role: str, content: str):
+        self.turns.append(Message(role, content))
+        for message in self.turns[:self.window_start()]:
+            message.pack()
+
+    def window_start(self) -> int:
+        """Index of the oldest turn that still fits the recent-turn budget."""
+        budget = settings.concierge_history_max_tokens
+        start = len(self.turns)
+        used = 0
+        while start > 0 and len(self.turns) - start < settings.concierge_history_turns:
+            cost = self.turns[start - 1].tokens
+            # Always keep the newest turn, even if it alone is over budget
+            if used and used + cost > budget:
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def messages(self, system: str) -> List[Dict[str, str]]:
+        if self.summary:
+            system += f"\n\nSummary of the conversation so far: {self.summary}"
+        return [{"role": "system", "content": system}] + [
+            message.as_dict() for message in self.turns[self.window_start():]
+        ]
+
+    def nbytes(self) -> int:
+        """Approximate resident size, used as the cache weight."""
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.summary) + sys.getsizeof(self.turns)
+            + sum(message.nbytes() for message in self.turns)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ctx": list(self.context),
+            "summary": self.summary,
+            "turns": [[ROLES.index(m.role), m.content] for m in self.turns],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Thread":
+        thread = cls(tuple(data.get("ctx") or ("standard", None, None)))
+        thread.summary = data.get("summary", "")
+        for turn in data.get("turns", []):
+            # Threads stored before the compact format hold role/content dicts
+            if isinstance(turn, dict):
+                thread.turns.append(Message(turn["role"], turn["content"]))
+            else:
+                thread.turns.append(Message(ROLES[turn[0]], turn[1]))
+        for message in thread.turns[:thread.window_start()]:
+            message.pack()
+        return thread
+
+
+_summarizing: Set[str] = set()
+
+
+def maybe_summarize(store, thread_id: str, thread: Thread):
+    """Fold turns that left the window into the summary, off the request path."""
+    folded = thread.window_start()
+    if folded < settings.concierge_summary_batch or thread_id in _summarizing:
+        return
+    _summarizing.add(thread_id)
+    old_turns = [(m.role, m.content) for m in thread.turns[:folded]]
+    task = asyncio.create_task(_summarize(store, thread_id, thread.summary, old_turns))
+    task.add_done_callback(lambda t: _summarizing.discard(thread_id))
+
+
+async def _summarize(store, thread_id: str, summary: str, old_turns: List[Tuple[str, str]]):
+    transcript = "\n".join(f"{role}: {content}" for role, content in old_turns)
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary: {summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+        "max_tokens": settings.concierge_summary_max_tokens,
+        "temperature": 0.2,
+    }
+    try:
+        data = await groq_client.chat(payload, timeout=30, label="concierge.summary")
+    except Exception as e:
+        # The turns stay out of the window either way; try again after the next reply
+        logger.warning("concierge: summarizing %d turns failed: %s", len(old_turns), e)
+        return
+
+    # The Groq call ran unlocked; only apply it if nobody folded these turns meanwhile
+    count = len(old_turns)
+    async with store.lock(thread_id):
+        thread = await store.get(thread_id)
+        if thread is None or thread.summary != summary:
+            return
+        if [(m.role, m.content) for m in thread.turns[:count]] != old_turns:
+            return
+        thread.summary = data["choices"][0]["message"]["content"].strip()
+        del thread.turns[:count]
+        await store.put(thread_id, thread)
@@ -0,0 +1,350 @@
+"""Conversation storage for the concierge.
+
+Threads live outside the worker process so any uvicorn worker (or node) can
+serve any turn and restarts lose nothing. ``CONCIERGE_STORE`` selects the
+backend:
+
+- ``sqlite`` (default): one WAL database per host. Writes are buffered and
+  committed together every ``CONCIERGE_WRITE_BATCH_MS``.
+- ``redis``: any Redis-protocol server at ``CONCIERGE_REDIS_URL``, for
+  several hosts.
+- ``memory``: a per-process cache bounded by ``CONCIERGE_MEMORY_MAX_BYTES``,
+  for single-worker development.
+
+Every backend expires threads ``CONCIERGE_THREAD_TTL`` seconds after their
+last write. ``lock(thread_id)`` serialises turns of one thread across all
+workers, so concurrent messages are applied in order instead of
+overwriting each other. The lock is a lease of ``CONCIERGE_LOCK_LEASE``
+seconds, renewed every third of that while the turn runs, so a slow turn
+(Groq retries included) keeps it and a crashed worker's lock still lapses.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+from App.core.config import settings
+from .history import Thread
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_SECONDS = 0.05
+
+
+class ConversationStore(ABC):
+    """Backend interface; subclasses add a cross-process lock if they need one."""
+
+    def __init__(self, lock_lease: float):
+        self.lock_lease = lock_lease
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @abstractmethod
+    async def get(self, thread_id: str) -> Optional[Thread]:
+        ...
+
+    @abstractmethod
+    async def put(self, thread_id: str, thread: Thread):
+        ...
+
+    @abstractmethod
+    async def delete(self, thread_id: str):
+        ...
+
+    async def close(self):
+        pass
+
+    async def _acquire(self, thread_id: str) -> Optional[str]:
+        return None
+
+    async def _release(self, thread_id: str, token: Optional[str]):
+        pass
+
+    async def _renew(self, thread_id: str, token: str):
+        pass
+
+    async def _heartbeat(self, thread_id: str, token: str):
+        while True:
+            await asyncio.sleep(self.lock_lease / 3)
+            try:
+                await self._renew(thread_id, token)
+            except Exception as e:
+                logger.warning("concierge: could not renew lock for %s: %s", thread_id, e)
+
+    @asynccontextmanager
+    async def lock(self, thread_id: str) -> AsyncIterator[None]:
+        # The in-process lock queues local waiters so only one of them polls
+        # the shared lock
+        local = self._locks.get(thread_id)
+        if local is None:
+            local = self._locks[thread_id] = asyncio.Lock()
+        async with local:
+            token = await self._acquire(thread_id)
+            heartbeat = asyncio.create_task(self._heartbeat(thread_id, token)) if token else None
+            try:
+                yield
+            finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+                await self._release(thread_id, token)
+
+
+class MemoryConversationStore(ConversationStore):
+    """Evicts least-recently-used threads once their total size passes ``max_bytes``."""
+
+    def __init__(self, max_bytes: int, ttl: float, lock_lease: float):
+        super().__init__(lock_lease)
+        self._threads: TTLCache = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=Thread.nbytes)
+
+    async def get(self, thread_id: str) -> Optional[Thread]:
+        return self._threads.get(thread_id)
+
+    async def put(self, thread_id: str, thread: Thread):
+        # Re-inserting re-weighs the thread at its new size
+        self._threads.pop(thread_id, None)
+        try:
+            self._threads[thread_id] = thread
+        except ValueError:
+            # A single thread larger than the whole budget is not kept
+            pass
+
+    async def delete(self, thread_id: str):
+        self._threads.pop(thread_id, None)
+
+
+class SQLiteConversationStore(ConversationStore):
+    def __init__(self, db_path: str, ttl: float, lock_lease: float, batch_seconds: float):
+        super().__init__(lock_lease)
+        self.ttl = ttl
+        self.batch_seconds = batch_seconds
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS threads (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS threads_expiry ON threads (expires_at);
+            CREATE TABLE IF NOT EXISTS thread_locks (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+        self._lock = threading.Lock()
+        # thread_id -> (serialised thread or None for delete, future set once committed)
+        self._pending: Dict[str, Tuple[Optional[str], asyncio.Future]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    async def get(self, thread_id: str) -> Optional[Thread]:
+        if thread_id in self._pending:
+            data = self._pending[thread_id][0]
+        else:
+            data = await run_in_threadpool(self._read, thread_id)
+        return Thread.from_dict(json.loads(data)) if data else None
+
+    async def put(self, thread_id: str, thread: Thread):
+        await self._enqueue(thread_id, json.dumps(thread.to_dict(), ensure_ascii=False))
+
+    async def delete(self, thread_id: str):
+        await self._enqueue(thread_id, None)
+
+    def _read(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM threads WHERE id = ? AND expires_at >= ?", (thread_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    async def _enqueue(self, thread_id: str, data: Optional[str]):
+        """Queue a write and wait until the batch containing it is committed."""
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        previous = self._pending.get(thread_id)
+        future = previous[1] if previous else asyncio.get_running_loop().create_future()
+        self._pending[thread_id] = (data, future)
+        self._wakeup.set()
+        await asyncio.shield(future)
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_seconds)
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            await run_in_threadpool(self._write, {k: v[0] for k, v in batch.items()})
+        except Exception as e:
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch.values():
+            if not future.done():
+                future.set_result(None)
+
+    def _write(self, batch: Dict[str, Optional[str]]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO threads (id, data, expires_at) VALUES (?, ?, ?)",
+                [(k, v, now + self.ttl) for k, v in batch.items() if v is not None],
+            )
+            self._conn.executemany(
+                "DELETE FROM threads WHERE id = ?", [(k,) for k, v in batch.items() if v is None]
+            )
+            if now - self._last_purge > 60:
+                self._conn.execute("DELETE FROM threads WHERE expires_at < ?", (now,))
+                self._conn.execute("DELETE FROM thread_locks WHERE expires_at < ?", (now,))
+                self._last_purge = now
+            self._conn.execute("COMMIT")
+
+    def _try_lock(self, thread_id: str, owner: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "DELETE FROM thread_locks WHERE id = ? AND expires_at < ?", (thread_id, now)
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO thread_locks (id, owner, expires_at) VALUES (?, ?, ?)",
+                (thread_id, owner, now + self.lock_lease),
+            )
+            row = self._conn.execute(
+                "SELECT owner FROM thread_locks WHERE id = ?", (thread_id,)
+            ).fetchone()
+            self._conn.execute("COMMIT")
+        return row is not None and row[0] == owner
+
+    def _unlock(self, thread_id: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM thread_locks WHERE id = ? AND owner = ?", (thread_id, owner))
+
+    def _extend_lock(self, thread_id: str, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE thread_locks SET expires_at = ? WHERE id = ? AND owner = ?",
+                (time.time() + self.lock_lease, thread_id, owner),
+            )
+
+    async def _acquire(self, thread_id: str) -> str:
+        owner = uuid.uuid4().hex
+        while not await run_in_threadpool(self._try_lock, thread_id, owner):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        return owner
+
+    async def _release(self, thread_id: str, token: Optional[str]):
+        await run_in_threadpool(self._unlock, thread_id, token)
+
+    async def _renew(self, thread_id: str, token: str):
+        await run_in_threadpool(self._extend_lock, thread_id, token)
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self._flush()
+
+
+# Delete the lock only if we still own it
+_REDIS_RELEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock only if we still own it
+_REDIS_RENEW = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisConversationStore(ConversationStore):
+    def __init__(self, url: str, ttl: float, lock_lease: float, prefix: str = "concierge:"):
+        super().__init__(lock_lease)
+        import redis.asyncio as redis  # only needed for this backend
+
+        self.redis = redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    async def get(self, thread_id: str) -> Optional[Thread]:
+        data = await self.redis.get(f"{self.prefix}thread:{thread_id}")
+        return Thread.from_dict(json.loads(data)) if data else None
+
+    async def put(self, thread_id: str, thread: Thread):
+        await self.redis.set(
+            f"{self.prefix}thread:{thread_id}",
+            json.dumps(thread.to_dict(), ensure_ascii=False),
+            ex=self.ttl,
+        )
+
+    async def delete(self, thread_id: str):
+        await self.redis.delete(f"{self.prefix}thread:{thread_id}")
+
+    async def _acquire(self, thread_id: str) -> str:
+        token = uuid.uuid4().hex
+        key = f"{self.prefix}lock:{thread_id}"
+        while not await self.redis.set(key, token, nx=True, px=int(self.lock_lease * 1000)):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        return token
+
+    async def _release(self, thread_id: str, token: Optional[str]):
+        await self.redis.eval(_REDIS_RELEASE, 1, f"{self.prefix}lock:{thread_id}", token)
+
+    async def _renew(self, thread_id: str, token: str):
+        await self.redis.eval(
+            _REDIS_RENEW, 1, f"{self.prefix}lock:{thread_id}", token, int(self.lock_lease * 1000)
+        )
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+@lru_cache
+def get_conversation_store() -> ConversationStore:
+    backend = settings.concierge_store.lower()
+    ttl = settings.concierge_thread_ttl
+    lease = settings.concierge_lock_lease
+    if backend == "redis":
+        return RedisConversationStore(settings.concierge_redis_url, ttl, lease)
+    if backend == "memory":
+        return MemoryConversationStore(settings.concierge_memory_max_bytes, ttl, lease)
+    if backend == "sqlite":
+        return SQLiteConversationStore(
+            settings.concierge_store_path, ttl, lease, settings.concierge_write_batch_ms / 1000
+        )
+    raise ValueError(f"Unknown CONCIERGE_STORE backend: {settings.concierge_store}")
+
+
+async def close_conversation_store():
+    if get_conversation_store.cache_info().currsize:
+        await get_conversation_store().close()
@@ -0,0 +1,45 @@
+"""Text anchor resolution for Document AI responses.
+
+Every field name/value and table cell in a Document AI response points back
+into ``document.text`` through one or more text segments. Going through the
+proto-plus wrappers re-marshals ``document.text`` and every nested message on
+each attribute access, which dominates conversion time for dense forms, so
+the resolver reads the text once and walks the raw protobuf messages.
+"""
+from google.cloud import documentai
+
+
+def raw_document(document):
+    """Underlying protobuf message of a proto-plus ``Document``."""
+    if isinstance(document, documentai.Document):
+        return documentai.Document.pb(document)
+    return document
+
+
+class TextAnchorResolver:
+    """Resolves text anchors against one document's text.
+
+    Built once per document and shared by every field and cell, so the text
+    is read out of the response a single time.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def resolve(self, text_anchor) -> str:
+        """Text for every segment of ``text_anchor``, joined and stripped."""
+        segments = text_anchor.text_segments
+        if not segments:
+            return ""
+        text = self.text
+        if len(segments) == 1:
+            segment = segments[0]
+            return text[segment.start_index:segment.end_index].strip()
+        return "".join(
+            text[segment.start_index:segment.end_index] for segment in segments
+        ).strip()
+
+    def layout_text(self, layout) -> str:
+        return self.resolve(layout.text_anchor)
@@ -0,0 +1,289 @@
+"""Persistent job queue and worker pool behind /extraction/batch.
+
+Jobs and their documents live in SQLite next to the spooled files, so a
+restart loses nothing: documents are claimed with a lease, and a lease that
+expires (crashed worker, killed container) puts the document back in the
+queue. Transient Document AI errors (429, 5xx, timeouts) requeue the
+document with backoff; it is only marked failed after
+``BATCH_MAX_ATTEMPTS``. Any number of uvicorn workers can share the same
+database. All store calls run in the threadpool so a SQLite lock wait
+never blocks the event loop.
+"""
+import asyncio
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from google.api_core import exceptions as gexc
+from App.core.config import settings
+from .extract import extract_pdf_async
+from .extract_schema import ExtractionDetail
+from .ingest import SpooledUpload, assemble_pdf, read_pdf
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+TRANSIENT_ERRORS = (
+    gexc.TooManyRequests,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.InternalServerError,
+    gexc.DeadlineExceeded,
+    gexc.Aborted,
+    asyncio.TimeoutError,
+)
+RETRY_BACKOFF_MAX = 300.0
+
+
+class BatchJobStore:
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                total INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                path TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                status TEXT NOT NULL,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS documents_queue ON documents (status, id);
+            CREATE INDEX IF NOT EXISTS documents_job ON documents (job_id, idx);
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "available_at" not in columns:
+            self._conn.execute("ALTER TABLE documents ADD COLUMN available_at REAL")
+        self._lock = threading.Lock()
+
+    def create_job(self, uploads: List[SpooledUpload], detail: ExtractionDetail) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO jobs (id, created_at, total) VALUES (?, ?, ?)",
+                (job_id, time.time(), len(uploads)),
+            )
+            self._conn.executemany(
+                "INSERT INTO documents (job_id, idx, filename, ext, path, detail, status)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, idx, u.filename, u.ext, str(u.path), ExtractionDetail(detail).value, PENDING)
+                    for idx, u in enumerate(uploads)
+                ],
+            )
+            self._conn.execute("COMMIT")
+        return job_id
+
+    def claim_next(self, lease_seconds: float) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest ready pending (or lease-expired) document."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT * FROM documents"
+                " WHERE (status = ? AND COALESCE(available_at, 0) <= ?)"
+                " OR (status = ? AND claimed_at < ?)"
+                " ORDER BY id LIMIT 1",
+                (PENDING, now, PROCESSING, now - lease_seconds),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE documents SET status = ?, claimed_at = ?, attempts = attempts + 1"
+                    " WHERE id = ?",
+                    (PROCESSING, now, row["id"]),
+                )
+                row = self._conn.execute("SELECT * FROM documents WHERE id = ?", (row["id"],)).fetchone()
+            self._conn.execute("COMMIT")
+        return row
+
+    def complete(self, doc_id: int, result: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET status = ?, result = ?, error = NULL WHERE id = ?",
+                (DONE, json.dumps(result), doc_id),
+            )
+
+    def retry(self, doc_id: int, error: str, delay: float):
+        """Put a document back in the queue, claimable again after ``delay``."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET status = ?, claimed_at = NULL, available_at = ?, error = ?"
+                " WHERE id = ?",
+                (PENDING, time.time() + delay, error, doc_id),
+            )
+
+    def fail(self, doc_id: int, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET status = ?, error = ? WHERE id = ?",
+                (FAILED, error, doc_id),
+            )
+
+    def job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM documents WHERE job_id = ? GROUP BY status",
+                (job_id,),
+            ).fetchall())
+
+        finished = counts.get(DONE, 0) + counts.get(FAILED, 0)
+        return {
+            "job_id": job_id,
+            "status": "completed" if finished == job["total"] else "running",
+            "created_at": job["created_at"],
+            "total": job["total"],
+            "pending": counts.get(PENDING, 0),
+            "processing": counts.get(PROCESSING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+        }
+
+    def job_results(self, job_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, filename, status, result, error FROM documents"
+                " WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+        return [
+            {
+                "index": row["idx"],
+                "filename": row["filename"],
+                "status": row["status"],
+                "result": json.loads(row["result"]) if row["result"] else None,
+                "error": row["error"],
+            }
+            for row in rows
+        ]
+
+
+@lru_cache
+def get_batch_store() -> BatchJobStore:
+    return BatchJobStore(settings.batch_db_path)
+
+
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _load_pdf(row: sqlite3.Row) -> bytes:
+    path = Path(row["path"])
+    upload = SpooledUpload(row["filename"], row["ext"], path, path.stat().st_size)
+    return read_pdf(assemble_pdf([upload], path.parent))
+
+
+def _cleanup(row: sqlite3.Row):
+    # Spooled input (and any PDF built from it) is only needed until processed
+    shutil.rmtree(Path(row["path"]).parent, ignore_errors=True)
+
+
+def retry_delay(attempts: int) -> float:
+    return min(RETRY_BACKOFF_MAX, 2.0 ** attempts)
+
+
+async def _process(row: sqlite3.Row):
+    store = get_batch_store()
+    if row["attempts"] > settings.batch_max_attempts:
+        # Lease expired that many times: the worker keeps dying on this one
+        await run_in_threadpool(store.fail, row["id"], row["error"] or "Gave up after repeated attempts")
+        await run_in_threadpool(_cleanup, row)
+        return
+
+    try:
+        contents = await run_in_threadpool(_load_pdf, row)
+        result = await extract_pdf_async(contents, detail=row["detail"])
+    except TRANSIENT_ERRORS as e:
+        if row["attempts"] < settings.batch_max_attempts:
+            logger.warning("batch: document %s attempt %d failed, retrying: %s", row["id"], row["attempts"], e)
+            await run_in_threadpool(store.retry, row["id"], str(e), retry_delay(row["attempts"]))
+            return
+        await run_in_threadpool(store.fail, row["id"], str(e))
+    except Exception as e:
+        await run_in_threadpool(store.fail, row["id"], str(e))
+    else:
+        await run_in_threadpool(store.complete, row["id"], result)
+    await run_in_threadpool(_cleanup, row)
+
+
+async def _worker():
+    while True:
+        try:
+            row = await run_in_threadpool(get_batch_store().claim_next, settings.batch_lease_seconds)
+            if row is not None:
+                await _process(row)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # e.g. "database is locked"; the lease puts the document back
+            logger.exception("batch: worker iteration failed")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.batch_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def ensure_batch_workers():
+    """Start the worker pool for this process if it is not running yet."""
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    _workers[:] = [task for task in _workers if not task.done()]
+    while len(_workers) < settings.batch_workers:
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_batch_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def notify_batch_workers():
+    ensure_batch_workers()
+    _wakeup.set()
+
+
+def new_document_dir(job_dir: Path, index: int) -> Path:
+    path = job_dir / str(index)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def new_job_dir() -> Path:
+    path = Path(settings.batch_storage_dir) / uuid.uuid4().hex
+    path.mkdir(parents=True, exist_ok=True)
+    return path
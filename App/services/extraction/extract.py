@@ -1,108 +1,219 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import List, Optional, Union
 from google.cloud import documentai
-from google.oauth2 import service_account
+from fastapi.concurrency import run_in_threadpool
+from App.core.clients import get_documentai_async_client, get_documentai_client
 from App.core.config import settings
+from .anchors import TextAnchorResolver, raw_document
+from .ocr_cache import get_ocr_cache, ocr_cache_key, record_ocr_call
+from .extract_schema import ExtractionDetail
+from .sharding import merge_results, resolve_shard_pages, split_pdf
+
+_docai_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _docai_semaphore
+    if _docai_semaphore is None:
+        _docai_semaphore = asyncio.Semaphore(settings.docai_max_concurrency)
+    return _docai_semaphore
+
+
+async def process_document_async(
+    content: bytes, mime_type: str = "application/pdf"
+) -> documentai.Document:
+    """OCR raw bytes without blocking the event loop.
+
+    At most ``DOCAI_MAX_CONCURRENCY`` calls are in flight per worker; extra
+    uploads wait on the semaphore instead of piling onto the channel.
+    """
+    raw_doc = documentai.RawDocument(content=content, mime_type=mime_type)
+    request = documentai.ProcessRequest(name=settings.processor_name, raw_document=raw_doc)
+
+    async with _get_semaphore():
+        started = time.perf_counter()
+        result = await get_documentai_async_client().process_document(request=request)
+        record_ocr_call(time.perf_counter() - started)
+    return result.document
+
+
+async def extract_pdf_async(
+    content: bytes,
+    shard_pages: Optional[int] = None,
+    detail: ExtractionDetail = ExtractionDetail.fields,
+) -> dict:
+    """OCR a PDF into an ``ExtractResponse`` dict, using the cache and page shards."""
+    detail = ExtractionDetail(detail)
+    cache_key = ocr_cache_key(content, kind=detail.value)
+    cached = await get_ocr_cache().aget(cache_key)
+    if cached is not None:
+        return cached
+
+    # Large packets are split into page shards and OCR'd concurrently
+    shard_size = resolve_shard_pages(shard_pages)
+    shards = await run_in_threadpool(split_pdf, content, shard_size)
+    documents = await asyncio.gather(
+        *(process_document_async(shard) for shard in shards)
+    )
+
+    extracted = merge_results([
+        document_to_result(document, detail, page_offset=index * shard_size)
+        for index, document in enumerate(documents)
+    ])
+    await get_ocr_cache().aset(cache_key, extracted)
+    return extracted
 
-credentials = service_account.Credentials.from_service_account_file(
-    settings.gcp_key_path
-)
-
-client = documentai.DocumentProcessorServiceClient(credentials=credentials)
-
-PROCESSOR_NAME = (
-    f"projects/{settings.gcp_project_id}/locations/{settings.gcp_location}"
-    f"/processors/{settings.gcp_processor_id}"
-)
 
+def process_document_sync(
+    content: bytes, mime_type: str = "application/pdf"
+) -> documentai.Document:
+    """Blocking OCR call for library/CLI callers."""
+    raw_doc = documentai.RawDocument(content=content, mime_type=mime_type)
+    request = documentai.ProcessRequest(name=settings.processor_name, raw_document=raw_doc)
 
+    started = time.perf_counter()
+    result = get_documentai_client().process_document(request=request)
+    record_ocr_call(time.perf_counter() - started)
+    return result.document
 
-def extract_text_sync(file_path: Union[str, Path]):
-    """Extract form fields and tables as fully structured objects."""
 
-    def get_text(layout):
-        """Extracts text from the document using text anchor indices."""
-        if not layout or not layout.text_anchor or not layout.text_anchor.text_segments:
-            return ""
-        text_fragments = []
-        for segment in layout.text_anchor.text_segments:
-            start = segment.start_index or 0
-            end = segment.end_index
-            text_fragments.append(document.text[start:end])
-        return "".join(text_fragments).strip()
+def extract_text_sync(
+    file_path: Union[str, Path],
+    shard_pages: Optional[int] = None,
+    detail: ExtractionDetail = ExtractionDetail.full,
+):
+    """Extract form fields and tables as fully structured objects.
 
+    Blocking counterpart of ``extract_pdf_async`` for library callers; PDFs
+    longer than ``shard_pages`` (default ``DOCAI_SHARD_PAGES``) are split and
+    the shards are OCR'd in parallel threads.
+    """
+    detail = ExtractionDetail(detail)
     file_path = Path(file_path)
-    mime_type = "application/pdf"
 
     with file_path.open("rb") as f:
-        raw_doc = documentai.RawDocument(content=f.read(), mime_type=mime_type)
+        content = f.read()
 
-    request = documentai.ProcessRequest(name=PROCESSOR_NAME, raw_document=raw_doc)
+    cache_key = ocr_cache_key(content, kind=detail.value)
+    cached = get_ocr_cache().get(cache_key)
+    if cached is not None:
+        return cached
 
-    result = client.process_document(request=request)
-    document = result.document
+    shard_size = resolve_shard_pages(shard_pages)
+    shards = split_pdf(content, shard_size)
 
-    extracted = {
-        "pages": []
-    }
+    def run(index: int) -> dict:
+        document = process_document_sync(shards[index])
+        return document_to_result(document, detail, page_offset=index * shard_size)
 
-    for page in document.pages:
-        page_data = {
-            "page_number": page.page_number,
-            "form_fields": [],
-            "tables": []
-        }
+    if len(shards) == 1:
+        extracted = run(0)
+    else:
+        workers = min(len(shards), settings.docai_max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            extracted = merge_results(list(pool.map(run, range(len(shards)))))
 
-        # Extract form fields
-        for field in page.form_fields:
-            field_name = get_text(field.field_name)
-            field_value = get_text(field.field_value)
-            confidence = field.field_value.confidence if field.field_value else None
-
-            page_data["form_fields"].append({
-                "field_name": {
-                    "text": field_name,
-                    "confidence": field.field_name.confidence if field.field_name else None
-                },
-                "field_value": {
-                    "text": field_value,
-                    "confidence": confidence
-                }
-            })
+    get_ocr_cache().set(cache_key, extracted)
+    return extracted
 
-        # Extract tables
-        for table in page.tables:
-            table_obj = {
-                "detected_columns": table.detected_columns,
-                "header_rows": [],
-                "body_rows": []
+
+def document_to_result(
+    document: documentai.Document,
+    detail: ExtractionDetail = ExtractionDetail.fields,
+    page_offset: int = 0,
+) -> dict:
+    """Convert a Document AI response to our schema in a single walk of its pages.
+
+    ``fields`` yields flat text and form fields, ``fields+tables`` adds plain
+    text table grids, and ``full`` adds per-page fields and tables with
+    confidences and spans. Sections that were not requested are never built.
+    """
+    doc = raw_document(document)
+    resolver = TextAnchorResolver(doc.text)
+    resolve = resolver.resolve
+    layout_text = resolver.layout_text
+    with_tables = detail is not ExtractionDetail.fields
+    full = detail is ExtractionDetail.full
+
+    form_fields: List[dict] = []
+    tables: List[dict] = []
+    pages: List[dict] = []
+
+    def cell_text(row_cells):
+        return [layout_text(cell.layout) for cell in row_cells]
+
+    def extract_cells(row_cells):
+        return [
+            {
+                "text": layout_text(cell.layout),
+                "confidence": cell.layout.confidence,
+                "row_span": cell.row_span,
+                "col_span": cell.col_span
             }
+            for cell in row_cells
+        ]
 
-            def extract_cells(row_cells):
-                cells_list = []
-                for cell in row_cells:
-                    text = get_text(cell.layout)
-                    confidence = cell.layout.confidence if hasattr(cell.layout, 'confidence') else None
-                    cells_list.append({
-                        "text": text,
-                        "confidence": confidence,
-                        "row_span": cell.row_span,
-                        "col_span": cell.col_span
-                    })
-                return cells_list
-
-            # Header rows
-            for header_row in table.header_rows:
-                row_cells = extract_cells(header_row.cells)
-                table_obj["header_rows"].append(row_cells)
-
-            # Body rows
-            for body_row in table.body_rows:
-                row_cells = extract_cells(body_row.cells)
-                table_obj["body_rows"].append(row_cells)
-
-            page_data["tables"].append(table_obj)
-
-        extracted["pages"].append(page_data)
+    for page in doc.pages:
+        page_number = page_offset + page.page_number
+        page_fields = []
 
-    return extracted
+        for field in page.form_fields:
+            name = resolve(field.field_name.text_anchor)
+            value = resolve(field.field_value.text_anchor)
+            form_fields.append({
+                "name": name,
+                "value": value,
+                "confidence": field.field_value.confidence,
+            })
+            if full:
+                page_fields.append({
+                    "field_name": {
+                        "text": name,
+                        "confidence": field.field_name.confidence if field.HasField("field_name") else None
+                    },
+                    "field_value": {
+                        "text": value,
+                        "confidence": field.field_value.confidence if field.HasField("field_value") else None
+                    }
+                })
+
+        if not with_tables:
+            continue
+
+        page_tables = []
+        for table in page.tables:
+            detected_columns = max(
+                (sum(cell.col_span or 1 for cell in row.cells)
+                 for row in (*table.header_rows, *table.body_rows)),
+                default=0,
+            )
+            if full:
+                page_tables.append({
+                    "detected_columns": detected_columns,
+                    "header_rows": [extract_cells(row.cells) for row in table.header_rows],
+                    "body_rows": [extract_cells(row.cells) for row in table.body_rows]
+                })
+            else:
+                tables.append({
+                    "page_number": page_number,
+                    "detected_columns": detected_columns,
+                    "header_rows": [cell_text(row.cells) for row in table.header_rows],
+                    "body_rows": [cell_text(row.cells) for row in table.body_rows]
+                })
+
+        if full:
+            pages.append({
+                "page_number": page_number,
+                "form_fields": page_fields,
+                "tables": page_tables
+            })
+
+    result = {"text": resolver.text, "form_fields": form_fields}
+    if full:
+        result["pages"] = pages
+    elif with_tables:
+        result["tables"] = tables
+    return result
@@ -1,88 +1,111 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Query, Request
 from pathlib import Path
-from .extract import extract_text_sync
-from .extract_schema import ExtractResponse
+import shutil
+import tempfile
+from .extract import extract_pdf_async
+from .extract_schema import BatchJobStatus, BatchResultsPage, ExtractionDetail, ExtractResponse
+from .batch import get_batch_store, new_document_dir, new_job_dir, notify_batch_workers
+from .ingest import UPLOAD_REQUEST_BODY, assemble_pdf, read_pdf, spool_request
+from .ocr_cache import ocr_cache_stats
+from .preprocess import preprocess_stats, preprocess_uploads
 from App.core.config import settings
-from google.cloud import documentai
-from google.oauth2 import service_account
-import img2pdf
-from typing import List
+from App.core.responses import encode_response
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
 
 router = APIRouter(prefix="/extraction", tags=["Extraction"])
 
-credentials = service_account.Credentials.from_service_account_file(
-    settings.gcp_key_path
+@router.post(
+    "/upload", response_model=ExtractResponse, response_model_exclude_none=True,
+    openapi_extra=UPLOAD_REQUEST_BODY,
 )
-client = documentai.DocumentProcessorServiceClient(credentials=credentials)
-PROCESSOR_NAME = f"projects/{settings.gcp_project_id}/locations/{settings.gcp_location}/processors/{settings.gcp_processor_id}"
+async def upload_and_extract(
+    request: Request,
+    detail: ExtractionDetail = Query(ExtractionDetail.fields, description="fields, fields+tables or full"),
+    shard_pages: Optional[int] = Query(None, ge=0, description="Pages per OCR shard; 0 disables sharding"),
+    preprocess: Optional[bool] = Query(None, description="Normalise and de-duplicate photos before OCR"),
+):
+    # Process files
+    try:
+        with tempfile.TemporaryDirectory(prefix="extract-", dir=settings.upload_spool_dir or None) as workdir:
+            # Stream the body to disk, then build one PDF (img2pdf is CPU-bound, keep it off the event loop)
+            uploads = await spool_request(request, lambda index: Path(workdir))
+            if settings.image_preprocess if preprocess is None else preprocess:
+                uploads = await preprocess_uploads(uploads, Path(workdir))
+            pdf_path = await run_in_threadpool(assemble_pdf, uploads, Path(workdir))
+            contents = await run_in_threadpool(read_pdf, pdf_path)
 
-def get_text_from_text_anchor(document_text, text_anchor):
-    if not text_anchor or not text_anchor.text_segments:
-        return ""
-    segment = text_anchor.text_segments[0]
-    start = segment.start_index or 0
-    end = segment.end_index or 0
-    return document_text[start:end]
+        # The engine already returns the response shape; skip re-validation
+        return encode_response(request, await extract_pdf_async(contents, shard_pages, detail))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/upload", response_model=ExtractResponse)
-async def upload_and_extract(files: List[UploadFile] = File(...)):
-    mime_map = {
-        ".pdf": "application/pdf",
-        ".png": "image/png",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".tiff": "image/tiff",
-        ".tif": "image/tiff",
-    }
 
-    # Validate file types
-    for file in files:
-        ext = "." + file.filename.lower().rsplit(".", 1)[-1]
-        if ext not in mime_map:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type: {ext}. Please upload PDF, PNG, JPEG, or TIFF."
-            )
+@router.get("/cache/stats")
+async def extraction_cache_stats():
+    """OCR cache hit/miss counters and estimated Document AI time saved."""
+    return ocr_cache_stats()
 
-    # Process files
-    try:
-        if len(files) == 1 and files[0].filename.lower().endswith('.pdf'):
-            # Single PDF file
-            contents = await files[0].read()
-            mime_type = "application/pdf"
-        else:
-            # Multiple images - convert to PDF
-            image_contents = []
-            for file in files:
-                content = await file.read()
-                image_contents.append(content)
-            
-            # Convert images to PDF
-            contents = img2pdf.convert(image_contents)
-            mime_type = "application/pdf"
 
-        raw_doc = documentai.RawDocument(content=contents, mime_type=mime_type)
-        request = documentai.ProcessRequest(
-            name=PROCESSOR_NAME, raw_document=raw_doc
-        )
-        result = client.process_document(request=request)
-        document = result.document
+@router.get("/preprocess/stats")
+async def extraction_preprocess_stats():
+    """Images normalised, bytes saved and near-duplicate frames dropped."""
+    return preprocess_stats()
 
-        form_fields = []
-        for page in document.pages:
-            for field in page.form_fields:
-                field_name = get_text_from_text_anchor(document.text, field.field_name.text_anchor).strip()
-                field_value = get_text_from_text_anchor(document.text, field.field_value.text_anchor).strip()
 
-                form_fields.append({
-                    "name": field_name,
-                    "value": field_value,
-                    "confidence": field.field_value.confidence,
-                })
 
-        return ExtractResponse(
-            text=document.text,
-            form_fields=form_fields
+@router.post("/batch", response_model=BatchJobStatus, status_code=202, openapi_extra=UPLOAD_REQUEST_BODY)
+async def submit_batch(
+    request: Request,
+    detail: ExtractionDetail = Query(ExtractionDetail.fields, description="fields, fields+tables or full"),
+):
+    """Queue many documents (one PDF or image per file) for background OCR."""
+    job_dir = new_job_dir()
+    try:
+        uploads = await spool_request(
+            request, lambda index: new_document_dir(job_dir, index),
+            max_total_bytes=settings.batch_max_documents * settings.upload_max_file_bytes,
+            max_files=settings.batch_max_documents,
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    except Exception:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+
+    store = get_batch_store()
+    job_id = await run_in_threadpool(store.create_job, uploads, detail)
+    notify_batch_workers()
+    return await run_in_threadpool(store.job_status, job_id)
+
+
+@router.get("/batch/{job_id}", response_model=BatchJobStatus)
+async def batch_status(job_id: str):
+    status = await run_in_threadpool(get_batch_store().job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return status
+
+
+@router.get("/batch/{job_id}/results", response_model=BatchResultsPage, response_model_exclude_none=True)
+async def batch_results(
+    request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    store = get_batch_store()
+    status = await run_in_threadpool(store.job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    items = await run_in_threadpool(store.job_results, job_id, offset, limit)
+    return encode_response(request, {
+        "job_id": job_id,
+        "offset": offset,
+        "limit": limit,
+        "total": status["total"],
+        "items": [
+            {key: value for key, value in item.items() if value is not None}
+            for item in items
+        ],
+    })
@@ -1,11 +1,75 @@
+from enum import Enum
 from pydantic import BaseModel
 from typing import List, Optional
 
+class ExtractionDetail(str, Enum):
+    fields = "fields"
+    fields_tables = "fields+tables"
+    full = "full"
+
 class FormField(BaseModel):
     name: str
     value: str
     confidence: float
 
+class Table(BaseModel):
+    page_number: int
+    detected_columns: int
+    header_rows: List[List[str]] = []
+    body_rows: List[List[str]] = []
+
+class TextWithConfidence(BaseModel):
+    text: str
+    confidence: Optional[float] = None
+
+class PageFormField(BaseModel):
+    field_name: TextWithConfidence
+    field_value: TextWithConfidence
+
+class TableCell(BaseModel):
+    text: str
+    confidence: Optional[float] = None
+    row_span: int = 1
+    col_span: int = 1
+
+class PageTable(BaseModel):
+    detected_columns: int
+    header_rows: List[List[TableCell]] = []
+    body_rows: List[List[TableCell]] = []
+
+class Page(BaseModel):
+    page_number: int
+    form_fields: List[PageFormField] = []
+    tables: List[PageTable] = []
+
 class ExtractResponse(BaseModel):
     text: str
     form_fields: Optional[List[FormField]] = []
+    # Only present at detail=fields+tables / detail=full respectively
+    tables: Optional[List[Table]] = None
+    pages: Optional[List[Page]] = None
+
+
+class BatchJobStatus(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    total: int
+    pending: int
+    processing: int
+    done: int
+    failed: int
+
+class BatchDocumentResult(BaseModel):
+    index: int
+    filename: str
+    status: str
+    result: Optional[ExtractResponse] = None
+    error: Optional[str] = None
+
+class BatchResultsPage(BaseModel):
+    job_id: str
+    offset: int
+    limit: int
+    total: int
+    items: List[BatchDocumentResult]
@@ -0,0 +1,251 @@
+"""Upload ingestion for /extraction.
+
+The routes take no form parameters, so the request body is still unread when
+the handler starts: an oversized ``Content-Length`` is rejected from the header
+alone, and the multipart stream is then parsed part by part, each file written
+straight into the spool directory while the per-file and per-request limits are
+enforced. Nothing is buffered in memory or copied through Starlette's own
+temporary files first. Images are then handed to img2pdf by path and the
+combined PDF is written straight to disk.
+
+Peak memory per request is bounded by roughly
+``2 * UPLOAD_MAX_REQUEST_BYTES``: img2pdf's working set while it assembles
+the PDF, or the PDF bytes plus the copy inside the Document AI request,
+whichever is larger. Nothing else keeps a full copy of the upload.
+"""
+import mmap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional
+import img2pdf
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from App.core.config import settings
+
+MIME_MAP = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".tiff": "image/tiff",
+    ".tif": "image/tiff",
+}
+
+# OpenAPI description of the multipart body parsed by ``spool_request``
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        }
+                    },
+                },
+            }
+        },
+    }
+}
+
+
+@dataclass
+class SpooledUpload:
+    filename: str
+    ext: str
+    path: Path
+    size: int
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.ext == ".pdf"
+
+
+def file_extension(filename: Optional[str]) -> str:
+    return "." + (filename or "").lower().rsplit(".", 1)[-1]
+
+
+def validate_upload_type(filename: Optional[str]) -> str:
+    ext = file_extension(filename)
+    if ext not in MIME_MAP:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {ext}. Please upload PDF, PNG, JPEG, or TIFF."
+        )
+    return ext
+
+
+def check_content_length(content_length: Optional[str], max_bytes: Optional[int] = None):
+    """Reject a request from its header alone when it is obviously too big.
+
+    ``max_bytes`` defaults to ``UPLOAD_MAX_REQUEST_BYTES``.
+    """
+    if max_bytes is None:
+        max_bytes = settings.upload_max_request_bytes
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request exceeds {max_bytes} bytes."
+            )
+
+
+class _MultipartSpool:
+    """``MultipartParser`` callbacks that write each file part to disk."""
+
+    def __init__(self, dest_dir: Callable[[int], Path], field: str,
+                 max_total_bytes: int, max_files: Optional[int]):
+        self.dest_dir = dest_dir
+        self.field = field
+        self.max_total_bytes = max_total_bytes
+        self.max_files = max_files
+        self.uploads: List[SpooledUpload] = []
+        self.total = 0
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._out: Optional[BinaryIO] = None
+        self._current: Optional[SpooledUpload] = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        # Plain form fields and other file fields are skipped
+        if name != self.field or filename is None:
+            return
+
+        filename = filename.decode("utf-8", "replace")
+        ext = validate_upload_type(filename)
+        index = len(self.uploads)
+        if self.max_files is not None and index >= self.max_files:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {self.max_files} documents per request."
+            )
+        path = self.dest_dir(index) / f"upload-{index}{ext}"
+        self._current = SpooledUpload(filename, ext, path, 0)
+        self._out = path.open("wb")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._out is None:
+            return
+        size = end - start
+        self._current.size += size
+        self.total += size
+        if self._current.size > settings.upload_max_file_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{self._current.filename} exceeds {settings.upload_max_file_bytes} bytes."
+            )
+        if self.total > self.max_total_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload exceeds {self.max_total_bytes} bytes in total."
+            )
+        self._out.write(data[start:end])
+
+    def on_part_end(self):
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        self.uploads.append(self._current)
+        self._current = None
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+
+async def spool_request(
+    request: Request,
+    dest_dir: Callable[[int], Path],
+    max_total_bytes: Optional[int] = None,
+    max_files: Optional[int] = None,
+    field: str = "files",
+) -> List[SpooledUpload]:
+    """Stream the multipart body of ``request`` to disk, one file per part.
+
+    File ``i`` is written to ``dest_dir(i)``. ``max_total_bytes`` defaults to
+    ``UPLOAD_MAX_REQUEST_BYTES`` and is checked against ``Content-Length``
+    before any of the body is read.
+    """
+    if max_total_bytes is None:
+        max_total_bytes = settings.upload_max_request_bytes
+    check_content_length(request.headers.get("content-length"), max_total_bytes)
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+    spool = _MultipartSpool(dest_dir, field, max_total_bytes, max_files)
+    parser = MultipartParser(boundary, spool.callbacks())
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    finally:
+        spool.close()
+
+    if not spool.uploads:
+        raise HTTPException(status_code=422, detail=f"No files uploaded in '{field}'.")
+    return spool.uploads
+
+
+def assemble_pdf(uploads: List[SpooledUpload], workdir: Path) -> Path:
+    """Return a single PDF on disk for the uploads (blocking; run in a thread)."""
+    if len(uploads) == 1 and uploads[0].is_pdf:
+        return uploads[0].path
+
+    pdf_path = workdir / "combined.pdf"
+    with pdf_path.open("wb") as out:
+        # No CreationDate/ModDate, and the internal engine rather than pikepdf,
+        # which writes a random /ID: the same photos always give the same bytes
+        # and so the same OCR cache key
+        img2pdf.convert(
+            [str(u.path) for u in uploads], outputstream=out,
+            nodate=True, engine=img2pdf.Engine.internal,
+        )
+    return pdf_path
+
+
+def read_pdf(pdf_path: Path) -> bytes:
+    """Materialise the PDF once, from a memory map of the spooled file."""
+    with pdf_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[:]
@@ -0,0 +1,45 @@
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict
+from App.core.cache import TieredCache
+from App.core.config import settings
+
+
+@lru_cache
+def get_ocr_cache() -> TieredCache:
+    """Keyed by the sha256 of the exact bytes sent to Document AI (the PDF after
+    img2pdf), so re-uploading the same deal sheet or photo set is a cache hit."""
+    return TieredCache(
+        max_bytes=settings.ocr_cache_max_bytes,
+        ttl=settings.ocr_cache_ttl,
+        db_path=settings.ocr_cache_db_path or None,
+        disk_max_bytes=settings.ocr_cache_disk_max_bytes,
+    )
+
+
+_ocr_calls = 0
+_ocr_seconds = 0.0
+
+
+def ocr_cache_key(content: bytes, kind: str = "response") -> str:
+    """Content-addressed key; ``kind`` separates the different parsed shapes."""
+    return f"{kind}:{hashlib.sha256(content).hexdigest()}"
+
+
+def record_ocr_call(seconds: float):
+    """Track real Document AI latency so savings from hits can be estimated."""
+    global _ocr_calls, _ocr_seconds
+    _ocr_calls += 1
+    _ocr_seconds += seconds
+
+
+def ocr_cache_stats() -> Dict[str, Any]:
+    data = get_ocr_cache().info()
+    avg = _ocr_seconds / _ocr_calls if _ocr_calls else 0.0
+    data.update({
+        "ocr_calls": _ocr_calls,
+        "avg_ocr_seconds": round(avg, 3),
+        "ocr_calls_saved": data["hits"],
+        "estimated_seconds_saved": round(avg * data["hits"], 3),
+    })
+    return data
@@ -0,0 +1,182 @@
+"""Optional image normalisation before PDF assembly.
+
+Phone photos are usually 12 MP colour JPEGs that img2pdf embeds losslessly,
+which inflates the Document AI request and its latency. Each image is
+EXIF-rotated and stripped, converted to grayscale, and downscaled so its
+longest side fits ``PREPROCESS_MAX_PIXELS``. Pages shot at a slight angle
+are straightened by up to ``PREPROCESS_DESKEW_MAX_ANGLE`` degrees, then the
+image is re-encoded as JPEG tagged with ``PREPROCESS_DPI``. Near-duplicate
+frames, such as the same page shot twice, are dropped by comparing 64-bit
+difference hashes.
+
+The work is CPU-bound, so it runs in a process pool.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image, ImageOps, ImageStat
+from App.core.config import settings
+from .ingest import SpooledUpload
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Skew is estimated on a thumbnail of this size, in steps of DESKEW_STEP degrees
+DESKEW_SAMPLE_PIXELS = 600
+DESKEW_STEP = 0.5
+
+_stats = {
+    "images": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "duplicates_dropped": 0,
+}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Never fork the server: the event loop, gRPC channels and locks held by
+        # other threads would be copied into the child in whatever state they're in
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.preprocess_workers or None,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _pool
+
+
+def shutdown_preprocess_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair."""
+    small = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()  # one byte per pixel in mode "L"
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def estimate_skew(image: Image.Image, max_angle: float, step: float = DESKEW_STEP) -> float:
+    """Angle in degrees (counter-clockwise) that makes the text lines horizontal.
+
+    Projection profile: rotated so the lines are level, each row is either
+    all ink or all paper, so the row averages vary the most. The search runs
+    outwards from 0 and an angle must score clearly (1%) better to replace
+    the current one, so a page with no clear lines stays as it is.
+    """
+    sample = image.convert("L")
+    sample.thumbnail((DESKEW_SAMPLE_PIXELS, DESKEW_SAMPLE_PIXELS), Image.Resampling.BILINEAR)
+    # Ink bright on black, so the corners uncovered by rotating add nothing
+    ink = ImageOps.invert(sample)
+
+    steps = int(max_angle / step)
+    angles = [0.0] + [sign * i * step for i in range(1, steps + 1) for sign in (1, -1)]
+    best_angle, best_score = 0.0, -1.0
+    for angle in angles:
+        rotated = ink.rotate(angle, resample=Image.Resampling.BILINEAR, fillcolor=0) if angle else ink
+        rows = rotated.resize((1, rotated.height), Image.Resampling.BOX)
+        score = ImageStat.Stat(rows).var[0]
+        if score > best_score * 1.01:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def deskew(image: Image.Image, max_angle: float) -> Image.Image:
+    """Straighten a grayscale page photographed at up to ``max_angle`` degrees."""
+    if max_angle <= 0:
+        return image
+    angle = estimate_skew(image, max_angle)
+    if not angle:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def normalize_image(
+    src: str, dst: str, max_pixels: int, dpi: int, quality: int, deskew_max_angle: float = 0.0
+) -> Tuple[str, Optional[int]]:
+    """Write a normalised copy of ``src`` to ``dst``.
+
+    Returns the path to use and its hash. Multi-frame images (TIFF packets)
+    are passed through untouched with no hash.
+    """
+    with Image.open(src) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            return src, None
+
+        image = ImageOps.exif_transpose(image).convert("L")
+        image.thumbnail((max_pixels, max_pixels), Image.Resampling.LANCZOS)
+        # Hash before deskewing: the padding a rotation adds differs between shots
+        fingerprint = dhash(image)
+        image = deskew(image, deskew_max_angle)
+        # Saving without exif= drops the original metadata
+        image.save(dst, "JPEG", quality=quality, optimize=True, dpi=(dpi, dpi))
+    return dst, fingerprint
+
+
+def _is_duplicate(fingerprint: int, seen: List[int]) -> bool:
+    threshold = settings.preprocess_dedupe_distance
+    return any(bin(fingerprint ^ other).count("1") <= threshold for other in seen)
+
+
+async def preprocess_uploads(uploads: List[SpooledUpload], workdir: Path) -> List[SpooledUpload]:
+    """Normalise image uploads in the process pool and drop near-duplicates.
+
+    PDFs are left as they are. Upload order is preserved.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+
+    jobs = []
+    for index, upload in enumerate(uploads):
+        if upload.is_pdf:
+            jobs.append(None)
+            continue
+        jobs.append(loop.run_in_executor(
+            pool, normalize_image,
+            str(upload.path), str(workdir / f"normalized-{index}.jpg"),
+            settings.preprocess_max_pixels, settings.preprocess_dpi, settings.preprocess_jpeg_quality,
+            settings.preprocess_deskew_max_angle,
+        ))
+
+    results = await asyncio.gather(*(job for job in jobs if job is not None))
+    results = iter(results)
+
+    processed: List[SpooledUpload] = []
+    seen: List[int] = []
+    for upload, job in zip(uploads, jobs):
+        if job is None:
+            processed.append(upload)
+            continue
+
+        path, fingerprint = next(results)
+        if fingerprint is not None and _is_duplicate(fingerprint, seen):
+            _stats["duplicates_dropped"] += 1
+            continue
+        if fingerprint is not None:
+            seen.append(fingerprint)
+
+        path = Path(path)
+        size = path.stat().st_size
+        _stats["images"] += 1
+        _stats["bytes_in"] += upload.size
+        _stats["bytes_out"] += size
+        ext = ".jpg" if path != upload.path else upload.ext
+        processed.append(SpooledUpload(upload.filename, ext, path, size))
+
+    return processed
+
+
+def preprocess_stats() -> Dict[str, Any]:
+    data = dict(_stats)
+    data["bytes_saved"] = data["bytes_in"] - data["bytes_out"]
+    return data
@@ -0,0 +1,131 @@
+"""Near-duplicate detection for banked quiz questions.
+
+Each question is normalised, cut into character shingles and summarised by
+a MinHash signature. Signatures are bucketed by LSH bands in SQLite, so a
+lookup is a handful of indexed probes no matter how many questions are
+stored, and every worker sharing the bank database sees the same index.
+Candidates from the bands are confirmed by estimated Jaccard similarity.
+The index keeps at most ``QUIZ_DEDUPE_MAX_ENTRIES`` signatures and evicts
+the oldest first.
+"""
+import hashlib
+import random
+import re
+import sqlite3
+from array import array
+from typing import List, Optional
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+_rng = random.Random(0x5EED)  # fixed so signatures are stable across processes
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(text: str) -> set:
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> array:
+    hashes = [_hash64(s.encode("utf-8")) for s in shingles(text)]
+    return array("I", (min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMS))
+
+
+def similarity(left: array, right: array) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERM
+
+
+def band_keys(sig: array) -> List[int]:
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        keys.append(int.from_bytes(
+            hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest(), "little", signed=True
+        ))
+    return keys
+
+
+class NearDuplicateIndex:
+    """LSH index over question signatures; callers hold the connection's lock."""
+
+    def __init__(self, conn: sqlite3.Connection, threshold: float, max_entries: int):
+        self.conn = conn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS question_signatures (
+                question_id INTEGER PRIMARY KEY,
+                topic TEXT NOT NULL,
+                language TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS question_bands (
+                topic TEXT NOT NULL,
+                language TEXT NOT NULL,
+                band_key INTEGER NOT NULL,
+                question_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS question_bands_key ON question_bands (topic, language, band_key);
+            CREATE INDEX IF NOT EXISTS question_bands_question ON question_bands (question_id);
+        """)
+
+    def find(self, topic: str, language: str, sig: array) -> Optional[int]:
+        """Id of a stored near-duplicate of ``sig``, if any."""
+        keys = band_keys(sig)
+        placeholders = ",".join("?" * len(keys))
+        rows = self.conn.execute(
+            "SELECT DISTINCT s.question_id, s.signature FROM question_bands b"
+            " JOIN question_signatures s ON s.question_id = b.question_id"
+            f" WHERE b.topic = ? AND b.language = ? AND b.band_key IN ({placeholders})",
+            (topic, language, *keys),
+        ).fetchall()
+        for question_id, blob in rows:
+            if similarity(sig, array("I", blob)) >= self.threshold:
+                return question_id
+        return None
+
+    def add(self, question_id: int, topic: str, language: str, sig: array):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO question_signatures (question_id, topic, language, signature)"
+            " VALUES (?, ?, ?, ?)",
+            (question_id, topic, language, sig.tobytes()),
+        )
+        self.conn.executemany(
+            "INSERT INTO question_bands (topic, language, band_key, question_id) VALUES (?, ?, ?, ?)",
+            [(topic, language, key, question_id) for key in band_keys(sig)],
+        )
+
+    def evict(self) -> int:
+        """Drop the oldest signatures beyond ``max_entries``."""
+        size = self.conn.execute("SELECT COUNT(*) FROM question_signatures").fetchone()[0]
+        excess = size - self.max_entries
+        if excess <= 0:
+            return 0
+        cutoff = self.conn.execute(
+            "SELECT question_id FROM question_signatures ORDER BY question_id LIMIT 1 OFFSET ?",
+            (excess - 1,),
+        ).fetchone()[0]
+        self.conn.execute("DELETE FROM question_bands WHERE question_id <= ?", (cutoff,))
+        self.conn.execute("DELETE FROM question_signatures WHERE question_id <= ?", (cutoff,))
+        return excess
+
+    def size(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM question_signatures").fetchone()[0]
@@ -0,0 +1,309 @@
+"""Persistent quiz question bank.
+
+Questions are generated ahead of time per (topic, language) and stored in
+SQLite, so a quiz request is an indexed read instead of an LLM call. Each
+user's served questions are recorded so they are not repeated; when a user
+is running low on unseen questions for a topic, a background task tops the
+bank up. Only a cold topic makes a request wait for generation, and only
+until the questions it needs are banked. New
+questions that are near-duplicates of banked ones are rejected (see
+``dedupe``).
+"""
+import asyncio
+import json
+import logging
+import math
+import random
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from App.core.config import settings
+from .dedupe import NearDuplicateIndex, signature
+from .quiz import SUBTOPIC_HINTS, generate_questions
+
+logger = logging.getLogger(__name__)
+
+
+def topic_key(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def question_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class QuestionBank:
+    def __init__(self, db_path: str, dedupe_threshold: float = 0.7, dedupe_max_entries: int = 200_000):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                language TEXT NOT NULL,
+                question_key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (topic, language, question_key)
+            );
+            CREATE INDEX IF NOT EXISTS questions_topic ON questions (topic, language, id);
+            CREATE TABLE IF NOT EXISTS seen (
+                user_id TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                language TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                served_at REAL NOT NULL,
+                PRIMARY KEY (user_id, question_id)
+            );
+            CREATE INDEX IF NOT EXISTS seen_topic ON seen (user_id, topic, language);
+        """)
+        self.dedupe = NearDuplicateIndex(self._conn, dedupe_threshold, dedupe_max_entries)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def add(self, topic: str, language: str, questions: List[Dict[str, Any]]) -> int:
+        """Insert new questions, skipping exact and near-duplicates of banked ones."""
+        key = topic_key(topic)
+        now = time.time()
+        signatures = [signature(q["question"]) for q in questions]
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for question, sig in zip(questions, signatures):
+                if self.dedupe.find(key, language, sig) is not None:
+                    self.rejected += 1
+                    continue
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO questions (topic, language, question_key, data, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, language, question_key(question["question"]), json.dumps(question, ensure_ascii=False), now),
+                )
+                if not cur.rowcount:
+                    self.rejected += 1
+                    continue
+                self.dedupe.add(cur.lastrowid, key, language, sig)
+                added += 1
+            self.dedupe.evict()
+            self._conn.execute("COMMIT")
+        return added
+
+    def size(self, topic: str, language: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE topic = ? AND language = ?",
+                (topic_key(topic), language),
+            ).fetchone()[0]
+
+    def take(
+        self, topic: str, language: str, count: int, user_id: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Up to ``count`` questions; returns ``(questions, unseen_left)``.
+
+        With a ``user_id`` the oldest questions that user has not seen are
+        served and marked seen. Anonymous requests get a run of questions
+        starting at a random point in the bank.
+        """
+        key = topic_key(topic)
+        with self._lock:
+            if user_id is None:
+                rows = self._take_anonymous(key, language, count)
+                total = self._conn.execute(
+                    "SELECT COUNT(*) FROM questions WHERE topic = ? AND language = ?", (key, language)
+                ).fetchone()[0]
+                return [json.loads(row[1]) for row in rows], total
+
+            rows = self._conn.execute(
+                "SELECT q.id, q.data FROM questions q"
+                " WHERE q.topic = ? AND q.language = ? AND NOT EXISTS ("
+                "   SELECT 1 FROM seen s WHERE s.user_id = ? AND s.question_id = q.id)"
+                " ORDER BY q.id LIMIT ?",
+                (key, language, user_id, count),
+            ).fetchall()
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (user_id, topic, language, question_id, served_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(user_id, key, language, row[0], now) for row in rows],
+            )
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE topic = ? AND language = ?", (key, language)
+            ).fetchone()[0]
+            seen = self._conn.execute(
+                "SELECT COUNT(*) FROM seen WHERE user_id = ? AND topic = ? AND language = ?",
+                (user_id, key, language),
+            ).fetchone()[0]
+        return [json.loads(row[1]) for row in rows], total - seen
+
+    def _take_anonymous(self, key: str, language: str, count: int) -> List[tuple]:
+        low, high = self._conn.execute(
+            "SELECT MIN(id), MAX(id) FROM questions WHERE topic = ? AND language = ?", (key, language)
+        ).fetchone()
+        if low is None:
+            return []
+        start = random.randint(low, high)
+        rows = self._conn.execute(
+            "SELECT id, data FROM questions WHERE topic = ? AND language = ? AND id >= ?"
+            " ORDER BY id LIMIT ?",
+            (key, language, start, count),
+        ).fetchall()
+        if len(rows) < count:
+            rows += self._conn.execute(
+                "SELECT id, data FROM questions WHERE topic = ? AND language = ? AND id < ?"
+                " ORDER BY id LIMIT ?",
+                (key, language, start, count - len(rows)),
+            ).fetchall()
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            topics = self._conn.execute(
+                "SELECT topic, language, COUNT(*) FROM questions GROUP BY topic, language"
+            ).fetchall()
+            users = self._conn.execute("SELECT COUNT(DISTINCT user_id) FROM seen").fetchone()[0]
+            indexed = self.dedupe.size()
+        return {
+            "questions": sum(row[2] for row in topics),
+            "topics": [{"topic": t, "language": l, "questions": n} for t, l, n in topics],
+            "users": users,
+            "dedupe_indexed": indexed,
+            "duplicates_rejected": self.rejected,
+        }
+
+
+@lru_cache
+def get_question_bank() -> QuestionBank:
+    return QuestionBank(
+        settings.quiz_bank_db_path,
+        dedupe_threshold=settings.quiz_dedupe_threshold,
+        dedupe_max_entries=settings.quiz_dedupe_max_entries,
+    )
+
+
+class _Refill:
+    """One running refill and the requests waiting for part of it."""
+
+    def __init__(self):
+        self.added = 0
+        self.task: Optional[asyncio.Task] = None
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+
+    def progress(self, added: int):
+        self.added = added
+        for waiter in [w for w in self._waiters if added >= w[0]]:
+            self._waiters.remove(waiter)
+            if not waiter[1].done():
+                waiter[1].set_result(added)
+
+    def wait(self, minimum: int) -> asyncio.Future:
+        """Resolves with the count banked so far once ``minimum`` is reached,
+        or when the refill ends, whichever comes first."""
+        future = asyncio.get_running_loop().create_future()
+        if self.added >= minimum:
+            future.set_result(self.added)
+        else:
+            self._waiters.append((minimum, future))
+        return future
+
+    def finish(self, task: asyncio.Task):
+        waiters, self._waiters = self._waiters, []
+        for _, future in waiters:
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+
+_refills: Dict[Tuple[str, str], _Refill] = {}
+_llm_calls = 0
+
+
+async def _generate_into_bank(
+    topic: str, language: str, count: int, on_progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """Fan out small concurrent requests and stop once ``count`` new questions
+    are banked; the requests still running are cancelled."""
+    global _llm_calls
+    bank = get_question_bank()
+    per_call = settings.quiz_fanout_batch
+    calls = min(math.ceil(count / per_call) + settings.quiz_fanout_spare, settings.quiz_fanout_max_calls)
+    angles = random.sample(SUBTOPIC_HINTS, len(SUBTOPIC_HINTS))
+
+    tasks = [
+        asyncio.create_task(generate_questions(topic, language, per_call, angles[i % len(angles)]))
+        for i in range(calls)
+    ]
+    _llm_calls += calls
+    added = 0
+    errors = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                questions = await next_done
+            except Exception as e:
+                errors.append(e)
+                continue
+            added += await run_in_threadpool(bank.add, topic, language, questions)
+            if on_progress is not None:
+                on_progress(added)
+            if added >= count:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    logger.info("quiz bank: +%d questions for %r (%s) from %d calls", added, topic_key(topic), language, calls)
+    if not added and errors:
+        raise errors[0]
+    return added
+
+
+def _refill_for(topic: str, language: str, minimum: int = 0) -> _Refill:
+    """The in-flight refill for this topic, or a new one; never two at once."""
+    key = (topic_key(topic), language)
+    refill = _refills.get(key)
+    if refill is None or refill.task.done():
+        count = max(minimum, settings.quiz_bank_refill_batch)
+        refill = _Refill()
+        refill.task = asyncio.create_task(_generate_into_bank(topic, language, count, refill.progress))
+        _refills[key] = refill
+        refill.task.add_done_callback(lambda t: _refill_done(key, refill, t))
+    return refill
+
+
+def _refill_done(key: Tuple[str, str], refill: _Refill, task: asyncio.Task):
+    refill.finish(task)
+    if _refills.get(key) is refill:
+        del _refills[key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("quiz bank: refill for %r failed: %s", key, task.exception())
+
+
+async def fill_bank(topic: str, language: str, minimum: int) -> int:
+    """Wait until at least ``minimum`` new questions are banked (cold topic).
+
+    The refill keeps topping the bank up to ``QUIZ_BANK_REFILL_BATCH`` in the
+    background, and a caller that goes away does not cancel it.
+    """
+    return await _refill_for(topic, language, minimum).wait(minimum)
+
+
+def schedule_refill(topic: str, language: str):
+    _refill_for(topic, language)
+
+
+def bank_stats() -> Dict[str, Any]:
+    data = get_question_bank().stats()
+    data.update({"llm_calls": _llm_calls, "refills_running": len(_refills)})
+    return data
@@ -0,0 +1,103 @@
+"""LLM generation of quiz questions; feeds the question bank."""
+import json
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from App.core.config import settings
+from App.core.llm import groq_client
+from App.services.quiz.quiz_schemas import QuizQuestion
+
+QUIZ_GENERATION_PROMPT = """
+You are an expert car sales trainer. Generate multiple-choice quiz questions to test consumer knowledge about car buying, dealership practices, financing, trade-ins, GAP Logic, VSC Logic, Lease Audit, APR or warranties and others. Always provide new, unique questions that are not commonly found online. 
+MAKE SURE YOU PROVIDE THE ANSWERS CORRECTLY.
+
+Respond only with a valid JSON array. Do not use markdown formatting like ```json.
+
+IMPORTANT: You MUST generate exactly the number of quiz questions the user asks for.
+Return them strictly as a JSON array of that length, no more and no less.
+
+
+Each object in the array should have the following structure:
+- question: A string representing the quiz question.
+- options: An object with keys "A", "B", "C", and "D", and values being the corresponding answer texts.
+- correct_answer: One of the keys "A", "B", "C", or "D", corresponding to the correct option.
+- explanation: A detailed at least 5 lined explanation explaining why the correct answer is correct. IN CHILD FRIENDLY ANALOGY.
+
+The entire output should be in the language requested by the user.
+Example format:
+
+[
+  {
+    "question": "What is the purpose of a vehicle history report when buying a used car?",
+    "options": {
+      "A": "To determine the car's fuel efficiency",
+      "B": "To check for past accidents and title issues",
+      "C": "To find out the original price of the car",
+      "D": "To estimate the car's future resale value"
+    },
+    "correct_answer": "B",
+    "explanation": "A vehicle history report provides important information about a used car, including any past accidents, title issues, service history, and whether the car has been reported as stolen."
+  }
+]
+"""
+
+# Completion tokens per question (question, four options, 5-line explanation)
+TOKENS_PER_QUESTION = 300
+
+# Angles handed to parallel requests for the same topic so they overlap less
+SUBTOPIC_HINTS = (
+    "financing, APR and monthly payments",
+    "GAP insurance and vehicle service contracts",
+    "leases, money factor and residual value",
+    "trade-ins and negative equity",
+    "dealer fees and add-on products",
+    "negotiation tactics and the F&I office",
+    "warranties, inspections and vehicle history",
+    "credit scores and loan terms",
+)
+
+
+def parse_questions(raw_output: str) -> List[Dict[str, Any]]:
+    """Decode the model's array, keeping only well-formed questions."""
+    cleaned = raw_output.strip().strip("`").strip()
+    if cleaned.lower().startswith("json"):
+        cleaned = cleaned[len("json"):].strip()
+
+    data = json.loads(cleaned)
+    if isinstance(data, dict):
+        data = [data]
+
+    questions = []
+    for item in data:
+        try:
+            question = QuizQuestion(**item)
+        except (TypeError, ValidationError):
+            continue
+        if question.correct_answer in question.options:
+            questions.append(question.model_dump())
+    return questions
+
+
+async def generate_questions(
+    topic: str, language: str, count: int, angle: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    system_prompt = QUIZ_GENERATION_PROMPT + f"\n\nFocus on this topic: {topic}"
+    if angle:
+        system_prompt += f"\nWhere it fits the topic, look at it from this angle: {angle}"
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": (
+                f"Generate exactly {count} unique quiz question(s) in {language}. "
+                f"Return only a JSON array of length {count}."
+            ),
+        },
+    ]
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": TOKENS_PER_QUESTION * count,
+    }
+    data = await groq_client.chat(payload, timeout=30, label="quiz.generate")
+    return parse_questions(data["choices"][0]["message"]["content"])
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 from pydantic import BaseModel
 
 class QuizQuestion(BaseModel):
@@ -9,4 +9,5 @@ class QuizQuestion(BaseModel):
 
 class QuizRequest(BaseModel):
     user_input: str
-    language:str
\ No newline at end of file
+    language:str
+    user_id: Optional[str] = None  # enables "already seen" tracking
@@ -0,0 +1,88 @@
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+from App.core.cache import TieredCache
+from App.core.config import settings
+from . import pre_extract, scoring
+from .rating import audit_narrative_prompt, audit_system_prompt
+from .rating_schema import DealInput
+
+# /rating/ and /rating/stream score a deal the same way but write different
+# narratives (one JSON completion vs. a streamed prose one), so they never
+# share entries
+AUDIT = "audit"
+STREAM = "stream"
+
+
+@lru_cache
+def get_audit_cache() -> TieredCache:
+    """Finished audits, so refreshing or sharing a result page does not pay for
+    another LLM generation."""
+    return TieredCache(
+        max_bytes=settings.rating_cache_max_bytes,
+        ttl=settings.rating_cache_ttl,
+        db_path=settings.rating_cache_db_path or None,
+        disk_max_bytes=settings.rating_cache_disk_max_bytes,
+    )
+
+
+@lru_cache
+def audit_version() -> str:
+    """Changes whenever a prompt, ``GROQ_MODEL``, the scoring rules or the
+    pre-extraction rules do, which orphans older entries."""
+    digest = hashlib.sha256()
+    for part in (audit_system_prompt, audit_narrative_prompt, settings.GROQ_MODEL):
+        digest.update(part.encode("utf-8") + b"\0")
+    for module in (scoring, pre_extract):
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _canonical_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_deal(deal: DealInput) -> Dict[str, Any]:
+    """Whitespace- and order-insensitive form of a deal; OCR of the same
+    document always produces the same canonical form."""
+    lines = [" ".join(line.split()) for line in deal.text.splitlines()]
+    fields = sorted(
+        (
+            (
+                " ".join(f.name.split()).lower(),
+                _canonical_value(f.value),
+                round(f.confidence, 2) if f.confidence is not None else None,
+            )
+            for f in deal.form_fields
+        ),
+        # Values mix str and numbers, and confidence may be None
+        key=lambda field: json.dumps(field, ensure_ascii=False, default=str),
+    )
+    return {"text": [line for line in lines if line], "form_fields": fields}
+
+
+def audit_cache_key(deal: DealInput, kind: str = AUDIT) -> str:
+    body = json.dumps(canonical_deal(deal), ensure_ascii=False, sort_keys=True, default=str)
+    return f"{kind}:{audit_version()}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+async def get_cached_audit(key: str) -> Optional[Dict[str, Any]]:
+    return await get_audit_cache().aget(key)
+
+
+async def store_audit(key: str, audit: Dict[str, Any]):
+    # Error results are not cached so a transient failure is retried next time
+    if "error" not in audit:
+        await get_audit_cache().aset(key, audit)
+
+
+def audit_cache_stats() -> Dict[str, Any]:
+    data = get_audit_cache().info()
+    data["version"] = audit_version()
+    return data
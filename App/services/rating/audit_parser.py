@@ -0,0 +1,181 @@
+"""Tolerant parsing of the audit completion.
+
+The model's JSON is occasionally wrapped in code fences, followed by prose,
+left with trailing commas or cut off at ``max_tokens``. Rather than throwing
+away the whole generation, the text is repaired, validated field by field
+against ``AuditOutput``, and only what is still missing is requested again.
+"""
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from pydantic import ValidationError
+from .rating_schema import AuditNarrative, AuditOutput
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+CLOSERS = {"{": "}", "[": "]"}
+
+# Sections a complete audit must have; lease_audit is null for purchases
+REQUIRED_SECTIONS = tuple(k for k in AuditNarrative.model_fields if k != "lease_audit")
+
+# Repair attempts at earlier cut points before giving up
+MAX_CUTS = 32
+
+_outcomes = Counter()
+
+
+def strip_code_fences(text: str) -> str:
+    match = FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _drop_trailing_commas(text: str) -> str:
+    """Remove commas directly before ``}``/``]``, ignoring string contents."""
+    out = []
+    in_string = escape = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == ",":
+            rest = text[i + 1:].lstrip()
+            if not rest or rest[0] in "}]":
+                continue
+        out.append(c)
+    return "".join(out)
+
+
+def repair_candidates(text: str) -> List[str]:
+    """Closed-up versions of ``text``, longest first.
+
+    A complete top-level object is returned as-is (trailing prose dropped).
+    A truncated one is closed where it stopped, then at each earlier comma,
+    so a dangling ``"key":`` or half-written literal is cut off.
+    """
+    start = text.find("{")
+    if start == -1:
+        return []
+    text = text[start:]
+
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = escape = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in CLOSERS:
+            stack.append(CLOSERS[c])
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return [text[:i + 1]]
+        elif c == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    closing = "".join(reversed(stack))
+    tail = text[:-1] if escape else text
+    candidates = [tail + ('"' if in_string else "") + closing]
+    for pos, closers in reversed(cuts[-MAX_CUTS:]):
+        candidates.append(text[:pos] + closers)
+    return candidates
+
+
+def loads_tolerant(text: str) -> Tuple[Dict[str, Any], bool]:
+    """Parse a completion into a dict; returns ``(data, repaired)``.
+
+    Raises ``json.JSONDecodeError`` if no object can be recovered.
+    """
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+
+    for candidate in repair_candidates(strip_code_fences(text)):
+        try:
+            data = json.loads(_drop_trailing_commas(candidate))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data, True
+    raise json.JSONDecodeError("No JSON object could be recovered", text, 0)
+
+
+def validate_audit_output(data: Dict[str, Any]) -> AuditOutput:
+    """Validate against ``AuditOutput``, dropping the fields that fail instead
+    of rejecting the whole response."""
+    data = {k: data.get(k) for k in ("deal", "narrative")}
+    for section in ("deal", "narrative"):
+        if not isinstance(data[section], dict):
+            data[section] = None
+        else:
+            data[section] = dict(data[section])
+
+    while True:
+        try:
+            return AuditOutput.model_validate(data)
+        except ValidationError as e:
+            for error in e.errors():
+                loc = error["loc"]
+                part = data.get(loc[0]) if loc else None
+                if len(loc) >= 2 and isinstance(part, dict) and loc[1] in part:
+                    part.pop(loc[1])
+                elif loc:
+                    data[loc[0]] = None
+                else:
+                    raise
+
+
+def _is_blank(value) -> bool:
+    return not value or not value.strip() or value.strip().lower() == "none"
+
+
+def missing_fields(output: AuditOutput) -> List[str]:
+    """``"deal"`` and/or the required narrative sections that are absent or empty."""
+    missing = [] if output.deal is not None else ["deal"]
+    narrative = output.narrative or AuditNarrative()
+    for section in REQUIRED_SECTIONS:
+        if _is_blank(getattr(narrative, section)):
+            missing.append(section)
+    return missing
+
+
+def merge_fix(output: AuditOutput, fix: AuditOutput) -> AuditOutput:
+    deal = output.deal or fix.deal
+    narrative = (output.narrative or AuditNarrative()).model_dump()
+    if fix.narrative is not None:
+        for section, value in fix.narrative.model_dump().items():
+            if not _is_blank(value) and _is_blank(narrative.get(section)):
+                narrative[section] = value
+    return AuditOutput(deal=deal, narrative=AuditNarrative(**narrative))
+
+
+def record_parse_outcome(outcome: str):
+    """``clean``, ``repaired``, ``fixed`` (follow-up filled the gaps),
+    ``partial`` (gaps left to defaults) or ``failed`` (client must retry)."""
+    _outcomes[outcome] += 1
+
+
+def parse_stats() -> Dict[str, Any]:
+    total = sum(_outcomes.values())
+    data = dict.fromkeys(("clean", "repaired", "fixed", "partial", "failed"), 0)
+    data.update(_outcomes)
+    data["total"] = total
+    data["full_retry_rate"] = round(_outcomes["failed"] / total, 4) if total else 0.0
+    return data
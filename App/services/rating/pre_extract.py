@@ -0,0 +1,314 @@
+"""Local field pre-extraction for rating prompts.
+
+Pulls the facts the scoring engine needs (VIN, date, prices, APR, term,
+GAP/VSC/add-ons, names) out of ``DealInput`` with label dictionaries and
+regexes. Confident values are sent to the model as a compact summary. Only
+the lines nothing matched, and the fields we are unsure of, go along as raw
+text, so a long multi-page contract no longer costs thousands of input
+tokens per audit.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from App.core.config import settings
+from .rating_schema import DealInput
+from .scoring import fluff_category
+
+# Field -> labels, most specific first. Labels are matched case-insensitively
+# against a whole form field name or OCR line label, optionally followed by
+# words that are neutral for that kind of field ("Buyer Name", "GAP
+# Premium", "Term (Months)"). Any other trailing words mean a different
+# field ("Buyer Address", "Dealer Fee", "Service Contract Months").
+MONEY_LABELS = {
+    "selling_price": ("selling price", "sale price", "cash price", "purchase price", "total price", "vehicle price"),
+    "msrp": ("msrp", "manufacturer's suggested retail price", "sticker price"),
+    "down_payment": ("down payment", "cash down", "total down", "downpayment"),
+    "gap_price": ("guaranteed asset protection", "gap insurance", "gap waiver", "gap contract", "gap"),
+    "vsc_price": ("vehicle service contract", "service contract", "extended warranty", "mechanical breakdown", "vsc"),
+}
+NUMBER_LABELS = {
+    "apr": ("annual percentage rate", "apr", "interest rate"),
+    "term_months": ("term in months", "number of payments", "term", "months"),
+    "mileage": ("odometer", "mileage", "miles"),
+    "money_factor": ("money factor",),
+}
+TEXT_LABELS = {
+    "buyer_name": ("buyer name", "buyer", "customer name", "customer", "purchaser", "borrower", "applicant", "client"),
+    "dealer_name": ("dealership", "dealer name", "dealer", "seller", "vendor", "store"),
+    "vin_number": ("vin", "vin number", "vehicle identification number"),
+    "date": ("contract date", "purchase date", "date of sale", "date"),
+}
+
+MONEY_SUFFIXES = {"price", "amount", "cost", "premium", "total"}
+NUMBER_SUFFIXES = {"rate", "months", "reading"}
+TEXT_SUFFIXES = {"name"}
+# Trailing words that always turn a label into a different field
+DENY_WORDS = {"address", "phone", "fee", "fees", "number", "license", "birth", "signature"}
+LABEL_WORD = re.compile(r"[a-z0-9']+")
+
+VIN_PATTERN = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b")
+AMOUNT_PATTERN = re.compile(r"\$?\s*(-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:\.\d+)?)")
+DATE_PATTERNS = (
+    (re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), "%Y-%m-%d"),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b"), "%m/%d/%Y"),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{2})\b"), "%m/%d/%y"),
+    (re.compile(r"\b([A-Z][a-z]{2,8})\.? (\d{1,2}),? (\d{4})\b"), None),
+)
+# "Cash Price ........ $25,000.00" / "APR 6.9 %" style lines without a colon
+LINE_WITH_AMOUNT = re.compile(r"^([A-Za-z][^$\d:]{1,40}?)[\s.]*\$?\s*(-?[\d,]+(?:\.\d+)?\s*%?)$")
+
+_VIN_VALUES = {
+    **{str(d): d for d in range(10)},
+    **dict(zip("ABCDEFGH", range(1, 9))),
+    **dict(zip("JKLMN", range(1, 6))), "P": 7, "R": 9,
+    **dict(zip("STUVWXYZ", range(2, 10))),
+}
+_VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+TEXT_MATCH_CONFIDENCE = 0.8
+
+# Below the confidence threshold when read from OCR lines, but still better
+# than nothing if the model returns null for them
+FALLBACK_FIELDS = ("buyer_name", "dealer_name")
+
+
+def vin_check_digit_valid(vin: str) -> bool:
+    """ISO 3779 / North American check digit in position 9."""
+    total = sum(_VIN_VALUES[c] * w for c, w in zip(vin, _VIN_WEIGHTS))
+    expected = total % 11
+    return vin[8] == ("X" if expected == 10 else str(expected))
+
+
+def find_vin(text: str) -> Tuple[Optional[str], float]:
+    """First check-digit-valid VIN, else the first VIN-shaped token at low confidence."""
+    candidates = VIN_PATTERN.findall(text.upper())
+    for vin in candidates:
+        if not vin.isdigit() and vin_check_digit_valid(vin):
+            return vin, 1.0
+    for vin in candidates:
+        if not vin.isdigit():
+            return vin, 0.5
+    return None, 0.0
+
+
+def parse_date(value: str) -> Optional[str]:
+    for pattern, fmt in DATE_PATTERNS:
+        match = pattern.search(value)
+        if not match:
+            continue
+        try:
+            if fmt is None:
+                month, day, year = match.groups()
+                parsed = datetime.strptime(f"{month[:3]} {day} {year}", "%b %d %Y")
+            else:
+                parsed = datetime.strptime("-".join(match.groups()), fmt.replace("/", "-"))
+        except ValueError:
+            continue
+        return parsed.date().isoformat()
+    return None
+
+
+def parse_amount(value: str) -> Optional[float]:
+    match = AMOUNT_PATTERN.search(value)
+    if not match:
+        return None
+    try:
+        return float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def split_line(line: str) -> Optional[Tuple[str, str]]:
+    """Split an OCR line into ``(label, value)`` if it looks like one."""
+    name, sep, value = line.partition(":")
+    if sep and 0 < len(name.strip()) <= 40 and value.strip():
+        return name, value
+    match = LINE_WITH_AMOUNT.match(line)
+    return match.groups() if match else None
+
+
+def _label_for(name: str, labels: Dict[str, Iterable[str]], suffixes: Set[str]) -> Optional[str]:
+    words = LABEL_WORD.findall(name.lower())
+    for field, candidates in labels.items():
+        for label in candidates:
+            label_words = label.split()
+            if words[:len(label_words)] != label_words:
+                continue
+            rest = words[len(label_words):]
+            if any(word in DENY_WORDS for word in rest):
+                continue
+            if all(word in suffixes for word in rest):
+                return field
+    return None
+
+
+class PreExtraction:
+    """Result of the local pass: confident fields, unsure fields and raw remainder.
+
+    A field read with two different values is a conflict: it is left to the
+    model, which gets both candidates and the lines they came from.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.confidence: Dict[str, float] = {}
+        self.candidates: Dict[str, List[Any]] = {}
+        self.sources: Dict[str, List[str]] = {}
+        self.add_ons: List[Dict[str, Any]] = []
+        self.remainder: List[str] = []
+
+    def offer(self, field: str, value: Any, confidence: float, source: Optional[str] = None):
+        if value is None or value == "":
+            return
+        if source:
+            self.sources.setdefault(field, []).append(source)
+        candidates = self.candidates.setdefault(field, [])
+        if value not in candidates:
+            candidates.append(value)
+        if confidence > self.confidence.get(field, -1.0):
+            self.values[field] = value
+            self.confidence[field] = confidence
+
+    @property
+    def conflicts(self) -> Dict[str, List[Any]]:
+        return {k: v for k, v in self.candidates.items() if len(v) > 1}
+
+    @property
+    def confident(self) -> Dict[str, Any]:
+        threshold = settings.rating_preextract_min_confidence
+        conflicts = self.conflicts
+        return {
+            k: v for k, v in self.values.items()
+            if self.confidence[k] >= threshold and k not in conflicts
+        }
+
+    @property
+    def uncertain(self) -> Dict[str, Any]:
+        threshold = settings.rating_preextract_min_confidence
+        conflicts = self.conflicts
+        data = {
+            k: v for k, v in self.values.items()
+            if self.confidence[k] < threshold and k not in conflicts
+        }
+        data.update(conflicts)
+        return data
+
+    @property
+    def fallbacks(self) -> Dict[str, Any]:
+        """Unverified names to use when the model has none."""
+        uncertain = self.uncertain
+        return {k: uncertain[k] for k in FALLBACK_FIELDS if k in uncertain and k not in self.conflicts}
+
+    def deal_fields(self) -> Dict[str, Any]:
+        """Confident values in ``DealFields`` shape."""
+        data = dict(self.confident)
+        add_ons = {}
+        for add_on in self.add_ons:
+            add_ons.setdefault(add_on["name"].lower(), add_on)
+        if add_ons:
+            data["add_ons"] = list(add_ons.values())
+        return data
+
+    def prompt_payload(self) -> Dict[str, Any]:
+        # The lines behind a conflict go back to the model alongside the rest
+        lines = list(self.remainder)
+        for field in self.conflicts:
+            lines += [line for line in self.sources.get(field, []) if line not in lines]
+        remainder = "\n".join(lines)
+        limit = settings.rating_remainder_max_chars
+        if len(remainder) > limit:
+            remainder = remainder[:limit]
+        return {
+            "extracted": self.deal_fields(),
+            "unverified": self.uncertain,
+            "remainder": remainder,
+        }
+
+
+def _consume(result: PreExtraction, name: str, value: str, confidence: float, source: str) -> bool:
+    """Route one label/value pair to a field; False if nothing recognised it."""
+    field = _label_for(name, MONEY_LABELS, MONEY_SUFFIXES)
+    if field:
+        result.offer(field, parse_amount(value), confidence, source)
+        return True
+
+    field = _label_for(name, NUMBER_LABELS, NUMBER_SUFFIXES)
+    if field:
+        number = parse_amount(value)
+        if field == "term_months" and number is not None:
+            number = int(number)
+        result.offer(field, number, confidence, source)
+        return True
+
+    # Before the text labels so "VIN Etch" is an add-on, not a VIN
+    if fluff_category(name):
+        price = parse_amount(value)
+        if price is not None:
+            result.add_ons.append({"name": name.strip(), "price": price})
+            return True
+
+    field = _label_for(name, TEXT_LABELS, TEXT_SUFFIXES)
+    if field == "vin_number":
+        vin, vin_confidence = find_vin(value)
+        result.offer(field, vin, min(confidence, vin_confidence) if vin else 0.0, source)
+        return vin is not None
+    if field == "date":
+        result.offer(field, parse_date(value), confidence, source)
+        return True
+    if field:
+        result.offer(field, value.strip().title(), confidence * 0.9, source)
+        return True
+
+    return False
+
+
+def pre_extract(deal: DealInput) -> PreExtraction:
+    result = PreExtraction()
+
+    for form_field in deal.form_fields:
+        if form_field.value is None:
+            continue
+        confidence = form_field.confidence if form_field.confidence is not None else TEXT_MATCH_CONFIDENCE
+        line = f"{form_field.name}: {form_field.value}"
+        if not _consume(result, form_field.name, str(form_field.value), confidence, line):
+            result.remainder.append(line)
+
+    for line in deal.text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        pair = split_line(line)
+        if pair and _consume(result, pair[0], pair[1], TEXT_MATCH_CONFIDENCE, line):
+            continue
+        # Long lines without digits or a label are contract boilerplate; short
+        # ones (dealer header, vehicle description) still help the narrative
+        if len(line) <= 60 or ":" in line or any(c.isdigit() for c in line):
+            result.remainder.append(line)
+
+    if "vin_number" not in result.values:
+        vin, confidence = find_vin(deal.text)
+        result.offer("vin_number", vin, confidence)
+    if "date" not in result.values:
+        result.offer("date", parse_date(deal.text), 0.5)
+
+    return result
+
+
+def merge_deal_fields(
+    model_deal: Dict[str, Any], local: Dict[str, Any], fallbacks: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Model output with the confident local values laid over it, and
+    ``fallbacks`` filling fields the model left empty."""
+    merged = dict(model_deal or {})
+    for field, value in (fallbacks or {}).items():
+        if merged.get(field) in (None, ""):
+            merged[field] = value
+    for field, value in local.items():
+        if field == "add_ons":
+            add_ons = {a["name"].lower(): a for a in merged.get("add_ons") or [] if a.get("name")}
+            for add_on in value:
+                add_ons[add_on["name"].lower()] = add_on
+            merged["add_ons"] = list(add_ons.values())
+        else:
+            merged[field] = value
+    return merged
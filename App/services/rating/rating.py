@@ -1,261 +1,88 @@
-import os
-import requests
-from typing import Dict
-from dotenv import load_dotenv
 import json
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import httpx
+from App.core.config import settings
+from App.core.llm import groq_client
+
+logger = logging.getLogger(__name__)
+
+# Completion tokens per narrative section; the prompt turns these into word
+# limits (~0.75 words per token) and max_tokens is their sum plus the deal block
+SECTION_TOKEN_BUDGETS = {
+    "vehicle_overview": 200,
+    "trust_score_summary": 350,
+    "market_comparison": 300,
+    "gap_logic": 200,
+    "vsc_logic": 200,
+    "apr_bonus_rule": 200,
+    "lease_audit": 200,
+    "negotiation_insight": 350,
+    "final_recommendation": 300,
+}
+NARRATIVE_SECTIONS = tuple(SECTION_TOKEN_BUDGETS)
+DEAL_TOKEN_BUDGET = 400
+AUDIT_MAX_TOKENS = DEAL_TOKEN_BUDGET + sum(SECTION_TOKEN_BUDGETS.values())
 
+SECTION_LENGTHS = "Length limits: " + ", ".join(
+    f"{section} <= {budget * 3 // 4} words" for section, budget in SECTION_TOKEN_BUDGETS.items()
+) + "."
 
-load_dotenv()  # loads variables from .env into environment
-
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Set in environment
-GROQ_MODEL = os.getenv("GROQ_MODEL")  # Example Groq model
-
+# Scoring is done by App.services.rating.scoring; the model only extracts the
+# facts the engine needs and writes the consumer-facing narrative.
 audit_system_prompt = """
-You are **SmartBuyer AI Audit Engine**, the definitive scoring and auditing system for auto finance deals.  
-Your task is to evaluate GAP, VSC, Add-ons, APR, loan term risk, protection bundling, backend abuse, and lease fairness.  
-You must apply the rules **exactly as written** and return results in the JSON schema, while also providing descriptive insights.
-
-
-### OCR DATA ANALYSIS & NAME EXTRACTION
-**You are analyzing OCR data from multiple document images. The data may be messy, incomplete, or spread across multiple files.**
-
-**Name Extraction from OCR Patterns:**
-- Look for buyer names in: "Buyer:", "Customer:", "Client:", "Applicant:", "borrower", "purchaser"
-- Look for dealer names in: "Dealer:", "Dealership:", "Seller:", "Vendor:", "Salesperson:", "Store:"
-- Handle OCR errors and inconsistencies in spelling and formatting
-- Extract names even if they appear in different formats across multiple images
-
-**Specific OCR Patterns to Recognize:**
-- "Salesperson: Dylan Herlehy" → dealer_name: "Dylan Herlehy" (salesperson represents dealer)
-- "buyer_name": "Thomas Gafford" → buyer_name: "Thomas Gafford"  
-- "Shottenkirk NISSAN" → dealer_name: "Shottenkirk Nissan"
-- Names might be split across different images/files
-- Text might have OCR errors like "reso" instead of "buyer" or missing characters
-
-**Additional Fields to Extract:**
-- Selling Price: Look for "Sale Price:", "Purchase Price:", "Total Price:", "Amount Financed:"
-- VIN Number: Look for "VIN:", "Vehicle Identification Number:", typically 17-character alphanumeric code
-- Date: Look for "Date:", "Contract Date:", "Purchase Date:", or any standard date format (MM/DD/YYYY, YYYY-MM-DD, etc.)
-- Extract these even if formatting varies across documents
-
-**Confidence Guidelines for OCR Data:**
-- Extract names even with minor OCR errors
-- Standardize formatting (capitalize proper names)
-- If you find multiple potential names, choose the most likely based on context
-- Prefer clearly labeled fields over inferred names
-
----
-
-### PURPOSE
-This document defines the **complete SmartBuyer AI scoring logic** for backend development, scoring engine tuning, and audit transparency.  
-Beyond raw scoring, the AI must produce **explanations, comparisons, and insights** to guide consumers.
-
----
-
-### SCORING FRAMEWORK
-- Start every quote at **100 points**.  
-- Deduct points according to violations.  
-- Apply bonuses only if criteria are met.  
-- Rule precedence: **Critical > Red > Soft > Advisory > Bonus**.  
-- No hidden penalties outside these rules.  
-
----
-
-### THREE-COLOR FLAG SYSTEM
-You must categorize all findings into three flag types:
-
-**RED FLAGS** (Critical Issues):
-- Severe violations that significantly impact deal fairness
-- Overpriced items beyond acceptable caps
-- Hidden fees or unfavorable financing terms
-- Bundle abuse or excessive backend totals
-- Each red flag carries point deductions
-
-**GREEN FLAGS** (Positive Aspects):
-- Transparent pricing and competitive market rates
-- Favorable financing options
-- Properly priced protection products
-- APR bonuses earned
-- Each green flag may contribute to score improvements
-
-**BLUE FLAGS** (Advisory/Neutral Items):
-- Minor price variances
-- Non-standard add-ons that aren't excessive
-- Limited warranty coverage notes
-- Missing protection advisories
-- These flags don't always affect scoring but provide context
-
----
-
-### AUDIT RULES
-
-**GAP Logic (Guaranteed Asset Protection)**  
-- **Purpose**: GAP covers the difference between loan balance and insurance payout if the car is totaled. It prevents buyers from being financially "upside down."  
-- **Caps**:  
-  • Lesser of $1,200 or 3% MSRP (or $1,500 if MSRP ≥ $60,000).  
-- **Scoring**:  
-  • GAP > cap → **Overpriced GAP = RED FLAG (-10 points)**  
-  • GAP Missing = BLUE FLAG (advisory only) if: Term ≥ 75 months AND Down Payment = $0 AND GAP not listed.  
-- **Fair Deal**: GAP at/below cap earns GREEN FLAG, no deduction.  
-
-**VSC Logic (Vehicle Service Contract / Extended Warranty)**  
-- **Purpose**: VSC protects against repair costs after factory warranty ends. Strongly relevant for long terms or high mileage.  
-- **Caps**:  
-  • Lesser of 15% MSRP or tiered limits: $4,000 (MSRP < $40K), $6,000 (MSRP ≥ $40K).  
-- **Scoring**:  
-  • VSC > cap → **Overpriced VSC = RED FLAG (-10 points)**  
-  • Missing VSC = BLUE FLAG (advisory only) if Mileage ≥ 60K AND Term ≥ 72 months AND no VSC.  
-- **Fair Deal**: Priced under cap → GREEN FLAG, no penalty.  
-
-**Add-On / Fluff Detection**  
-- Fluff = Nitrogen, VIN Etch, Key Replacement, Paint/Interior Protection, Theft/GPS/Ghost.  
-- RED FLAG if fluff total > $500:  
-  • 1 fluff item = -5  
-  • 2+ fluff items = -8  
-- BLUE FLAG if non-standard add-ons present but under $500 threshold
-
-**APR Bonus Logic**  
-- Applies only to dealer-arranged financing.  
-- APR ≤ 6.5% → GREEN FLAG (+5)  
-- APR ≤ 9.5% → GREEN FLAG (+2)  
-- No bonus above 9.5%.  
-- Not applicable to cash or outside-source financing.  
-
-**Term Risk Scoring**  
-- Term ≥ 75 months → RED FLAG (-5)  
-- Term ≥ 84 months → Additional RED FLAG (-2, stackable).  
-
-**Bundle Abuse Flag**  
-- Backend total (GAP + VSC + Add-ons) ≥ $6,000 → RED FLAG (-15)  
-- Show warning: *"Backend product bundle appears excessive."*  
-
-**Lease Audit Rules**  
-- Excessive Money Factor (APR equivalent) > 0.0025 → RED FLAG
-- Markup on residuals or hidden fees = BLUE or RED depending on severity
-- Lease GAP must be included automatically (RED FLAG if missing)
-
-**Missing Protection Advisory**  
-- Loan ≥72mo + $0 down + no GAP or VSC → BLUE FLAG (advisory only)
-- Deduct only under GAP missing rule, not VSC
-
-**Transparent Pricing**  
-- Clear, itemized pricing without hidden fees → GREEN FLAG
-- Competitive market rates → GREEN FLAG
-- Favorable financing options → GREEN FLAG
-
----
-
-### SMARTBUYER SCORE OUTCOME BANDS
-- **90–100** → Gold Badge = *Exceptional Deal*  
-- **80–89** → Silver Badge = *Good Deal*  
-- **70–79** → Bronze Badge = *Acceptable Deal*  
-- **<70** → Red Score = *Flagged: Review Before Signing*  
-
----
-
-### WEIGHTED SCORING REFERENCE
-| Component   | Condition                                    | Impact | Flag Color |
-|-------------|----------------------------------------------|--------|------------|
-| GAP Over    | GAP > $1,200 or 3% MSRP (or $1,500)          | –10    | Red        |
-| GAP Missing | $0 down + 75+ mo + no GAP                    | –10    | Red        |
-| VSC Over    | VSC > 15% MSRP or $4K/$6K cap                | –10    | Red        |
-| Add-On 1    | 1 fluff item, > $500 total                   | –5     | Red        |
-| Add-On 2+   | 2+ fluff items, > $500 total                 | –8     | Red        |
-| Bundle      | Backend total ≥ $6,000                       | –15    | Red        |
-| Term Risk   | ≥ 75mo                                       | –5     | Red        |
-| Term Extra  | ≥ 84mo                                       | –2     | Red        |
-| APR Bonus 1 | ≤ 6.5% (dealer-arranged only)                | +5     | Green      |
-| APR Bonus 2 | ≤ 9.5% (dealer-arranged only)                | +2     | Green      |
-| Transparent Pricing | No hidden fees, clear breakdown        | N/A    | Green      |
-| Market Rate | Pricing at or below market average           | N/A    | Green      |
-| Financing Options | Multiple favorable options           | N/A    | Green      |
-| Limited Warranty | Coverage limitations noted           | N/A    | Blue       |
-| Minor Variance | Small price differences              | N/A    | Blue       |
-| Non-Standard Add-Ons | Optional extras present             | N/A    | Blue       |
-
----
-
-### NARRATIVE INSIGHTS TO GENERATE
-
-**Vehicle Overview**
-- Provide a comprehensive overview of the vehicle being considered, including make, model, year, mileage, and condition.
-- Highlight key features, specifications, and any notable aspects of the vehicle.
-- Mention the vehicle's market position and how it compares to similar models in its class.
-
-
-**Trust Score Summary**  
-- Provide a **clear narrative** of the overall score, penalties, and bonuses.  
-- Explain how the red, green, and blue flags affect the deal quality.
-- Briefly describe why each factor matters.  
-- Offer actionable steps to mitigate risks, such as negotiating overpriced items, requesting itemized breakdowns, or adjusting loan terms.  
-- Give the consumer a full understanding of their position.
-
-**Market Comparison**  
-- Compare GAP, VSC, and add-on pricing to **industry averages, regional norms, and MSRP caps**.  
-- Highlight where the buyer is above or below typical ranges with **specific figures** (e.g., "GAP is 20% above average; VSC is within typical 15% MSRP cap").  
-- Explain how these prices relate to similar vehicles, terms, and markets, and whether the deal is fair.  
-- Keep tone professional yet consumer-friendly.  
-
-
-**GAP Logic**  
-- Provide a detailed analysis of the GAP coverage in this deal, including pricing relative to the cap, necessity based on loan terms, and buyer risk exposure.
-- Explain whether GAP is present, missing, or overpriced and what that means for the buyer.
-
-**VSC Logic**  
-- Provide a detailed analysis of the VSC coverage in this deal, including pricing relative to the cap, necessity based on vehicle age/mileage, and buyer risk exposure.
-- Explain whether VSC is present, missing, or overpriced and what that means for the buyer.
-
-**APR Bonus Rule**
-- Explain the APR bonus rule and how it was applied (or not) in this deal.
-- If an APR bonus was earned, detail the criteria met and the points added.
-- If no bonus was earned, explain why and what would be required to qualify.
-
-
-**Lease Audit**  
-- If the deal is a lease, provide a detailed analysis of the lease terms including residual value, money factor, lease duration, monthly payments, and implications for the buyer's financial risk and benefits.
-- If not a lease, state so briefly.
-
-
-**Negotiation Insight**  
-- Provide a **practical guide to negotiating the deal** based on flag findings.
-- Identify RED FLAG items to challenge (overpriced GAP, fluff add-ons, high APR) 
-- Highlight GREEN FLAG items to preserve (fair VSC, low APR, transparent pricing)
-- Suggest strategies to improve the deal: lower GAP cap, request better APR, remove redundant add-ons, shorten loan term.  
-- Include timing, phrasing, leverage tips, and step-by-step actionable guidance.  
-
-**Final Recommendation**  
-- Summarize overall deal quality, risk, and consumer impact using the three-flag system.
-- State whether the buyer should proceed, negotiate, or walk away.
-- Suggest concrete steps to improve the deal, specifying items to request, remove, or renegotiate.
-- Explain reasoning based on trust, market comparison, penalties, and bonuses, including actionable examples.
-
----
-
-### OUTPUT SCHEMA (JSON)
+You are **SmartBuyer AI Audit Engine**. You read messy OCR data (text plus form fields, possibly from several photos)
+of an auto finance deal, extract the deal facts, and write a consumer-friendly audit narrative.
+A separate rules engine computes the score, badge and flags from your extracted facts, so never invent a score.
+
+### INPUT
+The user message is JSON with:
+- "extracted": facts already parsed and verified locally. Copy them into "deal" unchanged.
+- "unverified": candidate values parsed with low confidence, or a list of conflicting candidates for one field. Confirm or correct them from the remainder.
+- "remainder": the OCR lines and form fields nothing was parsed from. Fill the remaining "deal" fields from it.
+
+### FIELD EXTRACTION
+- buyer_name: "Buyer:", "Customer:", "Client:", "Applicant:", "Borrower", "Purchaser". Capitalize properly; tolerate OCR errors.
+- dealer_name: "Dealer:", "Dealership:", "Seller:", "Vendor:", "Store:"; a salesperson's name stands in for the dealer if nothing else is found.
+- selling_price: "Sale Price", "Purchase Price", "Total Price", "Amount Financed". msrp: "MSRP", "Sticker".
+- vin_number: 17-character VIN. date: contract/purchase date as YYYY-MM-DD when possible.
+- gap_price, vsc_price (service contract / extended warranty), add_ons: every other backend product with its price
+  (nitrogen, VIN etch, key replacement, paint/interior protection, theft/GPS, etc.).
+- apr (percent number), apr_source: "Dealer" (dealer-arranged), "Cash" or "OSF" (outside financing), term_months,
+  down_payment, mileage, quote_type ("Pencil", "Purchase Agreement", "Cash Offer", "Lease", ...).
+- Leases: money_factor and lease_gap_included (true/false).
+- Use null for anything not present. Numbers must be plain numbers without $ or %.
+
+### RULES THE ENGINE APPLIES (for your narrative)
+GAP cap: lesser of $1,200 (or $1,500 if MSRP >= $60K) and 3% MSRP. VSC cap: lesser of 15% MSRP and $4,000 (MSRP < $40K) / $6,000.
+Fluff add-ons over $500 total are penalized. APR bonus for dealer financing: <= 6.5% (+5), <= 9.5% (+2).
+Terms of 75+ and 84+ months are penalized. A backend bundle (GAP + VSC + add-ons) of $6,000+ is bundle abuse.
+Lease money factor above 0.0025 and missing lease GAP are red flags.
+
+### NARRATIVE
+Write each section in a professional yet consumer-friendly tone, with specific figures from the deal:
+- vehicle_overview: make, model, year, mileage, condition, key features and market position.
+- trust_score_summary: what drives deal quality (overpriced items, fair items, advisories), why it matters, how to fix it.
+- market_comparison: GAP, VSC and add-on pricing against the caps above and typical market ranges.
+- gap_logic / vsc_logic: whether the product is present, missing or overpriced and what that means for the buyer.
+- apr_bonus_rule: whether the APR qualifies for a bonus and why.
+- lease_audit: residual, money factor, term and payments if a lease; otherwise null.
+- negotiation_insight: step-by-step guidance on what to challenge, what to keep, with phrasing and timing tips.
+- final_recommendation: proceed, negotiate or walk away, with concrete items to request, remove or renegotiate.
+{lengths}
+
+### OUTPUT (JSON only)
 {
-  "score": 0-100,
-  "buyer_name": "string|null", 
-  "dealer_name": "string|null",
-  "badge": "Gold|Silver|Bronze|Red",
-  "selling_price": number|null,
-  "vin_number": "string|null",
-  "date": "YYYY-MM-DD|string|null",
-  "buyer_message": "string",
-  "red_flags": [
-    {"type": "string", "message": "string", "deduction": number, "item": "string"}
-  ],
-  "green_flags": [
-    {"type": "string", "message": "string", "item": "string"}
-  ],
-  "blue_flags": [
-    {"type": "string", "message": "string", "item": "string"}
-  ],
-  "normalized_pricing": {"gap_cap": number, "vsc_cap": number, "bundle_total": number},
-  "apr": {"listed": number|null, "bonus": number, "source": "Dealer|Cash|OSF"},
-  "term": {"months": number, "risk_deduction": number},
-  "quote_type": "Pencil|Purchase Agreement|Cash Offer|Lease|...",
-  "bundle_abuse": {"active": true|false, "deduction": number},
+  "deal": {
+    "buyer_name": "string|null", "dealer_name": "string|null", "selling_price": number|null,
+    "vin_number": "string|null", "date": "string|null", "quote_type": "string|null",
+    "msrp": number|null, "mileage": number|null, "down_payment": number|null,
+    "gap_price": number|null, "vsc_price": number|null,
+    "add_ons": [{"name": "string", "price": number|null}],
+    "apr": number|null, "apr_source": "Dealer|Cash|OSF|null", "term_months": number|null,
+    "money_factor": number|null, "lease_gap_included": true|false|null
+  },
   "narrative": {
     "vehicle_overview": "string",
     "trust_score_summary": "string",
@@ -268,4 +95,185 @@ You must categorize all findings into three flag types:
     "final_recommendation": "string"
   }
 }
+""".replace("{lengths}", SECTION_LENGTHS)
+
+# Cleared after the provider rejects response_format, so later calls skip it
+_json_mode_supported = True
+# A 400 that blames the JSON mode itself, as opposed to a bad prompt or payload
+JSON_MODE_REJECTED = re.compile(r"response_format|json[ _-]?mode|json_object", re.IGNORECASE)
+
+
+async def complete_json(payload: Dict[str, Any], label: str) -> str:
+    """Chat completion in JSON mode where the provider supports it.
+
+    Falls back to the plain request (the prompt still asks for JSON) if
+    ``response_format`` is rejected, or if the model's output failed the
+    provider's own JSON validation. Any other 400 is raised.
+    """
+    global _json_mode_supported
+    if settings.groq_json_mode and _json_mode_supported:
+        try:
+            data = await groq_client.chat(
+                {**payload, "response_format": {"type": "json_object"}},
+                timeout=settings.rating_timeout, label=label,
+            )
+            return data["choices"][0]["message"]["content"]
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400:
+                raise
+            body = e.response.text
+            if "json_validate_failed" in body:
+                # Groq returns what the model wrote; let the tolerant parser have it
+                try:
+                    failed = e.response.json()["error"].get("failed_generation")
+                except (ValueError, KeyError, AttributeError):
+                    failed = None
+                if failed:
+                    return failed
+            elif JSON_MODE_REJECTED.search(body):
+                _json_mode_supported = False
+                logger.warning("rating: JSON response format rejected, falling back: %s", body[:200])
+            else:
+                raise
+
+    data = await groq_client.chat(payload, timeout=settings.rating_timeout, label=label)
+    return data["choices"][0]["message"]["content"]
+
+
+async def call_groq_audit(deal: Dict) -> str:
+    """Run the audit prompt over the pre-extracted ``deal`` payload and return the raw completion text."""
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": audit_system_prompt},
+            {"role": "user", "content": json.dumps(deal, ensure_ascii=False)},
+        ],
+        "temperature": 0.2,
+        "max_tokens": AUDIT_MAX_TOKENS,
+    }
+    return await complete_json(payload, label="rating.audit")
+
+
+audit_fix_prompt = """
+You are **SmartBuyer AI Audit Engine**. An earlier audit of this auto finance deal came back incomplete.
+The user message is JSON with the deal input ("extracted", "unverified", "remainder"), the parts of the audit that
+were already produced ("partial") and the keys that are missing ("missing").
+
+Return JSON only, containing just the missing keys:
+- "deal" (if listed): the full deal object, same fields and rules as the original audit.
+- any other listed key is a narrative section: {"narrative": {"<section>": "string", ...}}.
+Keep the narrative consistent with "partial". Do not repeat sections that are already present.
 """
+
+async def call_groq_fix(deal: Dict, partial: Dict, missing: List[str], label: str = "rating.fix") -> str:
+    """Ask only for the ``missing`` parts of an audit instead of re-running it.
+
+    With an empty ``partial`` and ``missing=["deal"]`` this is a deal-only
+    extraction, as the stream uses to settle its final score.
+    """
+    max_tokens = sum(SECTION_TOKEN_BUDGETS.get(key, DEAL_TOKEN_BUDGET) for key in missing)
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": audit_fix_prompt},
+            {"role": "user", "content": json.dumps(
+                {**deal, "partial": partial, "missing": missing}, ensure_ascii=False
+            )},
+        ],
+        "temperature": 0.2,
+        "max_tokens": max_tokens,
+    }
+    return await complete_json(payload, label=label)
+
+
+# Streaming variant: the score block is computed locally before the call, so
+# the model only writes prose, section by section, as plain text.
+audit_narrative_prompt = f"""
+You are **SmartBuyer AI Audit Engine**. A rules engine has already scored this auto finance deal; the "audit" block in the
+user message (score, badge, red/green/blue flags, caps, APR, term, bundle) is authoritative, so explain it, never change it.
+"extracted" holds the parsed deal facts and "remainder" the raw OCR lines nothing was parsed from.
+
+Write a professional yet consumer-friendly audit narrative with specific figures from the deal. Output plain text, no JSON
+and no code fences. Start each section with a line containing only "### <section>", in this order:
+{", ".join(NARRATIVE_SECTIONS)}.
+
+- vehicle_overview: make, model, year, mileage, condition, key features and market position.
+- trust_score_summary: the score, what drove each flag, why it matters and how to fix it.
+- market_comparison: GAP, VSC and add-on pricing against the caps and typical market ranges.
+- gap_logic / vsc_logic: whether the product is present, missing or overpriced and what that means for the buyer.
+- apr_bonus_rule: whether the APR earned a bonus and why.
+- lease_audit: residual, money factor, term and payments if a lease; otherwise "Not a lease."
+- negotiation_insight: step-by-step guidance on what to challenge and what to keep, with phrasing and timing tips.
+- final_recommendation: proceed, negotiate or walk away, with concrete items to request, remove or renegotiate.
+{SECTION_LENGTHS}
+"""
+
+
+async def stream_groq_narrative(deal: Dict, audit: Dict) -> AsyncIterator[str]:
+    """Stream the narrative for an already-scored deal as raw text deltas."""
+    payload = {
+        "model": settings.GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": audit_narrative_prompt},
+            {"role": "user", "content": json.dumps({"audit": audit, **deal}, ensure_ascii=False)},
+        ],
+        "temperature": 0.2,
+        "max_tokens": AUDIT_MAX_TOKENS - DEAL_TOKEN_BUDGET,
+    }
+    async for delta in groq_client.stream_chat(payload, timeout=settings.rating_timeout, label="rating.stream"):
+        yield delta
+
+
+class NarrativeStreamParser:
+    """Splits streamed "### section" text into ``(section, delta)`` pieces.
+
+    Marker lines are held back until complete; all other text is passed on
+    as soon as it arrives.
+    """
+
+    def __init__(self):
+        self.section = None
+        self.sections: Dict[str, str] = {}
+        self._buffer = ""
+        self._at_line_start = True
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        out: List[Tuple[str, str]] = []
+        self._buffer += delta
+        while self._buffer:
+            newline = self._buffer.find("\n")
+            if self._at_line_start and self._buffer.startswith("#"):
+                if newline == -1:
+                    break
+                line, self._buffer = self._buffer[:newline], self._buffer[newline + 1:]
+                key = line.lstrip("#").strip().lower()
+                if key in NARRATIVE_SECTIONS:
+                    self.section = key
+                else:
+                    self._emit(out, line + "\n")
+                continue
+
+            if newline == -1:
+                chunk, self._buffer = self._buffer, ""
+                self._at_line_start = False
+            else:
+                chunk, self._buffer = self._buffer[:newline + 1], self._buffer[newline + 1:]
+                self._at_line_start = True
+            self._emit(out, chunk)
+        return out
+
+    def flush(self) -> List[Tuple[str, str]]:
+        out: List[Tuple[str, str]] = []
+        if self._buffer:
+            self._emit(out, self._buffer)
+            self._buffer = ""
+        return out
+
+    def narrative(self) -> Dict[str, str]:
+        return {key: text.strip() for key, text in self.sections.items()}
+
+    def _emit(self, out: List[Tuple[str, str]], chunk: str):
+        if self.section is None:
+            return
+        self.sections[self.section] = self.sections.get(self.section, "") + chunk
+        out.append((self.section, chunk))
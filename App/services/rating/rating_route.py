@@ -1,7 +1,19 @@
-from fastapi import APIRouter, Body
-from .rating_schema import DealInput
-from .rating import call_groq_audit
+from fastapi import APIRouter, Body, Request
+from .rating_schema import AuditOutput, DealFields, DealInput
+from .scoring import score_deal
+from .pre_extract import merge_deal_fields, pre_extract
+from .rating import NarrativeStreamParser, call_groq_audit, call_groq_fix, stream_groq_narrative
+from .audit_parser import (
+    REQUIRED_SECTIONS, loads_tolerant, merge_fix, missing_fields, parse_stats, record_parse_outcome, validate_audit_output,
+)
+from .audit_cache import STREAM, audit_cache_key, audit_cache_stats, get_cached_audit, store_audit
+from App.core.llm import groq_client
+from App.core.responses import encode_response, sse_event, sse_response
+import asyncio
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/rating", tags=["Rating"])
 
@@ -60,58 +72,169 @@ Push for free service, accessories, or better warranty coverage.'''
     }
 
 
+def log_prompt_reduction(input_data: DealInput, prompt_payload: dict):
+    """Log raw vs. pre-extracted prompt size (~4 chars per token)."""
+    raw_chars = len(input_data.text) + sum(
+        len(f.name) + len(str(f.value or "")) for f in input_data.form_fields
+    )
+    sent_chars = len(json.dumps(prompt_payload, ensure_ascii=False))
+    logger.info(
+        "rating prompt: ~%d tokens raw -> ~%d tokens sent (%.0f%% smaller)",
+        raw_chars // 4, sent_chars // 4,
+        100 * (1 - sent_chars / raw_chars) if raw_chars else 0,
+    )
+
+
 @router.post("/")
-def audit_deal(input_data: DealInput = Body(...)):
+async def audit_deal(request: Request, input_data: DealInput = Body(...)):
+    key = audit_cache_key(input_data)
+    audit = await get_cached_audit(key)
+    if audit is None:
+        audit = await run_audit(input_data)
+        await store_audit(key, audit)
+    return encode_response(request, audit)
+
+
+@router.get("/cache/stats")
+async def rating_cache_stats():
+    """Audit cache hit/miss counters and the current prompt/model version."""
+    return audit_cache_stats()
+
+
+@router.get("/parse/stats")
+async def rating_parse_stats():
+    """How often completions parsed cleanly, needed repair or a follow-up, or failed."""
+    return parse_stats()
+
+
+@router.get("/usage/stats")
+async def rating_usage_stats():
+    """Groq tokens in/out and latency for audit, follow-up and stream calls."""
+    return groq_client.usage_stats(prefix="rating.")
+
+
+@router.post("/stream")
+async def audit_deal_stream(input_data: DealInput = Body(...)):
+    """Server-sent events: a provisional score from the locally parsed fields
+    first, then each narrative section as the model writes it, then the full
+    result with the final score.
+
+    The final score is computed like ``/rating/``: a deal-only extraction runs
+    alongside the narrative and its fields are merged with the local ones, so
+    both endpoints score the same deal the same way.
+    """
+    key = audit_cache_key(input_data, STREAM)
+    cached = await get_cached_audit(key)
+    if cached is not None:
+        return sse_response(replay_cached_audit(cached))
+
+    pre = pre_extract(input_data)
+    prompt_payload = pre.prompt_payload()
     try:
-        # Call AI with just the input data
-        result_json_str = call_groq_audit({
-            "text": input_data.text,
-            "form_fields": [f.dict() for f in input_data.form_fields]
-        })
-
-        # Parse AI response
-        result = json.loads(result_json_str)
-        
-        # Validate required fields exist (updated for new flag structure)
-        required_fields = ['score', 'buyer_name', 'dealer_name','selling_price', 'vin_number', 'date',  'badge', 'buyer_message', 'red_flags', 'green_flags', 
-                          'blue_flags', 'normalized_pricing', 'apr', 'term', 
-                          'quote_type', 'bundle_abuse', 'narrative']
-        
-        for field in required_fields:
-            if field not in result:
-                if field in ['buyer_name', 'dealer_name']:
-                    result[field] = None
-                else:
-                    raise ValueError(f"Missing required field: {field}")
-
-        # Format narrative
+        provisional = score_deal(DealFields(**{**pre.fallbacks, **pre.deal_fields()}))
+    except ValueError as e:
+        provisional = score_deal(DealFields())
+        logger.warning("rating stream: pre-extracted fields rejected: %s", e)
+
+    async def events():
+        yield sse_event("score", {**provisional, "provisional": True})
+
+        deal_task = asyncio.create_task(extract_deal(prompt_payload))
+        parser = NarrativeStreamParser()
+        try:
+            async for delta in stream_groq_narrative(prompt_payload, provisional):
+                for section, text in parser.feed(delta):
+                    yield sse_event("narrative", {"section": section, "delta": text})
+            for section, text in parser.flush():
+                yield sse_event("narrative", {"section": section, "delta": text})
+        except Exception as e:
+            deal_task.cancel()
+            yield sse_event("error", {"error": f"❌ Unexpected error: {str(e)}"})
+            return
+
+        model_deal = await deal_task
+        audit = provisional
+        if model_deal is not None:
+            try:
+                audit = score_deal(DealFields(**merge_deal_fields(model_deal, pre.deal_fields(), pre.fallbacks)))
+            except ValueError as e:
+                logger.warning("rating stream: extracted deal rejected: %s", e)
+                model_deal = None
+
+        narrative = parser.narrative()
+        result = dict(audit)
+        result["narrative"] = {
+            "formatted": format_narrative(narrative, audit["normalized_pricing"])
+        }
+        # A cut-short stream, or one scored on local fields only, is served but not cached
+        if model_deal is not None and all(narrative.get(section) for section in REQUIRED_SECTIONS):
+            await store_audit(key, result)
+        yield sse_event("done", result)
+
+    return sse_response(events())
+
+
+async def extract_deal(prompt_payload: dict):
+    """The model's ``deal`` block for the stream, or None if the call failed."""
+    try:
+        deal_str = await call_groq_fix(prompt_payload, {}, ["deal"], label="rating.deal")
+        output = validate_audit_output(loads_tolerant(deal_str)[0])
+    except Exception as e:
+        logger.warning("rating stream: deal extraction failed: %s", e)
+        return None
+    return output.deal.model_dump(exclude_none=True) if output.deal else {}
+
+
+async def replay_cached_audit(result: dict):
+    """Same event sequence as a live stream, one event per narrative section.
+
+    Cached results always carry the final score, so nothing here is provisional.
+    """
+    audit = {k: v for k, v in result.items() if k != "narrative"}
+    yield sse_event("score", {**audit, "provisional": False})
+    for section, text in result.get("narrative", {}).get("formatted", {}).items():
+        yield sse_event("narrative", {"section": section, "delta": text})
+    yield sse_event("done", result)
+
+
+async def run_audit(input_data: DealInput) -> dict:
+    try:
+        # Parse what we can locally; the model only sees the summary and the remainder
+        pre = pre_extract(input_data)
+        prompt_payload = pre.prompt_payload()
+        log_prompt_reduction(input_data, prompt_payload)
+
+        result_json_str = await call_groq_audit(prompt_payload)
+
+        # Parse AI response, repairing fences/truncation instead of failing outright
+        try:
+            data, repaired = loads_tolerant(result_json_str)
+        except json.JSONDecodeError:
+            record_parse_outcome("failed")
+            raise
+        output = validate_audit_output(data)
+        outcome = "repaired" if repaired else "clean"
+
+        # Ask only for what is missing rather than re-running the whole audit
+        missing = missing_fields(output)
+        if missing:
+            output = await fill_missing(prompt_payload, output, missing)
+            outcome = "partial" if missing_fields(output) else "fixed"
+        record_parse_outcome(outcome)
+
+        # All scoring is done locally; a missing deal block falls back to local fields
+        model_deal = output.deal.model_dump(exclude_none=True) if output.deal else {}
+        audit = score_deal(DealFields(**merge_deal_fields(model_deal, pre.deal_fields(), pre.fallbacks)))
+
+        # Format narrative; sections still missing get the standard fallbacks
+        narrative = output.narrative.model_dump() if output.narrative else {}
         formatted_narrative_text = format_narrative(
-            narrative_data=result.get("narrative", {}),
-            normalized_pricing=result.get("normalized_pricing", {})
+            narrative_data=narrative,
+            normalized_pricing=audit["normalized_pricing"]
         )
 
-        # Return structured response with fallbacks
-        return {
-            "score": result.get("score", 0),
-            "buyer_name": result.get("buyer_name"),  # From AI analysis
-            "dealer_name": result.get("dealer_name"),
-            "date": result.get("date"),
-            "selling_price": result.get("selling_price"),      # ❌ ADD THIS
-            "vin_number": result.get("vin_number"), 
-            "badge": result.get("badge", "Unknown"),
-            "buyer_message": result.get("buyer_message", "No message generated"),
-            "red_flags": result.get("red_flags", []),
-            "green_flags": result.get("green_flags", []),
-            "blue_flags": result.get("blue_flags", []),
-            "normalized_pricing": result.get("normalized_pricing", {}),
-            "apr": result.get("apr", {}),
-            "term": result.get("term", {}),
-            "quote_type": result.get("quote_type", "Unknown"),
-            "bundle_abuse": result.get("bundle_abuse", {}),
-            "narrative": {
-                "formatted": formatted_narrative_text
-            }
-        }
+        audit["narrative"] = {"formatted": formatted_narrative_text}
+        return audit
 
     except json.JSONDecodeError:
         return {
@@ -128,3 +251,14 @@ def audit_deal(input_data: DealInput = Body(...)):
             "error": f"❌ Unexpected error: {str(e)}",
             "raw_response": result_json_str if 'result_json_str' in locals() else None
         }
+
+
+async def fill_missing(prompt_payload: dict, output: AuditOutput, missing: list) -> AuditOutput:
+    partial = output.model_dump(exclude_none=True)
+    try:
+        fix_str = await call_groq_fix(prompt_payload, partial, missing)
+        fix = validate_audit_output(loads_tolerant(fix_str)[0])
+    except Exception as e:
+        logger.warning("rating: follow-up for %s failed: %s", ", ".join(missing), e)
+        return output
+    return merge_fix(output, fix)
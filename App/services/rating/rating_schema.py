@@ -1,5 +1,6 @@
 # rating_schema.py
-from pydantic import BaseModel
+import re
+from pydantic import BaseModel, field_validator
 from typing import List, Optional, Union
 
 class FormField(BaseModel):
@@ -10,3 +11,75 @@ class FormField(BaseModel):
 class DealInput(BaseModel):
     text: str
     form_fields: List[FormField]
+
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _to_number(value):
+    """Accept "$1,200.00" / "6.9%" / "72 months" style strings from OCR or the model."""
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(",", ""))
+        return float(match.group()) if match else None
+    return value
+
+
+class AddOn(BaseModel):
+    name: str
+    price: Optional[float] = None
+
+    @field_validator("price", mode="before")
+    @classmethod
+    def clean_price(cls, value):
+        return _to_number(value)
+
+
+class DealFields(BaseModel):
+    """Facts the scoring engine needs, extracted from the deal documents."""
+    buyer_name: Optional[str] = None
+    dealer_name: Optional[str] = None
+    selling_price: Optional[float] = None
+    vin_number: Optional[str] = None
+    date: Optional[str] = None
+    quote_type: Optional[str] = None
+
+    msrp: Optional[float] = None
+    mileage: Optional[float] = None
+    down_payment: Optional[float] = None
+
+    gap_price: Optional[float] = None
+    vsc_price: Optional[float] = None
+    add_ons: List[AddOn] = []
+
+    apr: Optional[float] = None
+    apr_source: Optional[str] = None  # Dealer | Cash | OSF
+    term_months: Optional[int] = None
+
+    money_factor: Optional[float] = None
+    lease_gap_included: Optional[bool] = None
+
+    @field_validator(
+        "selling_price", "msrp", "mileage", "down_payment", "gap_price",
+        "vsc_price", "apr", "term_months", "money_factor", mode="before",
+    )
+    @classmethod
+    def clean_numbers(cls, value):
+        return _to_number(value)
+
+
+class AuditNarrative(BaseModel):
+    vehicle_overview: Optional[str] = None
+    trust_score_summary: Optional[str] = None
+    market_comparison: Optional[str] = None
+    gap_logic: Optional[str] = None
+    vsc_logic: Optional[str] = None
+    apr_bonus_rule: Optional[str] = None
+    lease_audit: Optional[str] = None
+    negotiation_insight: Optional[str] = None
+    final_recommendation: Optional[str] = None
+
+
+class AuditOutput(BaseModel):
+    """What the audit prompt asks the model for; either half may be missing."""
+    deal: Optional[DealFields] = None
+    narrative: Optional[AuditNarrative] = None
@@ -0,0 +1,187 @@
+"""Deterministic SmartBuyer scoring engine.
+
+Applies the audit rules (GAP/VSC caps, fluff add-ons, APR bonus, term risk,
+bundle abuse, lease checks, badge bands) to extracted ``DealFields``. Same
+input, same score: the LLM no longer decides any number, it only extracts
+fields and writes the narrative.
+
+Rule precedence follows the framework: every quote starts at 100, the
+deductions apply, then the bonuses, and the result is clamped to 0-100.
+"""
+from typing import Any, Dict, List, Optional
+from .rating_schema import DealFields
+
+START_SCORE = 100
+
+GAP_CAP = 1200.0
+GAP_CAP_HIGH_MSRP = 1500.0
+GAP_HIGH_MSRP = 60000.0
+GAP_MSRP_RATE = 0.03
+
+VSC_MSRP_RATE = 0.15
+VSC_CAP_LOW = 4000.0
+VSC_CAP_HIGH = 6000.0
+VSC_HIGH_MSRP = 40000.0
+
+FLUFF_THRESHOLD = 500.0
+FLUFF_KEYWORDS = {
+    "nitrogen": ("nitrogen",),
+    "vin_etch": ("vin etch", "etch"),
+    "key_replacement": ("key replacement", "key protection", "key fob"),
+    "paint_interior": ("paint", "interior protection", "fabric", "sealant", "appearance"),
+    "theft_gps": ("theft", "gps", "ghost", "tracking", "lojack"),
+}
+
+BUNDLE_THRESHOLD = 6000.0
+LEASE_MONEY_FACTOR_MAX = 0.0025
+
+BADGES = (
+    (90, "Gold", "Exceptional Deal"),
+    (80, "Silver", "Good Deal"),
+    (70, "Bronze", "Acceptable Deal"),
+    (0, "Red", "Flagged: Review Before Signing"),
+)
+
+
+def gap_cap(msrp: Optional[float]) -> float:
+    """Lesser of $1,200 (or $1,500 when MSRP >= $60K) and 3% of MSRP."""
+    if not msrp:
+        return GAP_CAP
+    limit = GAP_CAP_HIGH_MSRP if msrp >= GAP_HIGH_MSRP else GAP_CAP
+    return round(min(limit, msrp * GAP_MSRP_RATE), 2)
+
+
+def vsc_cap(msrp: Optional[float]) -> float:
+    """Lesser of 15% of MSRP and $4,000 (MSRP < $40K) or $6,000."""
+    if not msrp:
+        return VSC_CAP_LOW
+    limit = VSC_CAP_HIGH if msrp >= VSC_HIGH_MSRP else VSC_CAP_LOW
+    return round(min(limit, msrp * VSC_MSRP_RATE), 2)
+
+
+def fluff_category(name: str) -> Optional[str]:
+    lowered = name.lower()
+    for category, keywords in FLUFF_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return category
+    return None
+
+
+def badge_for(score: int) -> tuple:
+    for floor, badge, message in BADGES:
+        if score >= floor:
+            return badge, message
+    return BADGES[-1][1:]
+
+
+def is_lease(fields: DealFields) -> bool:
+    return bool(fields.quote_type and "lease" in fields.quote_type.lower()) or fields.money_factor is not None
+
+
+def score_deal(fields: DealFields) -> Dict[str, Any]:
+    """Score a deal; returns every non-narrative field of the audit response."""
+    red: List[Dict[str, Any]] = []
+    green: List[Dict[str, Any]] = []
+    blue: List[Dict[str, Any]] = []
+
+    def deduct(flag_type: str, message: str, points: int, item: str):
+        red.append({"type": flag_type, "message": message, "deduction": points, "item": item})
+
+    term = fields.term_months
+    down = fields.down_payment
+    gap_limit = gap_cap(fields.msrp)
+    vsc_limit = vsc_cap(fields.msrp)
+
+    # GAP
+    if fields.gap_price:
+        if fields.gap_price > gap_limit:
+            deduct("Overpriced GAP", f"GAP ${fields.gap_price:,.0f} exceeds the ${gap_limit:,.0f} cap.", 10, "GAP")
+        else:
+            green.append({"type": "Fair GAP", "message": f"GAP is at or below the ${gap_limit:,.0f} cap.", "item": "GAP"})
+    elif term is not None and term >= 75 and not down:
+        blue.append({"type": "GAP Missing", "message": "Long term with $0 down and no GAP listed; consider GAP coverage.", "item": "GAP"})
+
+    # VSC
+    if fields.vsc_price:
+        if fields.vsc_price > vsc_limit:
+            deduct("Overpriced VSC", f"VSC ${fields.vsc_price:,.0f} exceeds the ${vsc_limit:,.0f} cap.", 10, "VSC")
+        else:
+            green.append({"type": "Fair VSC", "message": f"VSC is at or below the ${vsc_limit:,.0f} cap.", "item": "VSC"})
+    elif (fields.mileage or 0) >= 60000 and term is not None and term >= 72:
+        blue.append({"type": "VSC Missing", "message": "High mileage and long term with no VSC; consider coverage.", "item": "VSC"})
+
+    # Missing protection advisory (no deduction; GAP missing is handled above)
+    if term is not None and term >= 72 and not down and not fields.gap_price and not fields.vsc_price:
+        blue.append({"type": "Missing Protection", "message": "72+ month loan with $0 down and no GAP or VSC.", "item": "Protection"})
+
+    # Add-on / fluff
+    fluff = [a for a in fields.add_ons if fluff_category(a.name)]
+    fluff_total = sum(a.price or 0 for a in fluff)
+    if fluff and fluff_total > FLUFF_THRESHOLD:
+        points = 8 if len(fluff) >= 2 else 5
+        names = ", ".join(a.name for a in fluff)
+        deduct("Fluff Add-Ons", f"Fluff add-ons total ${fluff_total:,.0f} ({names}).", points, "Add-Ons")
+    elif fields.add_ons:
+        names = ", ".join(a.name for a in fields.add_ons)
+        blue.append({"type": "Non-Standard Add-Ons", "message": f"Optional add-ons present: {names}.", "item": "Add-Ons"})
+
+    # Term risk
+    term_deduction = 0
+    if term is not None and term >= 75:
+        term_deduction += 5
+        deduct("Term Risk", f"{term}-month term increases negative-equity risk.", 5, "Term")
+        if term >= 84:
+            term_deduction += 2
+            deduct("Extended Term", "Terms of 84+ months add further risk.", 2, "Term")
+
+    # Bundle abuse
+    bundle_total = round(
+        (fields.gap_price or 0) + (fields.vsc_price or 0) + sum(a.price or 0 for a in fields.add_ons), 2
+    )
+    bundle_active = bundle_total >= BUNDLE_THRESHOLD
+    if bundle_active:
+        deduct("Bundle Abuse", "Backend product bundle appears excessive.", 15, "Backend Bundle")
+
+    # Lease checks carry no fixed deduction in the framework
+    if is_lease(fields):
+        if fields.money_factor is not None and fields.money_factor > LEASE_MONEY_FACTOR_MAX:
+            deduct("Excessive Money Factor", f"Money factor {fields.money_factor} exceeds {LEASE_MONEY_FACTOR_MAX}.", 0, "Lease")
+        if fields.lease_gap_included is False:
+            deduct("Lease GAP Missing", "Lease GAP should be included automatically.", 0, "Lease")
+
+    # APR bonus (dealer-arranged financing only)
+    source = fields.apr_source or ("Cash" if fields.apr is None else "Dealer")
+    apr_bonus = 0
+    if source.lower().startswith("dealer") and fields.apr is not None:
+        if fields.apr <= 6.5:
+            apr_bonus = 5
+        elif fields.apr <= 9.5:
+            apr_bonus = 2
+        if apr_bonus:
+            green.append({"type": "APR Bonus", "message": f"{fields.apr}% dealer APR earns +{apr_bonus}.", "item": "APR"})
+
+    if not red and fields.selling_price:
+        green.append({"type": "Transparent Pricing", "message": "Itemized pricing with no penalized items.", "item": "Pricing"})
+
+    score = START_SCORE - sum(flag["deduction"] for flag in red) + apr_bonus
+    score = max(0, min(100, score))
+    badge, buyer_message = badge_for(score)
+
+    return {
+        "score": score,
+        "buyer_name": fields.buyer_name,
+        "dealer_name": fields.dealer_name,
+        "date": fields.date,
+        "selling_price": fields.selling_price,
+        "vin_number": fields.vin_number,
+        "badge": badge,
+        "buyer_message": buyer_message,
+        "red_flags": red,
+        "green_flags": green,
+        "blue_flags": blue,
+        "normalized_pricing": {"gap_cap": gap_limit, "vsc_cap": vsc_limit, "bundle_total": bundle_total},
+        "apr": {"listed": fields.apr, "bonus": apr_bonus, "source": source},
+        "term": {"months": term, "risk_deduction": term_deduction},
+        "quote_type": fields.quote_type or "Unknown",
+        "bundle_abuse": {"active": bundle_active, "deduction": 15 if bundle_active else 0},
+    }
@@ -0,0 +1,161 @@
+"""Document AI response -> ``full`` extraction result (user-007).
+
+``legacy`` is the original per-field walk through the proto-plus wrappers
+(``get_text`` in the first ``extract_text_sync``); ``resolver`` is
+``document_to_result`` with ``TextAnchorResolver``. By default a dense
+synthetic packet is used (every anchor has several segments); pass
+``--document`` to time a recorded response saved with
+``documentai.Document.to_json``.
+"""
+import argparse
+import random
+from pathlib import Path
+
+from common import best_of, ms, ratio, report
+
+from google.cloud import documentai
+
+from App.services.extraction.extract import document_to_result
+from App.services.extraction.extract_schema import ExtractionDetail
+
+WORDS = "buyer dealer price vehicle apr term gap service contract total fee tax title msrp".split()
+
+
+def synthetic_document(pages: int, fields: int, tables: int, rows: int, cols: int, seed: int = 7):
+    rng = random.Random(seed)
+    text_parts = []
+    offset = 0
+
+    def anchor(words: int):
+        nonlocal offset
+        segments = []
+        for _ in range(rng.randint(1, 3)):
+            chunk = " ".join(rng.choice(WORDS) for _ in range(words)) + "\n"
+            text_parts.append(chunk)
+            segments.append({"start_index": offset, "end_index": offset + len(chunk)})
+            offset += len(chunk)
+        return {"text_segments": segments}
+
+    def layout(words: int):
+        return {"text_anchor": anchor(words), "confidence": rng.random()}
+
+    page_list = []
+    for number in range(1, pages + 1):
+        page_list.append({
+            "page_number": number,
+            "form_fields": [
+                {"field_name": layout(2), "field_value": layout(4)} for _ in range(fields)
+            ],
+            "tables": [
+                {
+                    "header_rows": [{"cells": [{"layout": layout(1)} for _ in range(cols)]}],
+                    "body_rows": [
+                        {"cells": [{"layout": layout(2), "row_span": 1, "col_span": 1} for _ in range(cols)]}
+                        for _ in range(rows)
+                    ],
+                }
+                for _ in range(tables)
+            ],
+        })
+    return documentai.Document(text="".join(text_parts), pages=page_list)
+
+
+def legacy_full(document) -> dict:
+    """The original conversion, kept here as the baseline."""
+
+    def get_text(layout):
+        if not layout or not layout.text_anchor or not layout.text_anchor.text_segments:
+            return ""
+        text_fragments = []
+        for segment in layout.text_anchor.text_segments:
+            start = segment.start_index or 0
+            end = segment.end_index
+            text_fragments.append(document.text[start:end])
+        return "".join(text_fragments).strip()
+
+    extracted = {"pages": []}
+    for page in document.pages:
+        page_data = {"page_number": page.page_number, "form_fields": [], "tables": []}
+        for field in page.form_fields:
+            page_data["form_fields"].append({
+                "field_name": {
+                    "text": get_text(field.field_name),
+                    "confidence": field.field_name.confidence if field.field_name else None,
+                },
+                "field_value": {
+                    "text": get_text(field.field_value),
+                    "confidence": field.field_value.confidence if field.field_value else None,
+                },
+            })
+
+        for table in page.tables:
+            def extract_cells(row_cells):
+                return [
+                    {
+                        "text": get_text(cell.layout),
+                        "confidence": cell.layout.confidence,
+                        "row_span": cell.row_span,
+                        "col_span": cell.col_span,
+                    }
+                    for cell in row_cells
+                ]
+
+            page_data["tables"].append({
+                "header_rows": [extract_cells(row.cells) for row in table.header_rows],
+                "body_rows": [extract_cells(row.cells) for row in table.body_rows],
+            })
+        extracted["pages"].append(page_data)
+    return extracted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document", type=Path, help="recorded Document AI response (Document JSON)")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--fields", type=int, default=120)
+    parser.add_argument("--tables", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.document:
+        document = documentai.Document.from_json(args.document.read_text(), ignore_unknown_fields=True)
+        source = str(args.document)
+    else:
+        document = synthetic_document(args.pages, args.fields, args.tables, args.rows, args.cols)
+        source = "synthetic"
+
+    anchors = sum(
+        2 * len(page.form_fields)
+        + sum(len(row.cells) for table in page.tables for row in (*table.header_rows, *table.body_rows))
+        for page in document.pages
+    )
+
+    # Both walks must read the same values before their times are compared
+    legacy = legacy_full(document)
+    current = document_to_result(document, ExtractionDetail.full)
+    assert [
+        [(f["field_name"]["text"], f["field_value"]["text"]) for f in page["form_fields"]]
+        for page in legacy["pages"]
+    ] == [
+        [(f["field_name"]["text"], f["field_value"]["text"]) for f in page["form_fields"]]
+        for page in current["pages"]
+    ]
+
+    before = best_of(lambda: legacy_full(document), repeat=args.repeat)
+    rows = [("legacy", ms(before), "1.0x")]
+    for detail in ExtractionDetail:
+        after = best_of(lambda: document_to_result(document, detail), repeat=args.repeat)
+        rows.append((f"resolver, {detail.value}", ms(after), ratio(before, after)))
+
+    report(
+        f"{source}: {len(document.pages)} pages, {anchors} anchors, "
+        f"{len(document.text) // 1024} KiB of text (best of {args.repeat})",
+        ["conversion", "time", "speed-up"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Full-retry rate on malformed audit completions (user-016).
+
+Each completion is handled two ways:
+
+- strict: ``json.loads`` and every required key present, or the whole audit
+  is generated again (the old behaviour).
+- tolerant: ``loads_tolerant`` and ``validate_audit_output``. Only an
+  unrecoverable completion is retried in full; missing parts get a
+  follow-up limited to ``SECTION_TOKEN_BUDGETS``.
+
+By default the corpus is generated from one complete audit by applying the
+failure modes seen in production (fences, prose, trailing commas,
+truncation at ``max_tokens``, dropped sections). Pass ``--corpus`` with a
+JSONL file of ``{"completion": "..."}`` lines to use recorded outputs.
+"""
+import argparse
+import json
+import random
+from collections import defaultdict
+from pathlib import Path
+
+from common import report
+
+from App.services.rating.audit_parser import (
+    REQUIRED_SECTIONS, loads_tolerant, missing_fields, validate_audit_output,
+)
+from App.services.rating.rating import AUDIT_MAX_TOKENS, DEAL_TOKEN_BUDGET, SECTION_TOKEN_BUDGETS
+
+COMPLETE = {
+    "deal": {
+        "buyer_name": "Jane Doe", "dealer_name": "Sunrise Motors", "selling_price": 28450,
+        "vin_number": "1HGCM82633A004352", "date": "2026-03-14", "quote_type": "Purchase Agreement",
+        "msrp": 31200, "mileage": 12, "down_payment": 3000, "gap_price": 1495, "vsc_price": 3995,
+        "add_ons": [{"name": "Nitrogen tires", "price": 199}, {"name": "VIN etch", "price": 299}],
+        "apr": 8.9, "apr_source": "Dealer", "term_months": 72, "money_factor": None, "lease_gap_included": None,
+    },
+    "narrative": {
+        section: f"{section.replace('_', ' ').capitalize()}: " + "The figures in this deal look typical. " * 12
+        for section in SECTION_TOKEN_BUDGETS
+    },
+}
+COMPLETE["narrative"]["lease_audit"] = None
+
+
+def clean(rng):
+    return json.dumps(COMPLETE)
+
+
+def fenced(rng):
+    return "```json\n" + json.dumps(COMPLETE, indent=2) + "\n```"
+
+
+def prose(rng):
+    return "Here is the audit you asked for:\n" + json.dumps(COMPLETE) + "\nLet me know if you need more."
+
+
+def trailing_commas(rng):
+    return json.dumps(COMPLETE, indent=2).replace('"\n', '",\n').replace("]\n", "],\n")
+
+
+def truncated(rng):
+    text = json.dumps(COMPLETE)
+    return text[:int(len(text) * rng.uniform(0.55, 0.97))]
+
+
+def dropped_sections(rng):
+    data = json.loads(json.dumps(COMPLETE))
+    for section in rng.sample(REQUIRED_SECTIONS, rng.randint(1, 3)):
+        data["narrative"][section] = rng.choice([None, "", "none"])
+    return json.dumps(data)
+
+
+def no_deal(rng):
+    return json.dumps({"narrative": COMPLETE["narrative"]})
+
+
+def not_json(rng):
+    return "I'm sorry, I can't help with that request."
+
+
+FAILURE_MODES = {
+    "clean": (clean, 40),
+    "code fences": (fenced, 12),
+    "prose around JSON": (prose, 8),
+    "trailing commas": (trailing_commas, 6),
+    "truncated": (truncated, 18),
+    "dropped sections": (dropped_sections, 10),
+    "no deal block": (no_deal, 4),
+    "not JSON": (not_json, 2),
+}
+
+
+def strict(completion: str) -> str:
+    try:
+        data = json.loads(completion)
+    except json.JSONDecodeError:
+        return "retry"
+    if not isinstance(data, dict) or not isinstance(data.get("deal"), dict):
+        return "retry"
+    narrative = data.get("narrative") or {}
+    if any(not narrative.get(section) or str(narrative[section]).strip().lower() == "none"
+           for section in REQUIRED_SECTIONS):
+        return "retry"
+    return "ok"
+
+
+def tolerant(completion: str):
+    """``("retry" | "follow-up" | "ok", follow-up max_tokens)``."""
+    try:
+        data, _ = loads_tolerant(completion)
+    except json.JSONDecodeError:
+        return "retry", 0
+    missing = missing_fields(validate_audit_output(data))
+    if missing:
+        return "follow-up", sum(SECTION_TOKEN_BUDGETS.get(key, DEAL_TOKEN_BUDGET) for key in missing)
+    return "ok", 0
+
+
+def load_corpus(args):
+    if args.corpus:
+        lines = args.corpus.read_text().splitlines()
+        return [("recorded", json.loads(line)["completion"]) for line in lines if line.strip()]
+    rng = random.Random(args.seed)
+    corpus = []
+    for name, (make, weight) in FAILURE_MODES.items():
+        corpus += [(name, make(rng)) for _ in range(weight * args.scale)]
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, help="JSONL of recorded completions")
+    parser.add_argument("--scale", type=int, default=5, help="copies of each generated case")
+    parser.add_argument("--seed", type=int, default=16)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    by_mode = defaultdict(lambda: defaultdict(int))
+    spent = {"strict": 0, "tolerant": 0}
+    for mode, completion in corpus:
+        counts = by_mode[mode]
+        counts["n"] += 1
+        if strict(completion) == "retry":
+            counts["strict retry"] += 1
+            spent["strict"] += AUDIT_MAX_TOKENS
+        outcome, follow_up_tokens = tolerant(completion)
+        counts[f"tolerant {outcome}"] += 1
+        spent["tolerant"] += AUDIT_MAX_TOKENS if outcome == "retry" else follow_up_tokens
+
+    def pct(count, total):
+        return f"{100 * count / total:.0f}%"
+
+    rows = []
+    totals = defaultdict(int)
+    for mode, counts in by_mode.items():
+        for key, value in counts.items():
+            totals[key] += value
+        n = counts["n"]
+        rows.append((mode, n, pct(counts["strict retry"], n), pct(counts["tolerant retry"], n),
+                     pct(counts["tolerant follow-up"], n)))
+    n = totals["n"]
+    rows.append(("all", n, pct(totals["strict retry"], n), pct(totals["tolerant retry"], n),
+                 pct(totals["tolerant follow-up"], n)))
+
+    report(
+        f"{n} completions",
+        ["failure mode", "count", "full retry (strict)", "full retry (tolerant)", "follow-up (tolerant)"],
+        rows,
+    )
+    print(
+        f"recovery completion budget: strict {spent['strict']:,} tokens, "
+        f"tolerant {spent['tolerant']:,} tokens "
+        f"({100 * (1 - spent['tolerant'] / spent['strict']) if spent['strict'] else 0:.0f}% less)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Shared helpers for the scripts in ``benchmarks/``.
+
+Every script is run from the repository root, e.g.
+``python benchmarks/concierge_under_upload.py``. Document AI and Groq are
+replaced by local stubs, so no credentials or network access are needed and
+the numbers measure this code rather than the providers.
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+from prettytable import PrettyTable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Settings are read lazily; the required ones only need to be present
+os.environ.setdefault("GCP_PROJECT_ID", "bench-project")
+os.environ.setdefault("GCP_PROCESSOR_ID", "bench-processor")
+os.environ.setdefault("GROQ_URL", "http://groq.bench/v1/chat/completions")
+os.environ.setdefault("GROQ_MODEL", "bench-model")
+os.environ.setdefault("GROQ_API_KEY", "bench-key")
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def best_of(fn: Callable[[], object], repeat: int = 5, number: int = 1) -> float:
+    """Best wall time of ``repeat`` runs of ``number`` calls, in seconds per call."""
+    times: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return min(times)
+
+
+def median_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f} ms"
+
+
+def us(seconds: float) -> str:
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def kib(size: float) -> str:
+    return f"{size / 1024:.1f} KiB"
+
+
+def ratio(before: float, after: float) -> str:
+    return f"{before / after:.1f}x" if after else "-"
+
+
+def report(title: str, header: Sequence[str], rows: Sequence[Sequence[object]]):
+    table = PrettyTable(list(header))
+    table.align = "r"
+    table.align[header[0]] = "l"
+    for row in rows:
+        table.add_row(list(row))
+    print(f"\n{title}")
+    print(table)
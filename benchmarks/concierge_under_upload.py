@@ -0,0 +1,153 @@
+"""/concierge latency while /extraction/upload is saturated (user-001).
+
+One event loop stands in for one uvicorn worker. ``--uploaders`` clients post
+PDFs back to back while ``--chatters`` clients send concierge messages, and
+the concierge p50/p99 is reported for three runs:
+
+- idle: no uploads, the floor set by the stub LLM.
+- blocking: the old path, with the OCR call made synchronously inside the handler.
+- async: the current path, using the async client behind ``DOCAI_MAX_CONCURRENCY``.
+
+The stub processor sleeps ``--ocr-seconds`` per document and the stub LLM
+sleeps ``--llm-seconds`` per reply.
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+
+from common import ms, percentile, report
+
+os.environ.setdefault("CONCIERGE_STORE", "memory")
+
+import httpx
+from google.cloud import documentai
+from pypdf import PdfWriter
+
+from App.core.llm import groq_client
+from App.services.extraction import extract
+from main import app
+
+
+def blank_pdf(pages: int = 1) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class NoCache:
+    """Every upload is a miss, so each one reaches the processor."""
+
+    async def aget(self, key):
+        return None
+
+    async def aset(self, key, value):
+        pass
+
+
+def install_stubs(mode: str, ocr_seconds: float, llm_seconds: float):
+    async def chat(payload, timeout=None, label="concierge"):
+        await asyncio.sleep(llm_seconds)
+        return {"choices": [{"message": {"content": "Ask for the out-the-door price in writing."}}]}
+
+    groq_client.chat = chat
+    extract.get_ocr_cache = lambda: NoCache()
+
+    if mode == "blocking":
+        async def process_document_async(content, mime_type="application/pdf"):
+            time.sleep(ocr_seconds)  # the synchronous client call the route used to make
+            return documentai.Document(text="Cash Price: $20,000")
+
+        extract.process_document_async = process_document_async
+    else:
+        class AsyncProcessor:
+            async def process_document(self, request):
+                await asyncio.sleep(ocr_seconds)
+                return documentai.ProcessResponse(document=documentai.Document(text="Cash Price: $20,000"))
+
+        extract.process_document_async = ORIGINAL_PROCESS
+        extract.get_documentai_async_client = lambda: AsyncProcessor()
+
+
+ORIGINAL_PROCESS = extract.process_document_async
+
+
+async def run(mode: str, args) -> dict:
+    install_stubs(mode, args.ocr_seconds, args.llm_seconds)
+    extract._docai_semaphore = None
+    pdf = blank_pdf()
+    latencies = []
+    uploads = 0
+    deadline = time.perf_counter() + args.seconds
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def uploader():
+            nonlocal uploads
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    "/extraction/upload", files=[("files", ("deal.pdf", pdf, "application/pdf"))]
+                )
+                response.raise_for_status()
+                uploads += 1
+
+        async def chatter(index: int):
+            # Open loop: latency counts from when the message was due, so time
+            # spent waiting for a blocked loop is not hidden
+            turn = 0
+            due = time.perf_counter()
+            while due < deadline:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                response = await client.post(
+                    "/concierge", params={"thread_id": f"bench-{index}-{turn % 4}"},
+                    json={"message": "The dealer added a $1,995 protection package, is that normal?"},
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - due)
+                turn += 1
+                due += args.chat_interval
+
+        workers = [chatter(i) for i in range(args.chatters)]
+        if mode != "idle":
+            workers += [uploader() for _ in range(args.uploaders)]
+        await asyncio.gather(*workers)
+
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "chats": len(latencies),
+        "uploads": uploads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--uploaders", type=int, default=16)
+    parser.add_argument("--chatters", type=int, default=4)
+    parser.add_argument("--ocr-seconds", type=float, default=0.5)
+    parser.add_argument("--llm-seconds", type=float, default=0.05)
+    parser.add_argument("--chat-interval", type=float, default=0.1, help="seconds between messages per chatter")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in ("idle", "blocking", "async"):
+        result = asyncio.run(run(mode, args))
+        rows.append((
+            mode, ms(result["p50"]), ms(result["p99"]), result["chats"],
+            f"{result['uploads'] / args.seconds:.1f}/s",
+        ))
+    report(
+        f"/concierge under {args.uploaders} saturating uploaders "
+        f"(stub OCR {args.ocr_seconds}s, stub LLM {args.llm_seconds}s, {args.seconds}s per run)",
+        ["mode", "concierge p50", "concierge p99", "chats", "uploads"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Bytes sent to Document AI and OCR latency with and without pre-processing (user-010).
+
+A set of phone-style photos (12 MP colour JPEGs of a slightly skewed page,
+one page shot twice) is turned into the OCR request PDF twice: as uploaded,
+and through ``preprocess_uploads`` (grayscale, downscale, deskew, EXIF strip,
+near-duplicate drop). Pass ``--images`` to use real photos instead.
+
+OCR latency is modelled by default as upload time at ``--uplink-mbps`` plus
+``--ocr-ms-per-page`` per page. With ``--live``, both PDFs are sent to the
+configured Document AI processor instead, which needs real credentials.
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from common import kib, ms, ratio, report
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from App.services.extraction.ingest import SpooledUpload, assemble_pdf, file_extension, read_pdf
+from App.services.extraction.preprocess import preprocess_uploads, shutdown_preprocess_pool
+
+
+def photo(path: Path, seed: int, skew: float, size=(4032, 3024)):
+    """A page of text-like lines on a tinted, noisy background, shot at an angle."""
+    rng = random.Random(seed)
+    page = Image.new("RGB", size, (236, 230, 214))
+    draw = ImageDraw.Draw(page)
+    for top in range(260, size[1] - 260, 70):
+        left = 300
+        while left < size[0] - 500:
+            width = rng.randint(60, 260)
+            draw.rectangle([left, top, left + width, top + 26], fill=(40, 38, 52))
+            left += width + rng.randint(25, 45)
+    noise = Image.effect_noise(size, 24).convert("RGB")
+    page = Image.blend(page, noise, 0.12).filter(ImageFilter.GaussianBlur(1.2))
+    page = page.rotate(skew, resample=Image.Resampling.BICUBIC, fillcolor=(90, 80, 70))
+    page.save(path, "JPEG", quality=92)
+
+
+def synthetic_photos(workdir: Path, count: int):
+    paths = []
+    for index in range(count):
+        path = workdir / f"photo-{index}.jpg"
+        photo(path, seed=index, skew=random.Random(index).uniform(-3, 3))
+        paths.append(path)
+    # The last page shot twice
+    again = workdir / f"photo-{count}.jpg"
+    with Image.open(paths[-1]) as image:
+        image.rotate(0.3, resample=Image.Resampling.BICUBIC).save(again, "JPEG", quality=90)
+    return paths + [again]
+
+
+def uploads_for(paths, workdir: Path):
+    uploads = []
+    for index, src in enumerate(paths):
+        ext = file_extension(src.name)
+        path = workdir / f"upload-{index}{ext}"
+        shutil.copyfile(src, path)
+        uploads.append(SpooledUpload(src.name, ext, path, path.stat().st_size))
+    return uploads
+
+
+def modelled_ocr(pdf: bytes, pages: int, args) -> float:
+    return len(pdf) * 8 / (args.uplink_mbps * 1e6) + pages * args.ocr_ms_per_page / 1000
+
+
+async def live_ocr(pdf: bytes) -> float:
+    from App.services.extraction.extract import process_document_async
+
+    started = time.perf_counter()
+    await process_document_async(pdf)
+    return time.perf_counter() - started
+
+
+async def build(paths, preprocess: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        uploads = uploads_for(paths, workdir)
+        started = time.perf_counter()
+        if preprocess:
+            uploads = await preprocess_uploads(uploads, workdir)
+        prepared = time.perf_counter()
+        pdf = read_pdf(assemble_pdf(uploads, workdir))
+        assembled = time.perf_counter()
+    return pdf, len(uploads), prepared - started, assembled - prepared
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = sorted(p for p in args.images.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        else:
+            paths = synthetic_photos(Path(tmp), args.photos)
+        uploaded = sum(p.stat().st_size for p in paths)
+
+        # Warm the process pool so worker start-up is not billed to the first request
+        await build(paths[:1], preprocess=True)
+
+        rows = []
+        base_bytes = base_total = None
+        for label, preprocess in (("as uploaded", False), ("pre-processed", True)):
+            pdf, pages, prep, assemble = await build(paths, preprocess)
+            ocr = await live_ocr(pdf) if args.live else modelled_ocr(pdf, pages, args)
+            total = prep + assemble + ocr
+            if base_bytes is None:
+                base_bytes, base_total = len(pdf), total
+            rows.append((
+                label, pages, kib(len(pdf)), ratio(base_bytes, len(pdf)),
+                ms(prep), ms(assemble), ms(ocr), ms(total), ratio(base_total, total),
+            ))
+    shutdown_preprocess_pool()
+
+    ocr_source = "live Document AI" if args.live else (
+        f"modelled: {args.uplink_mbps} Mbit/s uplink + {args.ocr_ms_per_page} ms/page"
+    )
+    report(
+        f"{len(paths)} photos, {kib(uploaded)} uploaded; OCR {ocr_source}",
+        ["request", "pages", "PDF bytes", "smaller", "pre-process", "assemble", "OCR", "end to end", "faster"],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=Path, help="directory of real photos to use instead")
+    parser.add_argument("--photos", type=int, default=4, help="distinct synthetic pages (one more is a duplicate)")
+    parser.add_argument("--uplink-mbps", type=float, default=50.0)
+    parser.add_argument("--ocr-ms-per-page", type=float, default=900.0)
+    parser.add_argument("--live", action="store_true", help="call the configured Document AI processor")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
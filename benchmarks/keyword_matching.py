@@ -0,0 +1,87 @@
+"""Concierge keyword detection on long pasted contracts (user-021).
+
+``legacy`` is the original four passes (scenario, region, tactic and red
+flags), each lower-casing the message and running ``any(keyword in
+message)`` over its table. ``matcher`` is ``KeywordMatcher.find``, which
+``/concierge`` now calls once per message. Both run on pasted contracts of
+increasing length. A region false-positive rate is also measured on
+sentences that name no region.
+
+The matcher anchors every keyword on word boundaries, which plain ``in``
+cannot do. It costs a few more microseconds on a short message, about 30 µs
+in all, and is faster once a message runs to pages.
+"""
+import argparse
+import random
+
+from common import best_of, ratio, report, us
+
+from prompt_reduction import BOILERPLATE
+
+from App.services.chatbot.chatbot_routes import (
+    DEALER_TACTICS, RED_FLAGS, REGIONAL_KEYWORDS, SCENARIO_KEYWORDS, keyword_matcher,
+)
+
+KEY_LINES = (
+    "The dealer says this price expires today and the protection package required is pre-installed.",
+    "Doc fee 899.00  Processing fee 299.00  Market adjustment 2,500.00",
+    "I'm a first time buyer and the monthly payment is just $489 per month.",
+)
+NO_REGION = (
+    "My car payment went up after the dealer added a neutral warranty.",
+    "Can you check the numbers? The cash price seems high.",
+    "They said the menu of products is standard on every vehicle.",
+    "Education discount was removed because of a recalculation.",
+    "The salesperson called twice about the trade-in valuation.",
+)
+
+
+def legacy(message: str):
+    message_lower = message.lower()
+    scenario = next((s for s, kws in SCENARIO_KEYWORDS.items() if any(k in message_lower for k in kws)), "standard")
+    message_lower = message.lower()
+    tactic = next((t for t, kws in DEALER_TACTICS.items() if any(k in message_lower for k in kws)), None)
+    message_lower = message.lower()
+    flags = [flag for flag in RED_FLAGS if flag in message_lower]
+    message_lower = message.lower()
+    region = next((r for r, kws in REGIONAL_KEYWORDS.items() if any(k in message_lower for k in kws)), None)
+    return scenario, region, tactic, flags
+
+
+def contract(chars: int, seed: int) -> str:
+    rng = random.Random(seed)
+    lines = list(KEY_LINES)
+    while sum(len(line) + 1 for line in lines) < chars:
+        lines.insert(rng.randrange(len(lines) + 1), rng.choice(BOILERPLATE))
+    return "\n".join(lines)[:chars]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 5_000, 20_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        message = contract(size, seed=size)
+        number = max(1, 200_000 // size)
+        before = best_of(lambda: legacy(message), repeat=args.repeat, number=number)
+        after = best_of(lambda: keyword_matcher.find(message), repeat=args.repeat, number=number)
+        rows.append((f"{size:,} chars", us(before), us(after), ratio(before, after)))
+    report(
+        f"Keyword detection per message (best of {args.repeat})",
+        ["message", "legacy (4 passes)", "matcher (1 pass)", "speed-up"],
+        rows,
+    )
+
+    legacy_fp = sum(legacy(text)[1] is not None for text in NO_REGION)
+    matcher_fp = sum(keyword_matcher.find(text).region is not None for text in NO_REGION)
+    print(
+        f"region false positives on {len(NO_REGION)} region-free sentences: "
+        f"legacy {legacy_fp}, matcher {matcher_fp}"
+    )
+
+
+if __name__ == "__main__":
+    main()
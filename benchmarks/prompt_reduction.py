@@ -0,0 +1,141 @@
+"""Rating prompt size and latency before/after local pre-extraction (user-013).
+
+A seeded corpus of multi-page retail installment contracts (OCR text with
+boilerplate, key lines and Document AI form fields) is sent two ways:
+
+- raw: the whole ``DealInput`` (text plus every form field), as ``audit_deal``
+  used to send it.
+- pre-extracted: ``pre_extract(...).prompt_payload()``, the verified fields
+  plus the unparsed remainder.
+
+Tokens are estimated at ~4 characters each, as ``log_prompt_reduction`` does.
+The system prompt is the same for both and is left out. With ``--live``,
+each payload is also sent through ``call_groq_audit`` and the round trip is
+timed, which needs a real ``GROQ_API_KEY``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from common import ms, percentile, report, us
+
+from App.services.rating.pre_extract import pre_extract
+from App.services.rating.rating_schema import DealInput, FormField
+
+VINS = ("1HGCM82633A004352", "1M8GDM9AXKP042788", "11111111111111111")
+BOILERPLATE = (
+    "Buyer agrees to pay the Amount Financed plus finance charges according to the payment schedule below.",
+    "Seller may assign this contract and retain its right to receive a part of the Finance Charge.",
+    "If any payment is more than 10 days late, Buyer will be charged 5% of the part of the payment that is late.",
+    "Buyer has the right to prepay in full or in part at any time without penalty.",
+    "This contract is governed by the law of the state in which it is signed, except as preempted by federal law.",
+    "Any insurance or service contract is optional and not required to obtain credit.",
+    "NOTICE: ANY HOLDER OF THIS CONSUMER CREDIT CONTRACT IS SUBJECT TO ALL CLAIMS AND DEFENSES.",
+    "The vehicle is sold with no warranty other than those stated in writing by the manufacturer.",
+)
+
+
+def contract(rng: random.Random, pages: int) -> DealInput:
+    price = round(rng.uniform(18000, 60000), 2)
+    fields = {
+        "Buyer Name": rng.choice(["Jane Doe", "Carlos Ruiz", "Mei Chen"]),
+        "Dealer": rng.choice(["Sunrise Motors", "Lakeside Auto Group"]),
+        "VIN": rng.choice(VINS),
+        "Contract Date": f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/2026",
+        "Cash Price": f"${price:,.2f}",
+        "Annual Percentage Rate": f"{rng.uniform(2, 14):.2f}%",
+        "Number of Payments": str(rng.choice([48, 60, 72, 84])),
+        "GAP Waiver": f"${rng.uniform(500, 2000):,.2f}",
+        "Service Contract": f"${rng.uniform(1500, 5000):,.2f}",
+        "Odometer": f"{rng.randint(5, 60000):,}",
+    }
+    lines = []
+    for page in range(1, pages + 1):
+        lines.append(f"RETAIL INSTALLMENT SALE CONTRACT - PAGE {page} OF {pages}")
+        lines += [rng.choice(BOILERPLATE) for _ in range(rng.randint(25, 40))]
+        if page == 1:
+            lines += [f"{name}: {value}" for name, value in fields.items()]
+    form_fields = [
+        FormField(name=name, value=value, confidence=round(rng.uniform(0.8, 0.99), 2))
+        for name, value in fields.items()
+    ] + [
+        FormField(name=f"Initials {i}", value="JD", confidence=0.6) for i in range(pages * 2)
+    ]
+    return DealInput(text="\n".join(lines), form_fields=form_fields)
+
+
+def raw_payload(deal: DealInput) -> dict:
+    return {"text": deal.text, "form_fields": [f.model_dump() for f in deal.form_fields]}
+
+
+def tokens(payload: dict) -> int:
+    return len(json.dumps(payload, ensure_ascii=False)) // 4
+
+
+async def live_latency(payloads) -> float:
+    from App.services.rating.rating import call_groq_audit
+
+    times = []
+    for payload in payloads:
+        started = time.perf_counter()
+        await call_groq_audit(payload)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--live", action="store_true", help="time call_groq_audit on a few payloads of each kind")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [contract(rng, rng.randint(max(1, args.pages // 2), args.pages)) for _ in range(args.deals)]
+
+    raw = [raw_payload(deal) for deal in corpus]
+    extract_times, reduced = [], []
+    for deal in corpus:
+        started = time.perf_counter()
+        pre = pre_extract(deal)
+        payload = pre.prompt_payload()
+        extract_times.append(time.perf_counter() - started)
+        reduced.append(payload)
+
+    raw_tokens = [tokens(p) for p in raw]
+    reduced_tokens = [tokens(p) for p in reduced]
+    found = statistics.mean(len(p["extracted"]) for p in reduced)
+
+    rows = [
+        ("raw", f"{statistics.mean(raw_tokens):,.0f}", f"{percentile(raw_tokens, 99):,}", "-", "-"),
+        (
+            "pre-extracted", f"{statistics.mean(reduced_tokens):,.0f}", f"{percentile(reduced_tokens, 99):,}",
+            f"{100 * (1 - sum(reduced_tokens) / sum(raw_tokens)):.0f}%",
+            f"{us(percentile(extract_times, 50))} / {us(percentile(extract_times, 99))}",
+        ),
+    ]
+    report(
+        f"{args.deals} contracts of up to {args.pages} pages; {found:.1f} fields extracted locally on average",
+        ["user message", "mean tokens", "p99 tokens", "smaller", "pre_extract p50 / p99"],
+        rows,
+    )
+
+    if args.live:
+        sample = min(5, args.deals)
+        before = asyncio.run(live_latency(
+            [{"extracted": {}, "unverified": {}, "remainder": json.dumps(p)} for p in raw[:sample]]
+        ))
+        after = asyncio.run(live_latency(reduced[:sample]))
+        report(
+            f"call_groq_audit round trip, median of {sample}",
+            ["user message", "latency"],
+            [("raw", ms(before)), ("pre-extracted", ms(after))],
+        )
+
+
+if __name__ == "__main__":
+    main()
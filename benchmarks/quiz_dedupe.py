@@ -0,0 +1,137 @@
+"""Near-duplicate lookup cost with 1M stored questions (user-019).
+
+Fills a ``NearDuplicateIndex`` in an on-disk SQLite database (as the quiz
+bank uses it) with ``--entries`` signatures, then times lookups for new
+questions (misses) and reworded copies of stored ones (hits). Filler
+signatures are random rather than computed from text and are bulk-loaded,
+which keeps a 1M fill to a few minutes. A real question's signature
+behaves the same against the index.
+
+For reference, the old exact-match ``set`` is timed too; it cannot see a
+reworded question at all.
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+from common import percentile, report, us
+
+from App.services.quiz.dedupe import NUM_PERM, NearDuplicateIndex, band_keys, normalize, signature
+
+TOPIC, LANGUAGE = "financing", "en"
+QUESTIONS = [
+    "What does APR stand for on a car loan?",
+    "Which add-on protects you if the car is totaled and you owe more than it is worth?",
+    "Why can a longer loan term cost more overall even with a lower monthly payment?",
+    "What is a money factor in a car lease and how does it relate to APR?",
+    "Which fee on a purchase agreement is usually negotiable: doc fee or sales tax?",
+    "What should you check on a vehicle service contract before you sign it?",
+]
+REWORDED = [
+    "What does the APR stand for on a car loan?",
+    "Which add-on protects you if your car is totaled and you owe more than it's worth?",
+    "Why can a longer loan term cost more overall, even with a lower monthly payment?",
+    "What is the money factor in a car lease, and how does it relate to APR?",
+    "Which fee on a purchase agreement is usually negotiable - doc fee or sales tax?",
+    "What should you check on a vehicle service contract before signing it?",
+]
+
+
+def fill(conn: sqlite3.Connection, entries: int, seed: int) -> int:
+    """Bulk-load random signatures into the index tables ``NearDuplicateIndex.add`` writes."""
+    rng = random.Random(seed)
+    batch = 20000
+    next_id = 1
+    while next_id <= entries:
+        ids = range(next_id, min(next_id + batch, entries + 1))
+        sigs = [array("I", (rng.getrandbits(32) for _ in range(NUM_PERM))) for _ in ids]
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO question_signatures (question_id, topic, language, signature) VALUES (?, ?, ?, ?)",
+            [(i, TOPIC, LANGUAGE, sig.tobytes()) for i, sig in zip(ids, sigs)],
+        )
+        conn.executemany(
+            "INSERT INTO question_bands (topic, language, band_key, question_id) VALUES (?, ?, ?, ?)",
+            [(TOPIC, LANGUAGE, key, i) for i, sig in zip(ids, sigs) for key in band_keys(sig)],
+        )
+        conn.execute("COMMIT")
+        next_id = ids[-1] + 1
+    return next_id
+
+
+def time_lookups(index, texts, rounds):
+    sig_times, probe_times, found = [], [], 0
+    for _ in range(rounds):
+        for text in texts:
+            started = time.perf_counter()
+            sig = signature(text)
+            signed = time.perf_counter()
+            found += index.find(TOPIC, LANGUAGE, sig) is not None
+            probe_times.append(time.perf_counter() - signed)
+            sig_times.append(signed - started)
+    return sig_times, probe_times, found / (rounds * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bank.db"
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        index = NearDuplicateIndex(conn, args.threshold, max_entries=args.entries + len(QUESTIONS))
+
+        started = time.perf_counter()
+        next_id = fill(conn, args.entries, args.seed)
+        for offset, text in enumerate(QUESTIONS):
+            index.add(next_id + offset, TOPIC, LANGUAGE, signature(text))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        fill_seconds = time.perf_counter() - started
+        db_bytes = sum(p.stat().st_size for p in Path(tmp).iterdir())
+
+        novel = [
+            "How does a rebate change the amount you finance?",
+            "What is negative equity when trading in a car?",
+            "Is nitrogen tire fill worth paying for?",
+        ]
+        hit_sig, hit_probe, hit_rate = time_lookups(index, REWORDED, args.rounds)
+        miss_sig, miss_probe, false_rate = time_lookups(index, novel, args.rounds)
+        conn.close()
+
+    exact = {normalize(q) for q in QUESTIONS} | {str(i) for i in range(args.entries)}
+    exact_times = []
+    for _ in range(args.rounds):
+        for text in REWORDED:
+            t = time.perf_counter()
+            _ = normalize(text) in exact
+            exact_times.append(time.perf_counter() - t)
+    exact_hits = sum(normalize(text) in exact for text in REWORDED) / len(REWORDED)
+
+    rows = [
+        ("reworded (should hit)", us(percentile(hit_sig, 50)), us(percentile(hit_probe, 50)),
+         us(percentile(hit_probe, 99)), f"{100 * hit_rate:.0f}%"),
+        ("new question (should miss)", us(percentile(miss_sig, 50)), us(percentile(miss_probe, 50)),
+         us(percentile(miss_probe, 99)), f"{100 * false_rate:.0f}%"),
+        ("exact set, reworded (before)", "-", us(percentile(exact_times, 50)),
+         us(percentile(exact_times, 99)), f"{100 * exact_hits:.0f}%"),
+    ]
+    report(
+        f"{args.entries:,} stored signatures, threshold {args.threshold}; "
+        f"filled in {fill_seconds:.0f}s, {db_bytes / 2 ** 20:.0f} MiB on disk",
+        ["lookup", "signature p50", "probe p50", "probe p99", "flagged duplicate"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Serialise time and bytes on the wire for an extraction result (user-009).
+
+The result is ``document_to_result`` over a synthetic 20-page packet (see
+``anchor_resolution.py``). ``fastapi`` is the old path: validate against
+``ExtractResponse``, ``jsonable_encoder`` and stdlib ``json``. The other rows
+go through ``encode_body``/``compress_body`` exactly as ``encode_response``
+does for the matching ``Accept``/``Accept-Encoding`` headers.
+"""
+import argparse
+import json
+
+from common import best_of, kib, ms, ratio, report
+
+from fastapi.encoders import jsonable_encoder
+
+from anchor_resolution import synthetic_document
+from App.core.responses import compress_body, encode_body
+from App.services.extraction.extract import document_to_result
+from App.services.extraction.extract_schema import ExtractionDetail, ExtractResponse
+
+
+def fastapi_default(result: dict) -> bytes:
+    model = ExtractResponse.model_validate(result)
+    return json.dumps(jsonable_encoder(model, exclude_none=True)).encode()
+
+
+def negotiated(result: dict, accept: str, accept_encoding: str) -> bytes:
+    body, _ = encode_body(result, accept)
+    return compress_body(body, accept_encoding)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--detail", default=ExtractionDetail.fields_tables.value,
+                        choices=[d.value for d in ExtractionDetail])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = synthetic_document(args.pages, fields=60, tables=2, rows=20, cols=5)
+    result = document_to_result(document, ExtractionDetail(args.detail))
+
+    cases = [
+        ("fastapi + json (before)", lambda: fastapi_default(result)),
+        ("orjson", lambda: negotiated(result, "application/json", "")),
+        ("orjson + gzip", lambda: negotiated(result, "application/json", "gzip")),
+        ("orjson + br", lambda: negotiated(result, "application/json", "br")),
+        ("msgpack", lambda: negotiated(result, "application/msgpack", "")),
+        ("msgpack + br", lambda: negotiated(result, "application/msgpack", "br")),
+    ]
+
+    rows = []
+    base_time = base_size = None
+    for label, encode in cases:
+        size = len(encode())
+        seconds = best_of(encode, repeat=args.repeat)
+        if base_time is None:
+            base_time, base_size = seconds, size
+        rows.append((label, ms(seconds), ratio(base_time, seconds), kib(size), ratio(base_size, size)))
+
+    report(
+        f"{args.pages}-page packet at detail={args.detail} (best of {args.repeat})",
+        ["encoding", "encode time", "faster", "bytes on the wire", "smaller"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
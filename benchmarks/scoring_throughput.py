@@ -0,0 +1,88 @@
+"""Throughput of the rules engine alone (user-012).
+
+Scores a seeded corpus of varied deals (leases, dealer and outside
+financing, GAP/VSC/add-on mixes) with ``score_deal``. Reports audits/sec and
+per-audit latency, both for already-validated ``DealFields`` and including
+the ``DealFields`` validation that every audit pays for.
+"""
+import argparse
+import random
+import time
+
+from common import percentile, report, us
+
+from App.services.rating.rating_schema import DealFields
+from App.services.rating.scoring import score_deal
+
+ADD_ONS = ["Nitrogen tires", "VIN etch", "Key replacement", "Paint protection", "Theft deterrent", "Wheel & tire"]
+
+
+def random_deal(rng: random.Random) -> dict:
+    msrp = rng.choice([None, rng.uniform(18000, 95000)])
+    lease = rng.random() < 0.2
+    deal = {
+        "buyer_name": "Jane Doe",
+        "dealer_name": "Sunrise Motors",
+        "selling_price": (msrp or 30000) * rng.uniform(0.9, 1.05),
+        "msrp": msrp,
+        "gap_price": rng.choice([None, rng.uniform(400, 2500)]),
+        "vsc_price": rng.choice([None, rng.uniform(1200, 7000)]),
+        "add_ons": [
+            {"name": name, "price": rng.uniform(50, 1200)}
+            for name in rng.sample(ADD_ONS, rng.randint(0, 4))
+        ],
+        "apr": rng.choice([None, rng.uniform(0, 16)]),
+        "apr_source": rng.choice(["Dealer", "Cash", "OSF", None]),
+        "term_months": rng.choice([None, 36, 48, 60, 72, 75, 84]),
+        "quote_type": "Lease" if lease else rng.choice(["Pencil", "Purchase Agreement", "Cash Offer"]),
+    }
+    if lease:
+        deal["money_factor"] = rng.uniform(0.0008, 0.0035)
+        deal["lease_gap_included"] = rng.random() < 0.5
+    return deal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deals", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=12)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raw = [random_deal(rng) for _ in range(args.deals)]
+    validated = [DealFields(**deal) for deal in raw]
+
+    rows = []
+    for label, run in (
+        ("score_deal", lambda i: score_deal(validated[i])),
+        ("validate + score_deal", lambda i: score_deal(DealFields(**raw[i]))),
+    ):
+        for i in range(min(500, args.deals)):  # warm-up
+            run(i)
+        latencies = []
+        started = time.perf_counter()
+        for i in range(args.deals):
+            t = time.perf_counter()
+            run(i)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - started
+        rows.append((
+            label, f"{args.deals / elapsed:,.0f}/s",
+            us(percentile(latencies, 50)), us(percentile(latencies, 99)),
+        ))
+
+    badges = {}
+    for fields in validated:
+        badge = score_deal(fields)["badge"]
+        badges[badge] = badges.get(badge, 0) + 1
+
+    report(
+        f"Rules engine on {args.deals:,} seeded deals, one core",
+        ["path", "audits/sec", "p50", "p99"],
+        rows,
+    )
+    print("badge mix: " + ", ".join(f"{badge} {count}" for badge, count in sorted(badges.items())))
+
+
+if __name__ == "__main__":
+    main()
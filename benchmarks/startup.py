@@ -0,0 +1,118 @@
+"""Cold start: ``import main`` and first-request latency (user-006).
+
+Each sample is a fresh interpreter. ``eager`` rebuilds the old import-time
+work on top of today's import: ``Settings()``, the service-account
+credentials and the two ``DocumentProcessorServiceClient`` instances that
+``extract.py`` and ``extract_route.py`` each created at import. ``lazy`` is
+the current app, with the shared client built once in the lifespan hook. A
+throwaway service-account key is generated, so no real credentials are used
+and nothing touches the network.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import ROOT, ms, report
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+SAMPLE = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+if sys.argv[1] == "eager":
+    from google.cloud import documentai
+    from google.oauth2 import service_account
+    from App.core.config import get_settings
+    settings = get_settings()
+    for _ in range(2):
+        credentials = service_account.Credentials.from_service_account_file(settings.gcp_key_path)
+        documentai.DocumentProcessorServiceClient(credentials=credentials)
+    ready = time.perf_counter()
+    from fastapi.testclient import TestClient
+    client = TestClient(main.app)
+    client.get("/extraction/cache/stats").raise_for_status()
+    done = time.perf_counter()
+else:
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        ready = time.perf_counter()
+        client.get("/extraction/cache/stats").raise_for_status()
+        done = time.perf_counter()
+
+print(json.dumps({"import": imported - started, "startup": ready - started, "first": done - started}))
+"""
+
+NO_CREDENTIALS = "import main"
+
+
+def service_account_key(path: Path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    path.write_text(json.dumps({
+        "type": "service_account",
+        "project_id": "bench-project",
+        "private_key_id": "bench",
+        "private_key": pem,
+        "client_email": "bench@bench-project.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }))
+
+
+def sample(mode: str, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", SAMPLE, mode], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = Path(tmp) / "key.json"
+        service_account_key(key_path)
+        env = {
+            **os.environ,
+            "GCP_KEY_PATH": str(key_path),
+            "CONCIERGE_STORE": "memory",
+            "CONCIERGE_GLOSSARY_PREWARM": "false",
+            "BATCH_DB_PATH": str(Path(tmp) / "jobs.db"),
+            "BATCH_STORAGE_DIR": str(Path(tmp) / "files"),
+        }
+
+        rows = []
+        for mode in ("eager", "lazy"):
+            samples = [sample(mode, env) for _ in range(args.runs)]
+            rows.append((mode, *(
+                ms(statistics.median(s[name] for s in samples)) for name in ("import", "startup", "first")
+            )))
+
+        bare = {k: v for k, v in env.items() if not k.startswith(("GCP_", "GROQ_"))}
+        imported = subprocess.run([sys.executable, "-c", NO_CREDENTIALS], cwd=ROOT, env=bare,
+                                  capture_output=True).returncode == 0
+
+    report(
+        f"Cold start, median of {args.runs} fresh interpreters (times from interpreter start)",
+        ["mode", "import main", "ready to serve", "first response"],
+        rows,
+    )
+    print(f"`import main` with no GCP/Groq environment: {'ok' if imported else 'fails'}")
+
+
+if __name__ == "__main__":
+    main()
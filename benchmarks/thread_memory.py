@@ -0,0 +1,138 @@
+"""Resident memory of 10k active concierge threads (user-024).
+
+``legacy`` keeps each thread as the old list of role/content dicts: a
+copy of the rendered system prompt at ``history[0]``, then every turn.
+These sit in an ``LRUCache`` that counts threads. ``compact`` keeps
+``Thread`` records in ``MemoryConversationStore`` with a budget large
+enough to keep every thread. ``budget`` fills the same store with a budget too small for every
+thread, to show eviction holding memory at the budget.
+
+Each mode runs in a fresh interpreter. The RSS growth from filling the
+cache is reported, so the numbers include allocator overhead, which
+``Thread.nbytes`` does not see. Turn text is random words drawn from
+contract boilerplate, so zlib compresses it no better than real chat. No
+summaries are folded in, so every turn outside the window stays in the
+thread, compressed.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import subprocess
+import sys
+
+from common import ROOT, kib, report
+
+from prompt_reduction import BOILERPLATE
+
+VOCABULARY = " ".join(BOILERPLATE).lower().split()
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found in /proc/self/status")
+
+
+def sentence(rng: random.Random, chars: int) -> str:
+    words = []
+    while sum(len(word) + 1 for word in words) < chars:
+        words.append(rng.choice(VOCABULARY))
+    return " ".join(words).capitalize() + "."
+
+
+def conversation(index: int, turns: int):
+    rng = random.Random(index)
+    return [
+        ("user" if turn % 2 else "assistant", sentence(rng, 160 if turn % 2 else 260))
+        for turn in range(turns)
+    ]
+
+
+def fill(mode: str, threads: int, turns: int, budget: int) -> dict:
+    from cachetools import LRUCache
+
+    from App.services.chatbot.chatbot_routes import ChatRequest, build_turn
+    from App.services.chatbot.history import Thread
+    from App.services.chatbot.store import MemoryConversationStore
+
+    payload, _ = build_turn(ChatRequest(message="I'm a first time buyer and want to lease"), None)
+    system_prompt = payload["messages"][0]["content"]
+    context = ("first_time", None, None)
+
+    async def run() -> dict:
+        if mode == "legacy":
+            cache = LRUCache(maxsize=threads)
+        else:
+            cache = MemoryConversationStore(max_bytes=budget, ttl=3600, lock_lease=5)
+
+        gc.collect()
+        before = rss_bytes()
+        weight = 0
+        for index in range(threads):
+            thread_id = f"thread-{index}"
+            if mode == "legacy":
+                # The old route re-rendered the prompt into history[0] every turn
+                history = [{"role": "system", "content": "".join([system_prompt])}]
+                history += [{"role": role, "content": text} for role, text in conversation(index, turns)]
+                cache[thread_id] = history
+            else:
+                thread = Thread(context)
+                for role, text in conversation(index, turns):
+                    thread.append(role, text)
+                await cache.put(thread_id, thread)
+        gc.collect()
+        grown = rss_bytes() - before
+
+        if mode == "legacy":
+            kept = len(cache)
+        else:
+            kept = len(cache._threads)
+            weight = cache._threads.currsize
+        return {"rss": grown, "kept": kept, "weight": weight}
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=20, help="messages stored per thread")
+    parser.add_argument("--budget-mib", type=int, default=16, help="byte budget for the budget mode")
+    parser.add_argument("--mode", choices=["legacy", "compact", "budget"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        budget = args.budget_mib << 20 if args.mode == "budget" else 1 << 30
+        print(json.dumps(fill(args.mode, args.threads, args.turns, budget)))
+        return
+
+    rows = []
+    for mode in ("legacy", "compact", "budget"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--threads", str(args.threads),
+             "--turns", str(args.turns), "--budget-mib", str(args.budget_mib)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out.splitlines()[-1])
+        per_10k = result["rss"] / max(result["kept"], 1) * 10_000
+        rows.append((
+            mode,
+            f"{result['kept']:,}",
+            f"{result['rss'] / (1 << 20):.1f} MiB",
+            f"{per_10k / (1 << 20):.1f} MiB",
+            kib(result["rss"] / max(result["kept"], 1)),
+            f"{result['weight'] / (1 << 20):.1f} MiB" if result["weight"] else "-",
+        ))
+    report(
+        f"{args.threads:,} threads x {args.turns} messages ({args.budget_mib} MiB budget mode)",
+        ["store", "threads kept", "RSS growth", "RSS per 10k kept", "per thread", "nbytes weight"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from App.services.extraction.extract_route import router as extraction_router
 from fastapi.middleware.cors import CORSMiddleware
 from App.services.rating.rating_route import router as rating_router
-from App.services.chatbot.chatbot_routes import router as chatbot_router
+from App.services.chatbot.chatbot_routes import prewarm_glossary, router as chatbot_router
 from App.services.quiz.quiz_routes import router as quiz_router
+from App.core.clients import close_clients, get_documentai_async_client
+from App.core.config import get_settings
+from App.core.llm import groq_client
+from App.services.chatbot.store import close_conversation_store
+from App.services.extraction.batch import ensure_batch_workers, stop_batch_workers
+from App.services.extraction.preprocess import shutdown_preprocess_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings, credentials and the gRPC channel are built once per worker here
+    # instead of at import time, so `import main` works without credentials.
+    get_settings()
+    get_documentai_async_client()
+    ensure_batch_workers()
+    prewarm = asyncio.create_task(prewarm_glossary()) if get_settings().concierge_glossary_prewarm else None
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    await stop_batch_workers()
+    shutdown_preprocess_pool()
+    await close_conversation_store()
+    await close_clients()
+    await groq_client.close()
+
 
 app = FastAPI(
               title="Document-AI FastAPI", 
-              version="1.0.0"
+              version="1.0.0",
+              lifespan=lifespan
               )
 
 app.include_router(extraction_router)
 app.include_router(rating_router)
 app.include_router(chatbot_router)
-app.include_router(quiz_router)
\ No newline at end of file
+app.include_router(quiz_router)
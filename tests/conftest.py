@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings are read lazily; the required ones only need to be present
+os.environ.setdefault("GCP_PROJECT_ID", "test-project")
+os.environ.setdefault("GCP_PROCESSOR_ID", "test-processor")
+os.environ.setdefault("GROQ_URL", "http://groq.test/v1/chat/completions")
+os.environ.setdefault("GROQ_MODEL", "test-model")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
@@ -0,0 +1,48 @@
+from google.cloud import documentai
+
+from App.services.extraction.anchors import TextAnchorResolver, raw_document
+
+TEXT = "Buyer Name:\nJane\n  Q. Doe  \nPage 2 footer\n"
+
+
+def anchor(*spans):
+    return documentai.Document.TextAnchor(
+        text_segments=[{"start_index": start, "end_index": end} for start, end in spans]
+    )
+
+
+def resolve(text_anchor):
+    # The resolver reads raw protobuf messages, as document_to_result passes them
+    return TextAnchorResolver(TEXT).resolve(documentai.Document.TextAnchor.pb(text_anchor))
+
+
+def test_multi_segment_anchor_joins_every_segment_in_order():
+    # "Jane\n" and "  Q. Doe  " are separate segments of one field value
+    assert resolve(anchor((12, 17), (17, 27))) == "Jane\n  Q. Doe"
+
+
+def test_segments_are_joined_in_the_order_given():
+    assert resolve(anchor((17, 27), (12, 17))) == "Q. Doe  Jane"
+
+
+def test_single_and_empty_anchors():
+    assert resolve(anchor((0, 11))) == "Buyer Name:"
+    # A missing start_index is 0 in the proto
+    assert resolve(anchor((None, 5))) == "Buyer"
+    assert resolve(anchor()) == ""
+
+
+def test_layout_text_resolves_a_layout_anchor():
+    layout = documentai.Document.Page.Layout(text_anchor=anchor((28, 34), (35, 41)))
+
+    resolver = TextAnchorResolver(TEXT)
+
+    assert resolver.layout_text(documentai.Document.Page.Layout.pb(layout)) == "Page 2footer"
+
+
+def test_raw_document_unwraps_proto_plus_only_once():
+    document = documentai.Document(text=TEXT)
+    raw = raw_document(document)
+
+    assert raw.text == TEXT
+    assert raw_document(raw) is raw
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from App.core.cache import TieredCache
+from App.services.rating import audit_cache, rating_route
+from App.services.rating.audit_cache import AUDIT, STREAM, audit_cache_key, canonical_deal
+from App.services.rating.audit_parser import REQUIRED_SECTIONS
+from App.services.rating.rating_schema import DealInput, FormField
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = TieredCache(max_bytes=1 << 20, ttl=60, db_path=str(tmp_path / "audit.db"))
+    monkeypatch.setattr(audit_cache, "get_audit_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(rating_route.router)
+    return TestClient(app)
+
+
+def deal(*form_fields, text="Cash Price: $20,000"):
+    return DealInput(text=text, form_fields=list(form_fields))
+
+
+def test_canonical_deal_sorts_mixed_value_types():
+    fields = canonical_deal(deal(
+        FormField(name="APR", value=6.9, confidence=0.9),
+        FormField(name="APR", value="6.9%", confidence=None),
+        FormField(name="APR", value=None, confidence=0.5),
+    ))["form_fields"]
+    assert len(fields) == 3
+
+
+def test_key_ignores_whitespace_and_field_order():
+    a = deal(FormField(name="Buyer  Name", value="Jane"), FormField(name="APR", value=6.0), text="a\n\n  b ")
+    b = deal(FormField(name="APR", value=6), FormField(name="buyer name", value="Jane"), text="a\nb")
+    assert audit_cache_key(a) == audit_cache_key(b)
+
+
+def test_stream_and_audit_keys_never_collide():
+    d = deal()
+    assert audit_cache_key(d, STREAM) != audit_cache_key(d, AUDIT)
+    assert audit_cache_key(d) == audit_cache_key(d, AUDIT)
+
+
+def narrative_stream(sections):
+    async def fake_stream(prompt_payload, audit):
+        for section in sections:
+            yield f"### {section}\n{section} text.\n"
+    return fake_stream
+
+
+async def no_model_deal(prompt_payload, partial, missing, label="rating.fix"):
+    return '{"deal": {}}'
+
+
+def test_complete_stream_is_cached_in_its_own_namespace(monkeypatch, cache, client):
+    monkeypatch.setattr(rating_route, "stream_groq_narrative", narrative_stream(REQUIRED_SECTIONS))
+    monkeypatch.setattr(rating_route, "call_groq_fix", no_model_deal)
+    d = deal()
+
+    response = client.post("/rating/stream", json=d.model_dump())
+    assert "event: done" in response.text
+
+    assert cache.get(audit_cache_key(d, STREAM)) is not None
+    assert cache.get(audit_cache_key(d, AUDIT)) is None
+
+
+def test_incomplete_stream_is_not_cached(monkeypatch, cache, client):
+    monkeypatch.setattr(rating_route, "stream_groq_narrative", narrative_stream(REQUIRED_SECTIONS[:2]))
+    monkeypatch.setattr(rating_route, "call_groq_fix", no_model_deal)
+    d = deal()
+
+    response = client.post("/rating/stream", json=d.model_dump())
+    assert "event: done" in response.text
+    assert cache.get(audit_cache_key(d, STREAM)) is None
+
+
+def test_error_results_are_not_cached(cache):
+    asyncio.run(audit_cache.store_audit("k", {"error": "boom"}))
+    assert cache.get("k") is None
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from App.services.rating.audit_parser import (
+    REQUIRED_SECTIONS, loads_tolerant, merge_fix, missing_fields, validate_audit_output,
+)
+from App.services.rating.rating_schema import AuditNarrative, AuditOutput
+
+
+def test_clean_json_is_not_repaired():
+    assert loads_tolerant('{"deal": {"apr": 5}}') == ({"deal": {"apr": 5}}, False)
+
+
+@pytest.mark.parametrize("text", [
+    '```json\n{"deal": {"apr": 5}}\n```',
+    'Here is the audit:\n{"deal": {"apr": 5}}\nLet me know if you need more.',
+    '{"deal": {"apr": 5,},}',
+])
+def test_fences_prose_and_trailing_commas(text):
+    assert loads_tolerant(text) == ({"deal": {"apr": 5}}, True)
+
+
+def test_commas_inside_strings_are_kept():
+    data, _ = loads_tolerant('{"narrative": {"gap_logic": "a, }"},}')
+    assert data["narrative"]["gap_logic"] == "a, }"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"deal": {"apr": 5, "term_months": 7', {"deal": {"apr": 5, "term_months": 7}}),
+    ('{"deal": {"apr": 5}, "narrative": {"gap_logic": "cut of', {"deal": {"apr": 5}, "narrative": {"gap_logic": "cut of"}}),
+    ('{"deal": {"apr": 5, "term_months":', {"deal": {"apr": 5}}),
+    ('{"deal": {"apr": 5, "add_ons": [{"name": "Etch", "pri', {"deal": {"apr": 5, "add_ons": [{"name": "Etch"}]}}),
+])
+def test_truncated_output_is_closed(text, expected):
+    assert loads_tolerant(text) == (expected, True)
+
+
+def test_unrecoverable_output_raises():
+    with pytest.raises(json.JSONDecodeError):
+        loads_tolerant("no json here")
+
+
+def test_invalid_fields_are_dropped_not_the_whole_output():
+    output = validate_audit_output({
+        "deal": {"apr": "not a number", "term_months": 72},
+        "narrative": "should be an object",
+    })
+    assert output.deal.apr is None
+    assert output.deal.term_months == 72
+    assert output.narrative is None
+
+
+def test_missing_fields_and_merge_fix():
+    output = AuditOutput(narrative=AuditNarrative(gap_logic="ok", vsc_logic="none"))
+    missing = missing_fields(output)
+    assert missing[0] == "deal"
+    assert "gap_logic" not in missing
+    assert "vsc_logic" in missing
+
+    fix = AuditOutput(deal={"apr": 5}, narrative=AuditNarrative(**{s: "filled" for s in REQUIRED_SECTIONS}))
+    merged = merge_fix(output, fix)
+    assert merged.deal.apr == 5
+    assert merged.narrative.gap_logic == "ok"
+    assert missing_fields(merged) == []
@@ -0,0 +1,100 @@
+import asyncio
+
+from google.api_core import exceptions as gexc
+
+from App.services.extraction import batch
+from App.services.extraction.batch import BatchJobStore, DONE, PROCESSING
+from App.services.extraction.extract_schema import ExtractionDetail
+from App.services.extraction.ingest import SpooledUpload
+
+
+def make_store(tmp_path, count=1):
+    store = BatchJobStore(str(tmp_path / "batch.db"))
+    uploads = [
+        SpooledUpload(f"doc{i}.pdf", ".pdf", tmp_path / f"doc{i}" / "doc.pdf", 1)
+        for i in range(count)
+    ]
+    job_id = store.create_job(uploads, ExtractionDetail.fields)
+    return store, job_id
+
+
+def run_once(monkeypatch, store, outcome):
+    async def fake_extract(contents, detail=None):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(batch, "get_batch_store", lambda: store)
+    monkeypatch.setattr(batch, "_load_pdf", lambda row: b"%PDF")
+    monkeypatch.setattr(batch, "extract_pdf_async", fake_extract)
+    row = store.claim_next(600)
+    asyncio.run(batch._process(row))
+    return row
+
+
+def test_claim_takes_each_document_once(tmp_path):
+    store, job_id = make_store(tmp_path, count=2)
+    first = store.claim_next(600)
+    second = store.claim_next(600)
+
+    assert first["id"] != second["id"]
+    assert store.claim_next(600) is None
+    assert store.job_status(job_id)["processing"] == 2
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    store, _ = make_store(tmp_path)
+    store.claim_next(600)
+
+    row = store.claim_next(-1)
+    assert row is not None
+    assert row["status"] == PROCESSING
+    assert row["attempts"] == 2
+
+
+def test_retry_waits_for_backoff(tmp_path):
+    store, job_id = make_store(tmp_path)
+    row = store.claim_next(600)
+    store.retry(row["id"], "503", delay=60)
+
+    assert store.claim_next(600) is None
+    assert store.job_status(job_id)["pending"] == 1
+
+    store.retry(row["id"], "503", delay=0)
+    assert store.claim_next(600)["attempts"] == 2
+
+
+def test_transient_error_requeues(monkeypatch, tmp_path):
+    store, job_id = make_store(tmp_path)
+    run_once(monkeypatch, store, gexc.ServiceUnavailable("busy"))
+
+    status = store.job_status(job_id)
+    assert status["pending"] == 1
+    assert status["failed"] == 0
+
+
+def test_permanent_error_fails(monkeypatch, tmp_path):
+    store, job_id = make_store(tmp_path)
+    run_once(monkeypatch, store, ValueError("bad pdf"))
+
+    assert store.job_status(job_id)["failed"] == 1
+    assert store.job_results(job_id, 0, 10)[0]["error"] == "bad pdf"
+
+
+def test_transient_error_fails_after_max_attempts(monkeypatch, tmp_path):
+    store, job_id = make_store(tmp_path)
+    for _ in range(batch.settings.batch_max_attempts):
+        row = run_once(monkeypatch, store, gexc.TooManyRequests("slow down"))
+        store._conn.execute("UPDATE documents SET available_at = 0 WHERE id = ?", (row["id"],))
+
+    status = store.job_status(job_id)
+    assert status["failed"] == 1
+    assert status["pending"] == 0
+
+
+def test_success_completes(monkeypatch, tmp_path):
+    store, job_id = make_store(tmp_path)
+    run_once(monkeypatch, store, {"fields": {}})
+
+    assert store.job_status(job_id)["status"] == "completed"
+    assert store.job_results(job_id, 0, 10)[0]["status"] == DONE
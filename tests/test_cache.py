@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from App.core.cache import CacheStats, SQLiteCache, TieredCache
+
+
+def test_tiered_cache_round_trip_and_promotion(tmp_path):
+    cache = TieredCache(max_bytes=1024, ttl=60, db_path=str(tmp_path / "c.db"))
+    cache.set("k", {"a": 1})
+    cache.memory.clear()
+
+    assert cache.get("k") == {"a": 1}
+    assert cache.get("k") == {"a": 1}
+    assert cache.stats.disk_hits == 1
+    assert cache.stats.memory_hits == 1
+    assert cache.get("missing") is None
+    assert cache.stats.misses == 1
+
+
+def test_purge_drops_expired_rows(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "c.db"), ttl=60)
+    stats = CacheStats()
+    disk.set("old", b"x", stats, ttl=0.01)
+    disk.set("new", b"y", stats)
+    time.sleep(0.02)
+
+    assert disk.purge(stats) == 1
+    assert stats.expirations == 1
+    count = disk._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    assert count == 1
+
+
+def test_purge_trims_to_max_bytes_soonest_expiring_first(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "c.db"), ttl=60, max_bytes=250)
+    stats = CacheStats()
+    for i in range(5):
+        disk.set(f"k{i}", b"x" * 100, stats, ttl=100 + i)
+
+    disk.purge(stats)
+    keys = {row[0] for row in disk._conn.execute("SELECT key FROM cache")}
+    assert keys == {"k3", "k4"}
+    assert stats.evictions == 3
+
+
+def test_set_purges_periodically(tmp_path, monkeypatch):
+    disk = SQLiteCache(str(tmp_path / "c.db"), ttl=60, max_bytes=150)
+    monkeypatch.setattr(SQLiteCache, "PURGE_INTERVAL", 0.0)
+    stats = CacheStats()
+    for i in range(4):
+        disk.set(f"k{i}", b"x" * 100, stats, ttl=100 + i)
+
+    total = disk._conn.execute("SELECT SUM(length(value)) FROM cache").fetchone()[0]
+    assert total <= 150
+
+
+def test_async_api_keeps_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    cache = TieredCache(max_bytes=1024, ttl=60, db_path=str(tmp_path / "c.db"))
+    loop_thread = threading.get_ident()
+    disk_threads = []
+    for name in ("get", "set"):
+        original = getattr(cache.disk, name)
+
+        def record(*args, _original=original, **kwargs):
+            disk_threads.append(threading.get_ident())
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(cache.disk, name, record)
+
+    async def scenario():
+        await cache.aset("k", {"a": 1})
+        cache.memory.clear()
+        first = await cache.aget("k")
+        second = await cache.aget("k")
+        missing = await cache.aget("missing")
+        return first, second, missing
+
+    assert asyncio.run(scenario()) == ({"a": 1}, {"a": 1}, None)
+    assert disk_threads and loop_thread not in disk_threads
+    assert (cache.stats.disk_hits, cache.stats.memory_hits, cache.stats.misses) == (1, 1, 1)
+
+
+def test_async_api_without_disk_tier():
+    cache = TieredCache(max_bytes=1024, ttl=60)
+
+    async def scenario():
+        await cache.aset("k", [1])
+        return await cache.aget("k"), await cache.aget("missing")
+
+    assert asyncio.run(scenario()) == ([1], None)
+    assert cache.stats.misses == 1
@@ -0,0 +1,65 @@
+import sqlite3
+
+from App.services.quiz.dedupe import NearDuplicateIndex, normalize, signature, similarity
+from App.services.quiz.question_bank import QuestionBank
+
+GAP = "What does GAP insurance cover when your car is totaled?"
+GAP_REPHRASED = "What does GAP insurance cover if your car is totaled?"
+APR = "How is the annual percentage rate on an auto loan calculated?"
+
+
+def question(text):
+    return {"question": text, "options": ["a", "b"], "answer": "a"}
+
+
+def test_normalize_ignores_case_and_punctuation():
+    assert normalize("  What's  GAP?? ") == "what s gap"
+
+
+def test_similarity_separates_rephrasings_from_new_questions():
+    assert similarity(signature(GAP), signature(GAP)) == 1.0
+    assert similarity(signature(GAP), signature(GAP_REPHRASED)) >= 0.7
+    assert similarity(signature(GAP), signature(APR)) < 0.3
+
+
+def test_index_find_is_scoped_to_topic_and_language():
+    index = NearDuplicateIndex(sqlite3.connect(":memory:"), threshold=0.7, max_entries=100)
+    index.add(1, "gap", "en", signature(GAP))
+
+    assert index.find("gap", "en", signature(GAP_REPHRASED)) == 1
+    assert index.find("gap", "en", signature(APR)) is None
+    assert index.find("gap", "es", signature(GAP)) is None
+    assert index.find("apr", "en", signature(GAP)) is None
+
+
+def test_index_evicts_oldest_first():
+    index = NearDuplicateIndex(sqlite3.connect(":memory:"), threshold=0.7, max_entries=2)
+    index.add(1, "t", "en", signature(GAP))
+    index.add(2, "t", "en", signature(APR))
+    index.add(3, "t", "en", signature("Should you finance dealer add-ons like nitrogen tire fill?"))
+
+    assert index.evict() == 1
+    assert index.size() == 2
+    assert index.find("t", "en", signature(GAP)) is None
+    assert index.find("t", "en", signature(APR)) == 2
+
+
+def test_bank_rejects_near_duplicates_including_within_a_batch(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+
+    assert bank.add("GAP", "en", [question(GAP), question(GAP_REPHRASED), question(APR)]) == 2
+    assert bank.add("gap ", "en", [question(GAP.upper())]) == 0
+    assert bank.rejected == 2
+    assert bank.size("gap", "en") == 2
+
+
+def test_bank_serves_each_user_unseen_questions(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add("gap", "en", [question(GAP), question(APR)])
+
+    first, left = bank.take("gap", "en", 1, user_id="u1")
+    second, left_after = bank.take("gap", "en", 1, user_id="u1")
+
+    assert first != second
+    assert (left, left_after) == (1, 0)
+    assert bank.take("gap", "en", 2, user_id="u2")[1] == 0
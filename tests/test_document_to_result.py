@@ -0,0 +1,119 @@
+import asyncio
+import io
+
+import pytest
+from google.cloud import documentai
+from pypdf import PdfReader, PdfWriter
+
+from App.core.cache import TieredCache
+from App.services.extraction import extract
+from App.services.extraction.extract import document_to_result
+from App.services.extraction.extract_schema import ExtractionDetail, ExtractResponse
+from App.services.extraction.sharding import merge_results
+
+TEXT = "APR\n6.9%\nItem\nPrice\nGAP\n895\n"
+
+
+def span(start, end, confidence=0.9):
+    return {"text_anchor": {"text_segments": [{"start_index": start, "end_index": end}]}, "confidence": confidence}
+
+
+def cell(start, end):
+    return {"layout": span(start, end), "row_span": 1, "col_span": 1}
+
+
+def page(number):
+    return {
+        "page_number": number,
+        "form_fields": [{"field_name": span(0, 4, 0.8), "field_value": span(4, 9, 0.95)}],
+        "tables": [{
+            "header_rows": [{"cells": [cell(9, 14), cell(14, 20)]}],
+            "body_rows": [{"cells": [cell(20, 24), cell(24, 28)]}],
+        }],
+    }
+
+
+def document(*page_numbers):
+    return documentai.Document(text=TEXT, pages=[page(n) for n in page_numbers])
+
+
+def test_fields_detail_has_flat_fields_only():
+    result = document_to_result(document(1), ExtractionDetail.fields)
+
+    assert result == {
+        "text": TEXT,
+        "form_fields": [{"name": "APR", "value": "6.9%", "confidence": pytest.approx(0.95)}],
+    }
+
+
+def test_fields_tables_detail_adds_plain_text_grids():
+    result = document_to_result(document(1), ExtractionDetail.fields_tables)
+
+    assert "pages" not in result
+    assert result["tables"] == [{
+        "page_number": 1,
+        "detected_columns": 2,
+        "header_rows": [["Item", "Price"]],
+        "body_rows": [["GAP", "895"]],
+    }]
+
+
+def test_full_detail_adds_pages_with_confidences_and_spans():
+    result = document_to_result(document(1), ExtractionDetail.full)
+
+    assert "tables" not in result
+    (full_page,) = result["pages"]
+    assert full_page["page_number"] == 1
+    assert full_page["form_fields"] == [{
+        "field_name": {"text": "APR", "confidence": pytest.approx(0.8)},
+        "field_value": {"text": "6.9%", "confidence": pytest.approx(0.95)},
+    }]
+    (table,) = full_page["tables"]
+    assert table["detected_columns"] == 2
+    assert table["body_rows"] == [[
+        {"text": "GAP", "confidence": pytest.approx(0.9), "row_span": 1, "col_span": 1},
+        {"text": "895", "confidence": pytest.approx(0.9), "row_span": 1, "col_span": 1},
+    ]]
+
+
+@pytest.mark.parametrize("detail", list(ExtractionDetail))
+def test_every_detail_level_matches_the_response_schema(detail):
+    ExtractResponse.model_validate(document_to_result(document(1, 2), detail))
+
+
+@pytest.mark.parametrize("detail", [ExtractionDetail.fields_tables, ExtractionDetail.full])
+def test_shards_are_numbered_by_page_offset(detail):
+    # Each shard is OCR'd on its own, so Document AI numbers its pages from 1
+    shard_size = 2
+    parts = [
+        document_to_result(document(1, 2), detail, page_offset=index * shard_size)
+        for index in range(3)
+    ]
+    merged = merge_results(parts)
+
+    key = "tables" if detail is ExtractionDetail.fields_tables else "pages"
+    assert [item["page_number"] for item in merged[key]] == [1, 2, 3, 4, 5, 6]
+    assert len(merged["form_fields"]) == 6
+    assert merged["text"] == TEXT * 3
+
+
+def pdf(pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_extract_pdf_async_numbers_pages_across_shards(monkeypatch):
+    async def fake_process(content, mime_type="application/pdf"):
+        pages = len(PdfReader(io.BytesIO(content)).pages)
+        return document(*range(1, pages + 1))
+
+    monkeypatch.setattr(extract, "process_document_async", fake_process)
+    monkeypatch.setattr(extract, "get_ocr_cache", lambda: TieredCache(max_bytes=1 << 20, ttl=60))
+
+    result = asyncio.run(extract.extract_pdf_async(pdf(5), shard_pages=2, detail=ExtractionDetail.full))
+
+    assert [p["page_number"] for p in result["pages"]] == [1, 2, 3, 4, 5]
@@ -0,0 +1,146 @@
+import asyncio
+import io
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from google.cloud import documentai
+from PIL import Image
+
+from App.core.cache import TieredCache
+from App.core.config import get_settings
+from App.services.extraction import extract, extract_route
+from App.services.extraction.ingest import spool_request
+
+
+def photo(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    cache = TieredCache(max_bytes=1 << 20, ttl=60)
+    calls = []
+
+    async def fake_process(content, mime_type="application/pdf"):
+        calls.append(content)
+        return documentai.Document(text="Cash Price: $20,000")
+
+    monkeypatch.setattr(extract, "get_ocr_cache", lambda: cache)
+    monkeypatch.setattr(extract, "process_document_async", fake_process)
+    return cache, calls
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(extract_route.router)
+    return TestClient(app)
+
+
+def test_same_photos_uploaded_twice_hit_the_cache(ocr, client):
+    cache, calls = ocr
+    files = [
+        ("files", ("front.jpg", photo("white"), "image/jpeg")),
+        ("files", ("back.jpg", photo("gray"), "image/jpeg")),
+    ]
+
+    first = client.post("/extraction/upload", files=files)
+    # PDF dates have one-second resolution
+    time.sleep(1.1)
+    second = client.post("/extraction/upload", files=files)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_oversized_content_length_is_rejected_before_the_body_is_read(client):
+    app = client.app
+    received = []
+    sent = []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"x" * 1024, "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/extraction/upload",
+        "raw_path": b"/extraction/upload",
+        "root_path": "",
+        "query_string": b"",
+        "server": ("test", 80),
+        "client": ("test", 1234),
+        "headers": [
+            (b"content-type", b"multipart/form-data; boundary=xyz"),
+            (b"content-length", str(10 ** 12).encode()),
+        ],
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert received == []
+
+
+def test_file_over_the_limit_is_rejected_while_streaming(ocr, client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_max_file_bytes", 1000)
+    files = [("files", ("front.jpg", b"\xff" * 5000, "image/jpeg"))]
+
+    response = client.post("/extraction/upload", files=files)
+
+    assert response.status_code == 413
+    assert "front.jpg" in response.json()["detail"]
+    _, calls = ocr
+    assert calls == []
+
+
+def test_unsupported_type_and_missing_files(ocr, client):
+    bad = client.post("/extraction/upload", files=[("files", ("notes.txt", b"hi", "text/plain"))])
+    empty = client.post("/extraction/upload", files=[("other", ("a.pdf", b"%PDF", "application/pdf"))])
+    not_multipart = client.post("/extraction/upload", content=b"%PDF")
+
+    assert bad.status_code == 400
+    assert empty.status_code == 422
+    assert not_multipart.status_code == 400
+
+
+def test_spool_request_writes_each_file_to_its_directory(tmp_path):
+    app = FastAPI()
+    seen = {}
+
+    @app.post("/spool")
+    async def spool(request: Request):
+        def dest(index):
+            path = tmp_path / str(index)
+            path.mkdir()
+            return path
+
+        uploads = await spool_request(request, dest)
+        seen["uploads"] = uploads
+        return {"count": len(uploads)}
+
+    files = [
+        ("files", ("a.pdf", b"%PDF-a", "application/pdf")),
+        ("note", (None, "ignored")),
+        ("files", ("b.png", b"png-bytes", "image/png")),
+    ]
+    response = TestClient(app).post("/spool", files=files)
+
+    assert response.json() == {"count": 2}
+    first, second = seen["uploads"]
+    assert (first.filename, first.ext, first.size) == ("a.pdf", ".pdf", 6)
+    assert first.path == tmp_path / "0" / "upload-0.pdf"
+    assert second.path.read_bytes() == b"png-bytes"
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from App.services.chatbot import chatbot_routes
+from App.services.chatbot.chatbot_routes import GLOSSARY_TERMS, RED_FLAGS, lookup_explanation
+from App.services.chatbot.chatbot_schemas import ChatRequest
+from App.services.chatbot.glossary import claim_prewarm, extract_term, glossary_key
+
+
+@pytest.mark.parametrize("message, term", [
+    ("What is APR?", "apr"),
+    ("what's the apr", "apr"),
+    ("Define the APR.", "apr"),
+    ("explain apr please", "apr"),
+    ("What is a money factor?", "money factor"),
+    ("What does money factor mean?", "money factor"),
+    ("meaning of doc fee", "doc fee"),
+    ("  What is GAP?!  ", "gap"),
+])
+def test_whole_message_glossary_requests(message, term):
+    assert extract_term(message, GLOSSARY_TERMS) == term
+
+
+@pytest.mark.parametrize("message", [
+    "What is GAP? My dealer charges $2,500 for it, is that fair?",
+    "explain why they charge this",
+    "Can you explain APR?",
+    "What is the best APR I can get with a 700 score?",
+    "What is a fair price for a 2021 Civic?",
+    "explain the arbitration clause in my contract",
+])
+def test_questions_are_not_glossary_lookups(message):
+    assert extract_term(message, GLOSSARY_TERMS) is None
+
+
+def test_glossary_is_curated():
+    assert {"apr", "gap", "vsc", "money factor", "residual", "doc fee"} <= set(GLOSSARY_TERMS)
+    assert set(RED_FLAGS) <= set(GLOSSARY_TERMS)
+    assert "monthly" not in GLOSSARY_TERMS
+
+
+def test_lookup_explanation_keys_by_term_and_language(monkeypatch):
+    from App.services.chatbot import chatbot_routes
+    async def no_answer(key):
+        return None
+
+    monkeypatch.setattr(chatbot_routes, "get_glossary_answer", no_answer)
+
+    key, cached = asyncio.run(lookup_explanation(ChatRequest(message="Define APR", language="Spanish")))
+    assert key == glossary_key("apr", "spanish")
+    assert cached is None
+    assert asyncio.run(lookup_explanation(ChatRequest(message="explain why they charge this"))) == (None, None)
+
+
+def test_prewarm_is_claimed_once_per_host(tmp_path):
+    db_path = str(tmp_path / "glossary.db")
+    assert claim_prewarm(db_path) is True
+    assert claim_prewarm(db_path) is False
+    # A lapsed claim can be taken again
+    assert claim_prewarm(str(tmp_path / "other.db"), lease=-1) is True
+    assert claim_prewarm(str(tmp_path / "other.db"), lease=-1) is True
+
+
+def test_memory_only_cache_prewarms_every_worker():
+    assert claim_prewarm("") is True
+
+
+def test_refresh_only_answers_glossary_terms(monkeypatch):
+    asked = []
+
+    async def fake_explain(term, language=None):
+        asked.append((term, language))
+        return f"{term} means..."
+
+    monkeypatch.setattr(chatbot_routes, "explain_term", fake_explain)
+
+    refreshed = asyncio.run(chatbot_routes.concierge_glossary_refresh(term="  Doc Fee? ", language="Spanish"))
+    assert refreshed == {"term": "doc fee", "reply": "doc fee means..."}
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(chatbot_routes.concierge_glossary_refresh(term="what is the weather", language=None))
+    assert raised.value.status_code == 404
+    assert asked == [("doc fee", "Spanish")]
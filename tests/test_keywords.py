@@ -0,0 +1,61 @@
+import pytest
+
+from App.services.chatbot.chatbot_routes import keyword_matcher
+from App.services.chatbot.keywords import KeywordMatcher
+
+# (message, category, expected label)
+TRUE_POSITIVES = [
+    ("They added a doc fee", "red_flags", ["doc fee"]),
+    ("Why are the doc fees so high?", "red_flags", ["doc fee"]),
+    ("admin fees and processing fees", "red_flags", ["processing fee", "admin fee"]),
+    ("Is there an additional fee?", "red_flags", ["additional fee"]),
+    ("They said these are mandatory fees", "tactic", "non_removable_fee"),
+    ("The car was leased last year", "scenario", "lease"),
+    ("I'm thinking about leasing", "scenario", "lease"),
+    ("Should I be refinancing?", "scenario", "refinance"),
+    ("I refinanced in March", "scenario", "refinance"),
+    ("I'm upside down on my loan", "scenario", "negative_equity"),
+    ("It's just $399 a month", "tactic", "monthly_payment"),
+    ("The offer expires today!", "tactic", "expiring_deal"),
+    ("Buying in CA", "region", "california"),
+    ("dealer in tx", "region", "texas"),
+    ("Shipping it to the UK.", "region", "eu"),
+    ("My first car", "scenario", "first_time"),
+    ("There's a market adjustment on the sticker", "red_flags", ["market adjustment"]),
+    ("Two market adjustments", "red_flags", ["market adjustment"]),
+]
+
+FALSE_POSITIVES = [
+    ("My car needs new tires", "region"),
+    ("I stay neutral on brands", "region"),
+    ("Send me the texts", "region"),
+    ("Is the caution light bad?", "region"),
+    ("Keep the dog on a leash", "scenario"),
+    ("Thanks for the feedback", "red_flags"),
+    ("The dealer released the title", "scenario"),
+    ("cash price only", "tactic"),
+    ("audit my deal", "scenario"),
+    ("I'm canadian", "region"),
+]
+
+
+@pytest.mark.parametrize("message, category, expected", TRUE_POSITIVES)
+def test_true_positives(message, category, expected):
+    assert getattr(keyword_matcher.find(message), category) == expected
+
+
+@pytest.mark.parametrize("message, category", FALSE_POSITIVES)
+def test_false_positives(message, category):
+    found = getattr(keyword_matcher.find(message), category)
+    assert found in (None, [], "standard")
+
+
+def test_scenario_precedence_follows_table_order():
+    assert keyword_matcher.find("first time buyer, lease or refinance?").scenario == "first_time"
+
+
+def test_short_region_codes_match_exactly():
+    matcher = KeywordMatcher({}, {"california": ["ca"]}, {}, [])
+    assert matcher.find("in ca").region == "california"
+    assert matcher.find("in cas").region is None
+    assert matcher.find("in caed").region is None
@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+
+from App.core import llm
+from App.core.llm import GroqClient, _retry_after
+
+
+def make_client(monkeypatch, responses):
+    """A GroqClient whose transport replays ``responses`` in order."""
+    calls = []
+    sleeps = []
+
+    def handler(request):
+        calls.append(request)
+        response = responses[len(calls) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm.asyncio, "sleep", fake_sleep)
+    client = GroqClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, calls, sleeps
+
+
+def ok(content="hi"):
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+    })
+
+
+def test_retry_after_seconds_and_http_date():
+    assert _retry_after(httpx.Response(429, headers={"retry-after": "3"})) == 3.0
+    assert _retry_after(httpx.Response(429, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert _retry_after(httpx.Response(429)) is None
+
+
+def test_429_honours_retry_after(monkeypatch):
+    client, calls, sleeps = make_client(monkeypatch, [
+        httpx.Response(429, headers={"retry-after": "2"}),
+        ok(),
+    ])
+
+    data = asyncio.run(client.chat({"messages": []}, label="test"))
+
+    assert data["choices"][0]["message"]["content"] == "hi"
+    assert len(calls) == 2
+    assert sleeps == [2.0]
+    assert client.usage_stats("test")["test"]["prompt_tokens"] == 10
+
+
+def test_5xx_and_transport_errors_are_retried(monkeypatch):
+    client, calls, sleeps = make_client(monkeypatch, [
+        httpx.Response(503),
+        httpx.ConnectError("refused"),
+        ok(),
+    ])
+
+    asyncio.run(client.chat({"messages": []}))
+
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    attempts = llm.settings.groq_max_retries + 1
+    client, calls, _ = make_client(monkeypatch, [httpx.Response(500)] * attempts)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.chat({"messages": []}))
+    assert len(calls) == attempts
+
+
+def test_400_is_not_retried(monkeypatch):
+    client, calls, sleeps = make_client(monkeypatch, [httpx.Response(400), ok()])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.chat({"messages": []}))
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_stream_retries_before_first_byte(monkeypatch):
+    body = (
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        "data: [DONE]\n\n"
+    )
+    client, calls, sleeps = make_client(monkeypatch, [
+        httpx.Response(429, headers={"retry-after": "1"}),
+        httpx.Response(200, content=body.encode()),
+    ])
+
+    async def collect():
+        return [delta async for delta in client.stream_chat({"messages": []})]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert len(calls) == 2
+    assert sleeps == [1.0]
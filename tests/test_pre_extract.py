@@ -0,0 +1,148 @@
+import pytest
+
+from App.services.rating.pre_extract import (
+    MONEY_LABELS, MONEY_SUFFIXES, NUMBER_LABELS, NUMBER_SUFFIXES, TEXT_LABELS, TEXT_SUFFIXES,
+    _label_for, find_vin, merge_deal_fields, parse_amount, parse_date, pre_extract,
+)
+
+SUFFIXES = {id(MONEY_LABELS): MONEY_SUFFIXES, id(NUMBER_LABELS): NUMBER_SUFFIXES, id(TEXT_LABELS): TEXT_SUFFIXES}
+
+
+def label_for(name, labels):
+    return _label_for(name, labels, SUFFIXES[id(labels)])
+from App.services.rating.rating_schema import DealInput, FormField
+
+
+@pytest.mark.parametrize("name, field", [
+    ("Buyer", "buyer_name"),
+    ("Buyer Name", "buyer_name"),
+    ("Buyer Name:", "buyer_name"),
+    ("Dealer", "dealer_name"),
+    ("Dealership Name", "dealer_name"),
+    ("Date", "date"),
+    ("Contract Date", "date"),
+    ("VIN", "vin_number"),
+    ("VIN #", "vin_number"),
+    ("VIN Number", "vin_number"),
+])
+def test_text_labels_match(name, field):
+    assert label_for(name, TEXT_LABELS) == field
+
+
+@pytest.mark.parametrize("name", [
+    "Buyer Address",
+    "Buyer Phone",
+    "Buyer Signature",
+    "Buyer Driver License",
+    "Dealer Documentary Fee",
+    "Dealer Number",
+    "Dealer License",
+    "Date of Birth",
+    "Customer Number",
+    "Customer Since",
+])
+def test_text_labels_reject_other_fields(name):
+    assert label_for(name, TEXT_LABELS) is None
+
+
+@pytest.mark.parametrize("name, labels, field", [
+    ("Cash Price", MONEY_LABELS, "selling_price"),
+    ("GAP", MONEY_LABELS, "gap_price"),
+    ("GAP Premium", MONEY_LABELS, "gap_price"),
+    ("Service Contract Price", MONEY_LABELS, "vsc_price"),
+    ("Manufacturer's Suggested Retail Price", MONEY_LABELS, "msrp"),
+    ("APR", NUMBER_LABELS, "apr"),
+    ("Number of Payments", NUMBER_LABELS, "term_months"),
+    ("Term (Months)", NUMBER_LABELS, "term_months"),
+])
+def test_money_and_number_labels_match(name, labels, field):
+    assert label_for(name, labels) == field
+
+
+def test_gap_fee_is_not_gap_price():
+    assert label_for("GAP Processing Fee", MONEY_LABELS) is None
+
+
+def test_form_fields_do_not_misassign():
+    result = pre_extract(DealInput(text="", form_fields=[
+        FormField(name="Buyer Address", value="12 Elm St", confidence=0.99),
+        FormField(name="Dealer Documentary Fee", value="$499", confidence=0.99),
+        FormField(name="Date of Birth", value="01/02/1980", confidence=0.99),
+        FormField(name="Buyer Name", value="jane doe", confidence=0.99),
+        FormField(name="Contract Date", value="03/04/2024", confidence=0.99),
+    ]))
+
+    assert result.values["buyer_name"] == "Jane Doe"
+    assert result.values["date"] == "2024-03-04"
+    assert "dealer_name" not in result.values
+    assert "Buyer Address: 12 Elm St" in result.remainder
+    assert "Dealer Documentary Fee: $499" in result.remainder
+
+
+def test_ocr_lines():
+    result = pre_extract(DealInput(form_fields=[], text="\n".join([
+        "Cash Price ........ $25,000.00",
+        "APR 6.9 %",
+        "Term: 72",
+        "VIN Etch: $299",
+        "VIN: 1HGCM82633A004352",
+    ])))
+
+    assert result.values["selling_price"] == 25000.0
+    assert result.values["apr"] == 6.9
+    assert result.values["term_months"] == 72
+    assert result.values["vin_number"] == "1HGCM82633A004352"
+    assert result.add_ons == [{"name": "VIN Etch", "price": 299.0}]
+
+
+def test_parsers():
+    assert parse_amount("$1,234.50") == 1234.5
+    assert parse_date("March 4, 2024") == "2024-03-04"
+    assert parse_date("3/4/24") == "2024-03-04"
+    assert find_vin("vin 1HGCM82633A004352") == ("1HGCM82633A004352", 1.0)
+    assert find_vin("1HGCM82633A004353")[1] == 0.5
+
+
+@pytest.mark.parametrize("name", ["Service Contract Months", "GAP Months", "Cash Price Rate", "Buyer Price"])
+def test_suffixes_are_neutral_only_for_their_kind(name):
+    assert label_for(name, MONEY_LABELS) is None
+    assert label_for(name, TEXT_LABELS) is None
+
+
+def test_months_line_does_not_become_a_price():
+    result = pre_extract(DealInput(form_fields=[], text="\n".join([
+        "Service Contract Months: 60",
+        "Service Contract: $2,495",
+        "GAP Months 72",
+    ])))
+
+    assert result.values["vsc_price"] == 2495.0
+    assert "gap_price" not in result.values
+    assert "Service Contract Months: 60" in result.remainder
+
+
+def test_conflicting_values_go_to_the_model():
+    result = pre_extract(DealInput(form_fields=[], text="\n".join([
+        "Cash Price: $25,000",
+        "Cash Price: $27,500",
+        "APR: 6.9",
+        "APR: 6.9",
+    ])))
+    payload = result.prompt_payload()
+
+    assert "selling_price" not in payload["extracted"]
+    assert payload["unverified"]["selling_price"] == [25000.0, 27500.0]
+    assert "Cash Price: $25,000" in payload["remainder"]
+    assert "Cash Price: $27,500" in payload["remainder"]
+    assert payload["extracted"]["apr"] == 6.9
+
+
+def test_unverified_names_are_a_fallback_for_the_model():
+    result = pre_extract(DealInput(form_fields=[], text="Buyer: jane doe\nDealer: acme motors"))
+
+    assert "buyer_name" not in result.deal_fields()
+    assert result.fallbacks == {"buyer_name": "Jane Doe", "dealer_name": "Acme Motors"}
+
+    merged = merge_deal_fields({"buyer_name": None, "dealer_name": "Acme Motors LLC"}, result.deal_fields(), result.fallbacks)
+    assert merged["buyer_name"] == "Jane Doe"
+    assert merged["dealer_name"] == "Acme Motors LLC"
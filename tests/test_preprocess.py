@@ -0,0 +1,56 @@
+from PIL import Image, ImageDraw
+
+from App.services.extraction.preprocess import deskew, estimate_skew, normalize_image
+
+
+def page(width=800, height=1000):
+    """White page with dark text-like lines."""
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(80, height - 80, 36):
+        for left in range(60, width - 120, 90):
+            draw.rectangle([left, top, left + 70, top + 12], fill=20)
+    return image
+
+
+def skewed(angle):
+    return page().rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def test_straight_page_is_left_alone():
+    image = page()
+    assert estimate_skew(image, max_angle=5) == 0
+    assert deskew(image, max_angle=5) is image
+
+
+def test_skew_is_estimated_within_a_step():
+    for angle in (3, -2, 4.5):
+        assert abs(estimate_skew(skewed(angle), max_angle=5) + angle) <= 0.5
+
+
+def test_deskewed_page_measures_straight():
+    straightened = deskew(skewed(3), max_angle=5)
+    assert abs(estimate_skew(straightened, max_angle=5)) <= 0.5
+
+
+def test_blank_page_and_disabled_deskew():
+    blank = Image.new("L", (600, 800), 255)
+    assert estimate_skew(blank, max_angle=5) == 0
+
+    image = skewed(3)
+    assert deskew(image, max_angle=0) is image
+
+
+def test_normalize_image_writes_a_straight_grayscale_jpeg(tmp_path):
+    src, dst = tmp_path / "photo.png", tmp_path / "out.jpg"
+    skewed(3).convert("RGB").save(src)
+
+    path, fingerprint = normalize_image(str(src), str(dst), max_pixels=700, dpi=200, quality=80,
+                                        deskew_max_angle=5)
+
+    assert path == str(dst)
+    assert isinstance(fingerprint, int)
+    with Image.open(dst) as out:
+        assert out.format == "JPEG" and out.mode == "L"
+        assert out.info["dpi"] == (200, 200)
+        assert abs(estimate_skew(out, max_angle=5)) <= 0.5
@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from App.services.quiz import question_bank, quiz_routes
+from App.services.quiz.question_bank import QuestionBank, bank_stats, fill_bank
+
+
+@pytest.fixture
+def bank(monkeypatch, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    monkeypatch.setattr(question_bank, "get_question_bank", lambda: bank)
+    monkeypatch.setattr(question_bank, "_refills", {})
+    return bank
+
+
+def fake_generator(monkeypatch, release: asyncio.Event, fast_calls=1, fail=False):
+    """The first ``fast_calls`` requests answer at once, the rest wait for ``release``."""
+    calls = []
+
+    async def generate_questions(topic, language, count, angle):
+        calls.append(angle)
+        if len(calls) > fast_calls:
+            await release.wait()
+        if fail:
+            raise RuntimeError("groq down")
+        return [{"question": uuid.uuid4().hex, "options": ["a", "b"], "answer": "a"} for _ in range(count)]
+
+    monkeypatch.setattr(question_bank, "generate_questions", generate_questions)
+    return calls
+
+
+def test_cold_request_returns_once_minimum_is_banked(monkeypatch, bank):
+    async def scenario():
+        release = asyncio.Event()
+        fake_generator(monkeypatch, release)
+
+        added = await asyncio.wait_for(fill_bank("gap", "en", 2), timeout=1)
+        assert added == 5
+        assert bank_stats()["refills_running"] == 1
+
+        # The top-up to QUIZ_BANK_REFILL_BATCH carries on in the background
+        release.set()
+        await asyncio.wait_for(question_bank._refills[("gap", "en")].task, timeout=1)
+        return bank.size("gap", "en")
+
+    assert asyncio.run(scenario()) >= question_bank.settings.quiz_bank_refill_batch
+
+
+def test_concurrent_requests_share_one_refill(monkeypatch, bank):
+    async def scenario():
+        release = asyncio.Event()
+        calls = fake_generator(monkeypatch, release, fast_calls=0)
+        waiting = [asyncio.ensure_future(fill_bank("gap", "en", n)) for n in (2, 3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiting), calls
+
+    results, calls = asyncio.run(scenario())
+    assert all(added >= 3 for added in results)
+    assert len(calls) <= question_bank.settings.quiz_fanout_max_calls
+
+
+def test_waiter_is_released_when_refill_falls_short(monkeypatch, bank):
+    async def scenario():
+        release = asyncio.Event()
+        release.set()
+        fake_generator(monkeypatch, release, fast_calls=0)
+        return await asyncio.wait_for(fill_bank("gap", "en", 100), timeout=1)
+
+    added = asyncio.run(scenario())
+    assert 0 < added < 100
+
+
+def test_failed_refill_raises_to_the_waiter(monkeypatch, bank):
+    async def scenario():
+        release = asyncio.Event()
+        release.set()
+        fake_generator(monkeypatch, release, fail=True)
+        await fill_bank("gap", "en", 2)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("count", [0, -1, 51, 10_000])
+def test_generate_rejects_out_of_range_counts(count):
+    app = FastAPI()
+    app.include_router(quiz_routes.router)
+    response = TestClient(app).post(
+        f"/quiz/generate?count={count}", json={"user_input": "leasing", "language": "English"},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+import pytest
+
+from App.services.rating import rating
+
+
+def status_error(status, body):
+    request = httpx.Request("POST", "https://groq.test")
+    response = httpx.Response(status, json=body, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def ok(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def fake_groq(monkeypatch, first_error=None):
+    """Record payloads sent to Groq; the first call raises ``first_error``."""
+    sent = []
+
+    async def fake_chat(payload, timeout=None, label=None):
+        sent.append(payload)
+        if len(sent) == 1 and first_error is not None:
+            raise first_error
+        return ok("{}")
+
+    monkeypatch.setattr(rating.groq_client, "chat", fake_chat)
+    monkeypatch.setattr(rating, "_json_mode_supported", True)
+    return sent
+
+
+def run(payload=None):
+    return asyncio.run(rating.complete_json(payload or {"messages": []}, label="test"))
+
+
+def test_json_mode_is_requested(monkeypatch):
+    calls = fake_groq(monkeypatch)
+    assert run() == "{}"
+    assert calls[0]["response_format"] == {"type": "json_object"}
+
+
+def test_rejected_response_format_disables_json_mode(monkeypatch):
+    calls = fake_groq(monkeypatch, status_error(400, {"error": {"message": "response_format json_object is not supported"}}))
+
+    assert run() == "{}"
+    assert "response_format" not in calls[1]
+    assert rating._json_mode_supported is False
+
+
+def test_failed_generation_is_returned(monkeypatch):
+    calls = fake_groq(monkeypatch, status_error(400, {"error": {
+        "code": "json_validate_failed", "failed_generation": '{"deal": {',
+    }}))
+
+    assert run() == '{"deal": {'
+    assert len(calls) == 1
+    assert rating._json_mode_supported is True
+
+
+def test_other_400_is_raised(monkeypatch):
+    calls = fake_groq(monkeypatch, status_error(400, {"error": {"message": "context_length_exceeded"}}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run()
+    assert len(calls) == 1
+    assert rating._json_mode_supported is True
+
+
+def test_server_errors_are_raised(monkeypatch):
+    calls = fake_groq(monkeypatch, status_error(503, {"error": {"message": "over capacity"}}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run()
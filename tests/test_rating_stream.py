@@ -0,0 +1,158 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from App.core.cache import TieredCache
+from App.services.rating import audit_cache, rating_route
+from App.services.rating.audit_cache import STREAM, audit_cache_key
+from App.services.rating.rating import NARRATIVE_SECTIONS, NarrativeStreamParser
+from App.services.rating.rating_schema import DealInput, FormField
+
+# What the model reads from the remainder that local parsing could not
+MODEL_DEAL = {
+    "selling_price": 20000, "msrp": 31000, "gap_price": 1900, "vsc_price": 5200,
+    "apr": 11.9, "apr_source": "Dealer", "term_months": 84,
+}
+NARRATIVE = {section: f"{section} text." for section in NARRATIVE_SECTIONS}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TieredCache(max_bytes=1 << 20, ttl=60)
+    monkeypatch.setattr(audit_cache, "get_audit_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(rating_route.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+
+    async def fake_audit(prompt_payload):
+        return json.dumps({"deal": MODEL_DEAL, "narrative": NARRATIVE})
+
+    async def fake_fix(prompt_payload, partial, missing, label="rating.fix"):
+        calls.append((missing, label))
+        return json.dumps({"deal": MODEL_DEAL})
+
+    async def fake_stream(prompt_payload, audit):
+        for section, text in NARRATIVE.items():
+            yield f"### {section}\n{text}\n"
+
+    monkeypatch.setattr(rating_route, "call_groq_audit", fake_audit)
+    monkeypatch.setattr(rating_route, "call_groq_fix", fake_fix)
+    monkeypatch.setattr(rating_route, "stream_groq_narrative", fake_stream)
+    return calls
+
+
+def events(response):
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+def score_block(result):
+    return {k: v for k, v in result.items() if k != "narrative"}
+
+
+def deal():
+    return DealInput(
+        text="Cash Price: $20,000\nGAP waiver 1,900\nService contract 5,200\nAPR 11.9% 84 mo",
+        form_fields=[FormField(name="Cash Price", value="$20,000", confidence=0.95)],
+    )
+
+
+def test_stream_done_score_matches_the_rating_endpoint(cache, client, model):
+    d = deal()
+
+    audit = client.post("/rating/", json=d.model_dump()).json()
+    stream = events(client.post("/rating/stream", json=d.model_dump()))
+
+    first, last = stream[0], stream[-1]
+    assert first[0] == "score" and first[1]["provisional"] is True
+    assert last[0] == "done"
+    assert score_block(last[1]) == score_block(audit)
+    # The model's fields (MSRP, APR, term) change the score
+    assert first[1]["score"] != last[1]["score"]
+    assert model == [(["deal"], "rating.deal")]
+
+
+def test_stream_falls_back_to_the_provisional_score_uncached(cache, client, model, monkeypatch):
+    async def failing_fix(prompt_payload, partial, missing, label="rating.fix"):
+        raise RuntimeError("groq down")
+
+    monkeypatch.setattr(rating_route, "call_groq_fix", failing_fix)
+    d = deal()
+
+    stream = events(client.post("/rating/stream", json=d.model_dump()))
+
+    provisional = {k: v for k, v in stream[0][1].items() if k != "provisional"}
+    assert stream[-1][0] == "done"
+    assert score_block(stream[-1][1]) == provisional
+    assert cache.get(audit_cache_key(d, STREAM)) is None
+
+
+def test_replayed_stream_is_final(cache, client, model):
+    d = deal()
+    client.post("/rating/stream", json=d.model_dump())
+
+    replay = events(client.post("/rating/stream", json=d.model_dump()))
+
+    assert replay[0][1]["provisional"] is False
+    assert replay[-1][0] == "done"
+
+
+def feed_all(parser, deltas):
+    out = []
+    for delta in deltas:
+        out.extend(parser.feed(delta))
+    return out + parser.flush()
+
+
+def test_parser_holds_a_marker_split_across_chunks():
+    parser = NarrativeStreamParser()
+
+    out = feed_all(parser, ["#", "## gap_", "logic", "\nGAP is ", "fair.\n## vsc", "_logic\nNo VSC."])
+
+    assert all(section in ("gap_logic", "vsc_logic") for section, _ in out)
+    assert not any("#" in text for _, text in out)
+    assert parser.narrative() == {"gap_logic": "GAP is fair.", "vsc_logic": "No VSC."}
+
+
+def test_parser_passes_text_on_before_the_line_ends():
+    parser = NarrativeStreamParser()
+
+    assert parser.feed("### apr_bonus_rule\n") == []
+    assert parser.feed("APR 6.") == [("apr_bonus_rule", "APR 6.")]
+    assert parser.feed("2% earns a bonus") == [("apr_bonus_rule", "2% earns a bonus")]
+
+
+def test_parser_keeps_unknown_headings_and_hashes_mid_line():
+    parser = NarrativeStreamParser()
+
+    feed_all(parser, ["### negotiation_insight\n", "## Step 1\n", "Ask for item #2 ", "to be removed.\n"])
+
+    assert parser.narrative() == {
+        "negotiation_insight": "## Step 1\nAsk for item #2 to be removed."
+    }
+
+
+def test_parser_flushes_trailing_text_and_drops_preamble():
+    parser = NarrativeStreamParser()
+
+    out = feed_all(parser, ["Sure, here is the audit.\n", "### final_recommendation\n", "Negotiate", "\n#"])
+
+    assert out[0] == ("final_recommendation", "Negotiate")
+    # A trailing "#" with no newline is not a complete marker and is kept as text
+    assert out[-1] == ("final_recommendation", "#")
+    assert parser.narrative() == {"final_recommendation": "Negotiate\n#"}
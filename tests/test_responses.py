@@ -0,0 +1,100 @@
+import gzip
+
+import brotli
+import msgpack
+import orjson
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from App.core.responses import compress_body, encode_body, encode_response
+
+CONTENT = {"text": "Cash Price: $20,000\n" * 200, "form_fields": [{"name": "APR", "value": "6.9%"}]}
+
+
+@pytest.mark.parametrize("accept", [
+    "",
+    "application/json",
+    "*/*",
+    "text/html,application/xhtml+xml,*/*;q=0.8",
+    "application/msgpack;q=0",
+    "application/json, application/msgpack;q=0.5",
+])
+def test_json_unless_msgpack_is_preferred(accept):
+    body, media_type = encode_body(CONTENT, accept)
+
+    assert media_type == "application/json"
+    assert orjson.loads(body) == CONTENT
+
+
+@pytest.mark.parametrize("accept", [
+    "application/msgpack",
+    "application/x-msgpack",
+    "Application/MsgPack",
+    "application/msgpack, */*",
+    "application/json;q=0.5, application/msgpack",
+    "application/json, application/msgpack",
+])
+def test_msgpack_when_accepted_at_least_as_strongly_as_json(accept):
+    body, media_type = encode_body(CONTENT, accept)
+
+    assert media_type == "application/msgpack"
+    assert msgpack.unpackb(body, raw=False) == CONTENT
+
+
+def test_malformed_quality_counts_as_not_acceptable():
+    assert encode_body(CONTENT, "application/msgpack;q=high")[1] == "application/json"
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("br", "br"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+])
+def test_compression_follows_accept_encoding(accept_encoding, expected):
+    raw = orjson.dumps(CONTENT)
+
+    body, encoding = compress_body(raw, accept_encoding)
+
+    assert encoding == expected
+    decompress = {"br": brotli.decompress, "gzip": gzip.decompress, None: bytes}[encoding]
+    assert decompress(body) == raw
+
+
+def test_small_bodies_are_not_compressed():
+    raw = orjson.dumps({"ok": True})
+    assert compress_body(raw, "br, gzip") == (raw, None)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/result")
+    async def result(request: Request):
+        return encode_response(request, CONTENT)
+
+    return TestClient(app)
+
+
+def test_encode_response_sets_type_encoding_and_vary(client):
+    response = client.get("/result", headers={"Accept": "application/msgpack", "Accept-Encoding": "br"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    # httpx decodes brotli transparently
+    assert msgpack.unpackb(response.content, raw=False) == CONTENT
+
+
+def test_encode_response_defaults_to_plain_json(client):
+    response = client.get("/result", headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert "content-encoding" not in response.headers
+    assert response.json() == CONTENT
@@ -0,0 +1,260 @@
+import pytest
+
+from App.services.rating.rating_schema import AddOn, DealFields
+from App.services.rating.scoring import badge_for, gap_cap, score_deal, vsc_cap
+
+
+def deal(**kwargs):
+    return DealFields(**kwargs)
+
+
+def flag_types(flags):
+    return [flag["type"] for flag in flags]
+
+
+@pytest.mark.parametrize("msrp, cap", [
+    (None, 1200.0),
+    (0, 1200.0),
+    (30000, 900.0),
+    (40000, 1200.0),
+    (59999.99, 1200.0),
+    (60000, 1500.0),
+    (45000, 1200.0),
+    (100000, 1500.0),
+])
+def test_gap_cap(msrp, cap):
+    assert gap_cap(msrp) == cap
+
+
+@pytest.mark.parametrize("msrp, cap", [
+    (None, 4000.0),
+    (20000, 3000.0),
+    (30000, 4000.0),
+    (39999.99, 4000.0),
+    (40000, 6000.0),
+    (35000, 4000.0),
+    (100000, 6000.0),
+])
+def test_vsc_cap(msrp, cap):
+    assert vsc_cap(msrp) == cap
+
+
+@pytest.mark.parametrize("score, badge", [
+    (100, "Gold"), (90, "Gold"),
+    (89, "Silver"), (80, "Silver"),
+    (79, "Bronze"), (70, "Bronze"),
+    (69, "Red"), (0, "Red"),
+])
+def test_badge_bands(score, badge):
+    assert badge_for(score)[0] == badge
+
+
+def test_clean_deal_golden():
+    result = score_deal(deal(
+        buyer_name="Jane Doe", dealer_name="Acme Motors", date="2024-01-02",
+        selling_price=30000, vin_number="1HGCM82633A004352", quote_type="Finance",
+        msrp=32000, down_payment=3000, gap_price=800, vsc_price=2000,
+        apr=5.9, apr_source="Dealer", term_months=60,
+    ))
+
+    assert result == {
+        "score": 100,
+        "buyer_name": "Jane Doe",
+        "dealer_name": "Acme Motors",
+        "date": "2024-01-02",
+        "selling_price": 30000.0,
+        "vin_number": "1HGCM82633A004352",
+        "badge": "Gold",
+        "buyer_message": "Exceptional Deal",
+        "red_flags": [],
+        "green_flags": [
+            {"type": "Fair GAP", "message": "GAP is at or below the $960 cap.", "item": "GAP"},
+            {"type": "Fair VSC", "message": "VSC is at or below the $4,000 cap.", "item": "VSC"},
+            {"type": "APR Bonus", "message": "5.9% dealer APR earns +5.", "item": "APR"},
+            {"type": "Transparent Pricing", "message": "Itemized pricing with no penalized items.", "item": "Pricing"},
+        ],
+        "blue_flags": [],
+        "normalized_pricing": {"gap_cap": 960.0, "vsc_cap": 4000.0, "bundle_total": 2800.0},
+        "apr": {"listed": 5.9, "bonus": 5, "source": "Dealer"},
+        "term": {"months": 60, "risk_deduction": 0},
+        "quote_type": "Finance",
+        "bundle_abuse": {"active": False, "deduction": 0},
+    }
+
+
+def test_worst_deal_golden():
+    result = score_deal(deal(
+        selling_price=45000, msrp=50000, gap_price=2000, vsc_price=7000, term_months=84,
+        add_ons=[AddOn(name="Nitrogen Tires", price=300), AddOn(name="VIN Etch", price=400)],
+        apr=14.0, apr_source="Dealer",
+    ))
+
+    assert flag_types(result["red_flags"]) == [
+        "Overpriced GAP", "Overpriced VSC", "Fluff Add-Ons", "Term Risk", "Extended Term", "Bundle Abuse",
+    ]
+    assert result["score"] == 100 - (10 + 10 + 8 + 5 + 2 + 15)
+    assert result["badge"] == "Red"
+    assert result["term"]["risk_deduction"] == 7
+    assert result["normalized_pricing"]["bundle_total"] == 9700.0
+    assert result["apr"]["bonus"] == 0
+
+
+# GAP
+
+def test_gap_over_cap_deducts():
+    result = score_deal(deal(msrp=30000, gap_price=901))
+    assert result["red_flags"][0]["type"] == "Overpriced GAP"
+    assert result["score"] == 90
+
+
+def test_gap_at_cap_is_fair():
+    result = score_deal(deal(msrp=30000, gap_price=900))
+    assert "Fair GAP" in flag_types(result["green_flags"])
+    assert result["score"] == 100
+
+
+@pytest.mark.parametrize("term, down, advised", [
+    (75, None, True),
+    (74, None, False),
+    (75, 1000, False),
+])
+def test_gap_missing_advisory(term, down, advised):
+    result = score_deal(deal(term_months=term, down_payment=down))
+    assert ("GAP Missing" in flag_types(result["blue_flags"])) is advised
+
+
+# VSC
+
+def test_vsc_over_cap_deducts():
+    result = score_deal(deal(msrp=20000, vsc_price=3001))
+    assert flag_types(result["red_flags"]) == ["Overpriced VSC"]
+    assert result["score"] == 90
+
+
+def test_vsc_at_cap_is_fair():
+    result = score_deal(deal(msrp=20000, vsc_price=3000))
+    assert "Fair VSC" in flag_types(result["green_flags"])
+
+
+@pytest.mark.parametrize("mileage, term, advised", [
+    (60000, 72, True),
+    (59999, 72, False),
+    (60000, 71, False),
+    (None, 72, False),
+])
+def test_vsc_missing_advisory(mileage, term, advised):
+    result = score_deal(deal(mileage=mileage, term_months=term, down_payment=1000))
+    assert ("VSC Missing" in flag_types(result["blue_flags"])) is advised
+
+
+@pytest.mark.parametrize("kwargs, advised", [
+    ({"term_months": 72}, True),
+    ({"term_months": 71}, False),
+    ({"term_months": 72, "down_payment": 500}, False),
+    ({"term_months": 72, "gap_price": 500}, False),
+    ({"term_months": 72, "vsc_price": 500}, False),
+])
+def test_missing_protection_advisory(kwargs, advised):
+    result = score_deal(deal(**kwargs))
+    assert ("Missing Protection" in flag_types(result["blue_flags"])) is advised
+
+
+# Add-ons
+
+def test_two_fluff_add_ons_over_threshold_deduct_eight():
+    result = score_deal(deal(add_ons=[
+        AddOn(name="Nitrogen", price=300), AddOn(name="Paint Sealant", price=300),
+    ]))
+    assert result["red_flags"][0]["deduction"] == 8
+    assert result["score"] == 92
+
+
+def test_one_fluff_add_on_over_threshold_deducts_five():
+    result = score_deal(deal(add_ons=[AddOn(name="GPS Tracking", price=501)]))
+    assert result["red_flags"][0]["deduction"] == 5
+
+
+def test_fluff_at_threshold_is_advisory_only():
+    result = score_deal(deal(add_ons=[AddOn(name="Key Replacement", price=500)]))
+    assert result["red_flags"] == []
+    assert flag_types(result["blue_flags"]) == ["Non-Standard Add-Ons"]
+
+
+def test_non_fluff_add_on_is_advisory_only():
+    result = score_deal(deal(add_ons=[AddOn(name="Roof Rack", price=900)]))
+    assert result["red_flags"] == []
+    assert flag_types(result["blue_flags"]) == ["Non-Standard Add-Ons"]
+
+
+# Term
+
+@pytest.mark.parametrize("term, deduction", [(74, 0), (75, 5), (83, 5), (84, 7), (None, 0)])
+def test_term_risk(term, deduction):
+    result = score_deal(deal(term_months=term, down_payment=1000, gap_price=500))
+    assert result["term"]["risk_deduction"] == deduction
+    assert result["score"] == 100 - deduction
+
+
+# Bundle
+
+@pytest.mark.parametrize("vsc, active", [(5999.99, False), (6000, True)])
+def test_bundle_threshold(vsc, active):
+    result = score_deal(deal(msrp=100000, vsc_price=vsc))
+    assert result["bundle_abuse"] == {"active": active, "deduction": 15 if active else 0}
+    assert result["score"] == (85 if active else 100)
+
+
+# Lease
+
+def test_lease_money_factor_over_limit_flags_without_deduction():
+    result = score_deal(deal(money_factor=0.0026))
+    assert flag_types(result["red_flags"]) == ["Excessive Money Factor"]
+    assert result["score"] == 100
+
+
+def test_lease_money_factor_at_limit_passes():
+    result = score_deal(deal(money_factor=0.0025))
+    assert result["red_flags"] == []
+
+
+def test_lease_gap_missing_flags_without_deduction():
+    result = score_deal(deal(quote_type="Lease", lease_gap_included=False))
+    assert flag_types(result["red_flags"]) == ["Lease GAP Missing"]
+    assert result["score"] == 100
+
+
+def test_lease_checks_skip_finance_deals():
+    result = score_deal(deal(quote_type="Finance", lease_gap_included=False))
+    assert result["red_flags"] == []
+
+
+# APR
+
+@pytest.mark.parametrize("apr, bonus", [(6.5, 5), (6.51, 2), (9.5, 2), (9.51, 0)])
+def test_dealer_apr_bonus(apr, bonus):
+    result = score_deal(deal(apr=apr, apr_source="Dealer", msrp=50000, gap_price=2000))
+    assert result["apr"]["bonus"] == bonus
+    assert result["score"] == 90 + bonus
+
+
+def test_apr_bonus_needs_dealer_financing():
+    result = score_deal(deal(apr=3.0, apr_source="OSF"))
+    assert result["apr"] == {"listed": 3.0, "bonus": 0, "source": "OSF"}
+
+
+def test_apr_source_defaults():
+    assert score_deal(deal())["apr"]["source"] == "Cash"
+    assert score_deal(deal(apr=4.0))["apr"] == {"listed": 4.0, "bonus": 5, "source": "Dealer"}
+
+
+def test_score_is_clamped_to_100():
+    assert score_deal(deal(apr=4.0))["score"] == 100
+
+
+# Transparent pricing
+
+def test_transparent_pricing_needs_selling_price_and_no_red_flags():
+    assert "Transparent Pricing" in flag_types(score_deal(deal(selling_price=20000))["green_flags"])
+    assert "Transparent Pricing" not in flag_types(score_deal(deal())["green_flags"])
+    flagged = score_deal(deal(selling_price=20000, money_factor=0.003))
+    assert "Transparent Pricing" not in flag_types(flagged["green_flags"])
@@ -0,0 +1,436 @@
+import asyncio
+import time
+
+import pytest
+import redis.asyncio
+
+from App.core.config import get_settings
+from App.services.chatbot import history
+from App.services.chatbot import store as store_module
+from App.services.chatbot.history import Thread
+from App.services.chatbot.store import (
+    ConversationStore, MemoryConversationStore, RedisConversationStore, SQLiteConversationStore,
+)
+
+CONTEXT = ("standard", None, None)
+
+
+def sqlite_store(tmp_path, lease=5.0):
+    return SQLiteConversationStore(str(tmp_path / "threads.db"), ttl=60, lock_lease=lease, batch_seconds=0.005)
+
+
+async def turn(store, thread_id, text):
+    async with store.lock(thread_id):
+        thread = await store.get(thread_id) or Thread(CONTEXT)
+        await asyncio.sleep(0.01)
+        thread.append("user", text)
+        await store.put(thread_id, thread)
+
+
+def test_sqlite_round_trip(tmp_path):
+    async def scenario():
+        store = sqlite_store(tmp_path)
+        thread = Thread(CONTEXT)
+        thread.append("user", "hello")
+        await store.put("t", thread)
+        loaded = await store.get("t")
+        await store.delete("t")
+        gone = await store.get("t")
+        await store.close()
+        return loaded, gone
+
+    loaded, gone = asyncio.run(scenario())
+    assert [m.content for m in loaded.turns] == ["hello"]
+    assert gone is None
+
+
+def test_concurrent_turns_across_workers_are_not_lost(tmp_path):
+    async def scenario():
+        # Two stores on one database stand in for two uvicorn workers
+        workers = [sqlite_store(tmp_path), sqlite_store(tmp_path)]
+        await asyncio.gather(*(turn(workers[i % 2], "t", f"m{i}") for i in range(10)))
+        thread = await workers[0].get("t")
+        for store in workers:
+            await store.close()
+        return thread
+
+    thread = asyncio.run(scenario())
+    assert sorted(m.content for m in thread.turns) == sorted(f"m{i}" for i in range(10))
+
+
+def test_lock_is_renewed_while_a_turn_outlives_the_lease(tmp_path):
+    async def scenario():
+        first, second = sqlite_store(tmp_path, lease=0.15), sqlite_store(tmp_path, lease=0.15)
+        released_at = None
+
+        async def slow_turn():
+            nonlocal released_at
+            async with first.lock("t"):
+                await asyncio.sleep(0.6)
+                released_at = time.monotonic()
+
+        async def other_turn():
+            await asyncio.sleep(0.05)
+            async with second.lock("t"):
+                return time.monotonic()
+
+        _, acquired_at = await asyncio.gather(slow_turn(), other_turn())
+        await first.close()
+        await second.close()
+        return released_at, acquired_at
+
+    released_at, acquired_at = asyncio.run(scenario())
+    assert acquired_at >= released_at
+
+
+def test_lease_of_a_crashed_worker_lapses(tmp_path):
+    async def scenario():
+        crashed, live = sqlite_store(tmp_path, lease=0.1), sqlite_store(tmp_path, lease=0.1)
+        await crashed._acquire("t")  # never released, never renewed
+        async with live.lock("t"):
+            pass
+        await crashed.close()
+        await live.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+
+def test_memory_store_keeps_turn_order(tmp_path):
+    async def scenario():
+        store = MemoryConversationStore(max_bytes=1 << 20, ttl=60, lock_lease=5)
+        for i in range(5):
+            await turn(store, "t", f"m{i}")
+        return await store.get("t")
+
+    thread = asyncio.run(scenario())
+    assert [m.content for m in thread.turns] == [f"m{i}" for i in range(5)]
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ConversationStore(lock_lease=5)
+
+
+class FakeRedis:
+    """In-memory stand-in for ``redis.asyncio.Redis``: the commands and the two
+    lock scripts RedisConversationStore uses, with key expiry."""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.closed = False
+
+    def _get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def ttl(self, key):
+        self._get(key)
+        expires_at = self.data.get(key, (None, None))[1]
+        return None if expires_at is None else expires_at - time.monotonic()
+
+    async def get(self, key):
+        return self._get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._get(key) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        seconds = ex if ex is not None else (px / 1000 if px is not None else None)
+        self.data[key] = (value, None if seconds is None else time.monotonic() + seconds)
+        return True
+
+    async def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, token, *args):
+        if self._get(key) != token.encode():
+            return 0
+        if script == store_module._REDIS_RELEASE:
+            return await self.delete(key)
+        if script == store_module._REDIS_RENEW:
+            value, _ = self.data[key]
+            self.data[key] = (value, time.monotonic() + int(args[0]) / 1000)
+            return 1
+        raise AssertionError("unexpected script")
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = FakeRedis()
+    monkeypatch.setattr(redis.asyncio, "from_url", lambda url: server)
+    return server
+
+
+def redis_store(lease=5.0):
+    return RedisConversationStore("redis://test", ttl=60, lock_lease=lease)
+
+
+def test_redis_round_trip_sets_the_thread_ttl(fake_redis):
+    async def scenario():
+        store = redis_store()
+        thread = Thread(CONTEXT)
+        thread.append("user", "hello")
+        await store.put("t", thread)
+        loaded = await store.get("t")
+        ttl = fake_redis.ttl("concierge:thread:t")
+        await store.delete("t")
+        gone = await store.get("t")
+        await store.close()
+        return loaded, ttl, gone
+
+    loaded, ttl, gone = asyncio.run(scenario())
+    assert [m.content for m in loaded.turns] == ["hello"]
+    assert 59 < ttl <= 60
+    assert gone is None
+    assert fake_redis.closed
+
+
+def test_redis_lock_serialises_turns_across_workers(fake_redis):
+    async def scenario():
+        workers = [redis_store(), redis_store()]
+        await asyncio.gather(*(turn(workers[i % 2], "t", f"m{i}") for i in range(10)))
+        return await workers[0].get("t")
+
+    thread = asyncio.run(scenario())
+    assert sorted(m.content for m in thread.turns) == sorted(f"m{i}" for i in range(10))
+    assert "concierge:lock:t" not in fake_redis.data
+
+
+def test_redis_lock_is_renewed_while_a_turn_outlives_the_lease(fake_redis):
+    async def scenario():
+        first, second = redis_store(lease=0.15), redis_store(lease=0.15)
+        released_at = None
+
+        async def slow_turn():
+            nonlocal released_at
+            async with first.lock("t"):
+                await asyncio.sleep(0.6)
+                released_at = time.monotonic()
+
+        async def other_turn():
+            await asyncio.sleep(0.05)
+            async with second.lock("t"):
+                return time.monotonic()
+
+        _, acquired_at = await asyncio.gather(slow_turn(), other_turn())
+        return released_at, acquired_at
+
+    released_at, acquired_at = asyncio.run(scenario())
+    assert acquired_at >= released_at
+
+
+def test_redis_release_and_renew_check_the_owner(fake_redis):
+    async def scenario():
+        stale, live = redis_store(lease=0.1), redis_store(lease=5)
+        stale_token = await stale._acquire("t")
+        await asyncio.sleep(0.15)  # the stale lease lapses
+        live_token = await live._acquire("t")
+
+        await stale._renew("t", stale_token)
+        await stale._release("t", stale_token)
+        held = await fake_redis.get("concierge:lock:t")
+        ttl = fake_redis.ttl("concierge:lock:t")
+
+        await live._release("t", live_token)
+        return live_token, held, ttl, await fake_redis.get("concierge:lock:t")
+
+    live_token, held, ttl, after = asyncio.run(scenario())
+    assert held == live_token.encode()
+    assert ttl > 1  # not shortened to the stale worker's lease
+    assert after is None
+
+
+def test_memory_store_evicts_by_byte_budget():
+    def thread(text):
+        thread = Thread(CONTEXT)
+        thread.append("user", text)
+        return thread
+
+    async def scenario():
+        size = thread("x" * 1000).nbytes()
+        store = MemoryConversationStore(max_bytes=3 * size, ttl=60, lock_lease=5)
+        for name in ("a", "b", "c"):
+            await store.put(name, thread("x" * 1000))
+        # Reading "a" makes "b" the least recently used
+        assert await store.get("a") is not None
+        await store.put("d", thread("x" * 1000))
+        kept = {name: await store.get(name) is not None for name in "abcd"}
+
+        # A thread that grows is re-weighed, evicting others to stay in budget
+        grown = await store.get("a")
+        grown.append("assistant", "y" * 1500)
+        await store.put("a", grown)
+        after_growth = [name for name in "acd" if await store.get(name) is not None]
+
+        # One thread bigger than the whole budget is not kept at all
+        await store.put("huge", thread("z" * 4 * size))
+        return store, kept, after_growth, await store.get("huge")
+
+    store, kept, after_growth, huge = asyncio.run(scenario())
+    assert kept == {"a": True, "b": False, "c": True, "d": True}
+    assert "a" in after_growth and len(after_growth) < 3
+    assert huge is None
+    assert store._threads.currsize <= store._threads.maxsize
+
+
+def window(monkeypatch, turns=4, max_tokens=10_000, batch=2):
+    monkeypatch.setattr(get_settings(), "concierge_history_turns", turns)
+    monkeypatch.setattr(get_settings(), "concierge_history_max_tokens", max_tokens)
+    monkeypatch.setattr(get_settings(), "concierge_summary_batch", batch)
+
+
+def test_window_keeps_the_newest_turns(monkeypatch):
+    window(monkeypatch, turns=4)
+    thread = Thread(CONTEXT)
+    for i in range(7):
+        thread.append("user" if i % 2 else "assistant", f"m{i}")
+    thread.summary = "they want the truck"
+
+    messages = thread.messages("You are SmartDealer.")
+    assert thread.window_start() == 3
+    assert messages[0] == {
+        "role": "system",
+        "content": "You are SmartDealer.\n\nSummary of the conversation so far: they want the truck",
+    }
+    assert [m["content"] for m in messages[1:]] == ["m3", "m4", "m5", "m6"]
+
+
+def test_window_is_capped_by_tokens_but_keeps_the_newest_turn(monkeypatch):
+    window(monkeypatch, turns=10, max_tokens=2 * history.estimate_tokens("x" * 40))
+    thread = Thread(CONTEXT)
+    for i in range(4):
+        thread.append("user", "x" * 40)
+    assert thread.window_start() == 2
+
+    thread.append("assistant", "y" * 4000)
+    assert thread.window_start() == 4
+    assert [m["content"] for m in thread.messages("s")[1:]] == ["y" * 4000]
+
+
+def test_turns_leaving_the_window_are_compressed(monkeypatch):
+    window(monkeypatch, turns=2)
+    text = "the doc fee is negotiable " * 20
+    thread = Thread(CONTEXT)
+    thread.append("user", text)
+    thread.append("assistant", text)
+    assert all(isinstance(m._body, str) for m in thread.turns)
+
+    thread.append("user", "short")
+    thread.append("assistant", "reply")
+    assert all(isinstance(m._body, bytes) for m in thread.turns[:2])
+    assert [m.content for m in thread.turns[:2]] == [text, text]
+    assert thread.turns[0].nbytes() < len(text)
+
+
+def test_from_dict_reads_compact_and_legacy_turns(monkeypatch):
+    window(monkeypatch, turns=2)
+    legacy = {
+        "summary": "earlier",
+        "turns": [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
+    }
+    thread = Thread.from_dict(legacy)
+    assert thread.context == ("standard", None, None)
+    assert thread.summary == "earlier"
+    assert [m.as_dict() for m in thread.turns] == legacy["turns"]
+
+    long_text = "monthly payment " * 20
+    thread = Thread(("lease", "CA", None))
+    for text in (long_text, "b", "c"):
+        thread.append("user", text)
+    data = thread.to_dict()
+    assert data["turns"][0] == [0, long_text]
+
+    restored = Thread.from_dict(data)
+    assert restored.context == ("lease", "CA", None)
+    assert [m.content for m in restored.turns] == [long_text, "b", "c"]
+    assert isinstance(restored.turns[0]._body, bytes)
+
+
+def fake_summary(monkeypatch, reply="they agreed on 30k", error=None):
+    sent = []
+
+    async def fake_chat(payload, timeout=None, label=None):
+        sent.append(payload)
+        if error is not None:
+            raise error
+        return {"choices": [{"message": {"content": f" {reply} "}}]}
+
+    monkeypatch.setattr(history.groq_client, "chat", fake_chat)
+    return sent
+
+
+async def summarize(store, thread_id, edit=None):
+    thread = await store.get(thread_id)
+    history.maybe_summarize(store, thread_id, thread)
+    if edit is not None:
+        await edit(store)
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await asyncio.gather(*pending)
+    return await store.get(thread_id)
+
+
+async def stored_thread(count):
+    store = MemoryConversationStore(max_bytes=1 << 20, ttl=60, lock_lease=5)
+    for i in range(count):
+        await turn(store, "t", f"m{i}")
+    return store
+
+
+def test_summary_folds_the_turns_outside_the_window(monkeypatch):
+    window(monkeypatch, turns=2, batch=2)
+    sent = fake_summary(monkeypatch)
+
+    async def scenario():
+        return await summarize(await stored_thread(5), "t")
+
+    thread = asyncio.run(scenario())
+    assert thread.summary == "they agreed on 30k"
+    assert [m.content for m in thread.turns] == ["m3", "m4"]
+    assert len(sent) == 1
+    assert "user: m0\nuser: m1\nuser: m2" in sent[0]["messages"][1]["content"]
+
+
+def test_summary_waits_for_a_full_batch(monkeypatch):
+    window(monkeypatch, turns=4, batch=2)
+    sent = fake_summary(monkeypatch)
+
+    async def scenario():
+        return await summarize(await stored_thread(5), "t")
+
+    thread = asyncio.run(scenario())
+    assert sent == []
+    assert thread.summary == "" and len(thread.turns) == 5
+
+
+def test_summary_is_dropped_if_the_thread_changed_meanwhile(monkeypatch):
+    window(monkeypatch, turns=2, batch=2)
+    fake_summary(monkeypatch)
+
+    async def reset(store):
+        await store.put("t", Thread(CONTEXT))
+
+    async def scenario():
+        return await summarize(await stored_thread(5), "t", edit=reset)
+
+    thread = asyncio.run(scenario())
+    assert thread.summary == "" and thread.turns == []
+
+
+def test_failed_summary_leaves_the_thread_alone(monkeypatch):
+    window(monkeypatch, turns=2, batch=2)
+    fake_summary(monkeypatch, error=RuntimeError("groq down"))
+
+    async def scenario():
+        return await summarize(await stored_thread(5), "t")
+
+    thread = asyncio.run(scenario())
+    assert thread.summary == ""
+    assert [m.content for m in thread.turns] == [f"m{i}" for i in range(5)]
+    assert not history._summarizing